@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import AsyncIterator, Callable, List, Tuple, Union
+
+import aiohttp
+
+from base import BaseClient
+from date import Date
+from rate_limit import RateLimiter
+from cache import ResponseCache
+from candle_store import CandleStore
+from market_store import MarketStore
+from indicators import Indicators
+from instrumentation import Instrumentation, RequestRecord
+from singleflight import AsyncSingleFlight
+from finnhub_api import FinnhubAPI, Request
+from lazy import LazyModule
+
+from models.finnhub import *
+
+pd = LazyModule("pandas")
+
+
+class AsyncFinnhubClient(FinnhubAPI):
+    """
+    Asyncio counterpart of FinnhubClient exposing the same methods as coroutines.
+    At most `max_concurrency` requests are in flight at once, `base_url` can point to a local stub server.
+    """
+
+    def __init__(self, api_key: str = None, proxy: str = None, max_concurrency: int = 8, base_url: str = None,
+                 timeout: float = 30, max_retries: int = 3, backoff_factor: float = 0.3,
+                 calls_per_second: float = 30, calls_per_minute: float = 60, cache: ResponseCache = None,
+                 candle_store: CandleStore = None, market_store: MarketStore = None,
+                 instrumentation: Instrumentation = None, single_flight: AsyncSingleFlight = None):
+        super().__init__(api_key=api_key, proxy=proxy, candle_store=candle_store, market_store=market_store,
+                         base_url=base_url)
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._cache = cache
+        self._instrumentation = instrumentation
+        self._single_flight = single_flight if single_flight is not None else AsyncSingleFlight()
+        self._rate_limiter = RateLimiter.shared(self.base_url, calls_per_second=calls_per_second,
+                                                calls_per_minute=calls_per_minute)
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def proxy(self):
+        return self._proxy
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self._timeout)
+            )
+        return self._session
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter
+
+    @property
+    def cache(self) -> ResponseCache:
+        return self._cache
+
+    @property
+    def instrumentation(self) -> Instrumentation:
+        return self._instrumentation
+
+    @property
+    def single_flight(self) -> AsyncSingleFlight:
+        return self._single_flight
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphore
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._memo.delete()
+
+    async def _map_symbols(self, fetch: Callable, symbols: List[str], *args) -> dict:
+        symbols = list(dict.fromkeys(symbols))
+        results = await asyncio.gather(*[fetch(symbol, *args) for symbol in symbols], return_exceptions=True)
+        return self._collect(dict(zip(symbols, results)), self.failures)
+
+    async def _call(self, request: Request):
+        return request.parse(await self._get(request.route, params=request.params))
+
+    async def _get(self, route: str, params: dict = None):
+        record = RequestRecord(route, params)
+        if self.instrumentation is not None:
+            self.instrumentation.before(route, params)
+        try:
+            return await self._send(route, record)
+        except Exception as error:
+            record.error = f'{type(error).__name__}: {error}'
+            raise
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.after(record)
+
+    async def _send(self, route: str, record: RequestRecord):
+        params = record.params
+        if self.cache is not None:
+            started = time.perf_counter()
+            cached = self.cache.get(route, params, self.base_url)
+            if cached is not None:
+                record.cache_hit, record.parse_seconds = True, time.perf_counter() - started
+                return cached
+        result, record.coalesced = await self.single_flight.do(ResponseCache.key(route, params, self.base_url),
+                                                               lambda: self._fetch(route, record))
+        return result
+
+    async def _fetch(self, route: str, record: RequestRecord):
+        """
+        Sends the request under the concurrency and rate limits, a 429 is retried once the limiter lets it and a
+        server error in BaseClient.retry_statuses after an exponential backoff, like the sync client does
+        """
+        params = record.params
+        url = self._get_url(route)
+        query = {key: value for key, value in (params or {}).items() if value is not None}
+        started = time.perf_counter()
+        async with self.semaphore:
+            record.wait_seconds += time.perf_counter() - started
+            for attempt in range(self._max_retries + 1):
+                record.attempts += 1
+                started = time.perf_counter()
+                await self.rate_limiter.acquire_async()
+                record.wait_seconds += time.perf_counter() - started
+                started = time.perf_counter()
+                async with self.session.get(url, params=query, headers=self.headers, proxy=self.proxy) as response:
+                    body = await response.read()
+                    record.network_seconds += time.perf_counter() - started
+                    self.rate_limiter.observe(response.status, response.headers)
+                    status, response_url = response.status, response.url
+                if attempt < self._max_retries and status in BaseClient.retry_statuses:
+                    await asyncio.sleep(self._backoff_factor * 2 ** attempt)
+                elif status != 429 or attempt == self._max_retries:
+                    record.status, record.bytes = status, len(body)
+                    started = time.perf_counter()
+                    result = BaseClient._decode(status, response_url, body)
+                    record.parse_seconds = time.perf_counter() - started
+                    break
+        record.retries = record.attempts - 1
+        if self.cache is not None:
+            self.cache.set(route, params, result, self.base_url)
+        return result
+
+    async def get_quote(self, symbol: str) -> pd.DataFrame:
+        return await self._call(self._quote_request(symbol))
+
+    async def _fetch_window(self, symbol: str, resolution: str, window: Tuple[int, int]) -> dict:
+        return await self._call(self._candles_request(symbol, resolution, *window))
+
+    async def iter_stock_candles(self, symbol: str, resolution: str, _from: datetime, to: datetime) \
+            -> AsyncIterator[pd.DataFrame]:
+        """
+        Asynchronous counterpart of FinnhubClient.iter_stock_candles
+        """
+        _from, to = Date.datetime_to_timestamp(_from, to)
+        windows = self.candle_windows(symbol, resolution, _from, to)
+        stored = self._stored_candles(symbol, resolution, _from, to)
+        if stored is not None:
+            yield stored
+        tasks = [asyncio.ensure_future(self._fetch_window(symbol, resolution, window)) for window in windows]
+        try:
+            for task in asyncio.as_completed(tasks):
+                df_candles = self._window_candles(await task)
+                if df_candles is not None:
+                    yield df_candles
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def get_stock_candles(self, symbol: str, resolution: str, _from: datetime, to: datetime) -> pd.DataFrame:
+        _from, to = Date.datetime_to_timestamp(_from, to)
+        windows = self.candle_windows(symbol, resolution, _from, to)
+        payloads = await asyncio.gather(*[self._fetch_window(symbol, resolution, window) for window in windows])
+        return self._range_candles(symbol, resolution, _from, to, payloads)
+
+    async def get_stock_close(self, symbol: str, resolution: str, _from: datetime, to: datetime) -> pd.Series:
+        df_candles = await self.get_stock_candles(symbol, resolution, _from, to)
+        return df_candles['close']
+
+    async def get_technical_indicator(self, symbol: str, resolution: str, _from: datetime, to: datetime,
+                                      indicator: str, indicator_fields: dict) -> Union[pd.DataFrame, pd.Series]:
+        return await self._call(self._indicator_request(symbol, resolution, _from, to, indicator,
+                                                        indicator_fields))
+
+    async def compute_multiple_technical_indicator(self, symbol: str, resolution: str, _from: datetime,
+                                                   to: datetime, indicators: list = ['sma', 'sma', 'bbands'],
+                                                   time_indicators: list = [20, 60, 20]) -> pd.DataFrame:
+        start = self._warmup_start(_from, resolution, indicators, time_indicators)
+        df_candles = await self.get_stock_candles(symbol, resolution, start, to)
+        return self._compute_indicators(symbol, resolution, df_candles, indicators, time_indicators)
+
+    async def check_technical_indicator(self, symbol: str, resolution: str, _from: datetime, to: datetime,
+                                        indicator: str, time: int) -> pd.DataFrame:
+        local, remote = await asyncio.gather(
+            self.compute_multiple_technical_indicator(symbol, resolution, _from, to, [indicator], [time]),
+            self.get_multiple_technical_indicator(symbol, resolution, _from, to, [indicator], [time], local=False))
+        return self._indicators_difference(local, remote)
+
+    async def get_multiple_technical_indicator(self, symbol: str, resolution: str, _from: datetime, to: datetime,
+                                               indicators: list = ['sma', 'sma', 'bbands'],
+                                               time_indicators: list = [20, 60, 20],
+                                               local: bool = True) -> pd.DataFrame:
+        if local and all(Indicators.supports(indic) for indic in indicators):
+            return await self.compute_multiple_technical_indicator(symbol, resolution, _from, to, indicators,
+                                                                   time_indicators)
+        requests = self._indicator_requests(symbol, resolution, _from, to, indicators, time_indicators)
+        return self._merge_indicators(list(await asyncio.gather(*[self._call(request) for request in requests])))
+
+    async def get_company_news(self, symbol: str, time=5, nb=10) -> pd.DataFrame:
+        return await self._call(self._news_request(symbol, time, nb))
+
+    async def get_company_peers(self, symbol: str) -> list:
+        return await self._call(self._peers_request(symbol))
+
+    async def get_company_basic_financials(self, symbol: str, metric: str = 'all') -> pd.DataFrame:
+        stored = self._stored_fundamentals(symbol, metric)
+        return stored if stored is not None else await self._call(self._financials_request(symbol, metric))
+
+    async def _memoized(self, route: str, key: tuple, fetch: Callable):
+        value = self._memo_get(route, key)
+        return value if value is not None else self._memo_set(route, key, await fetch())
+
+    async def _peer_financials(self, symbol: str, metric: str) -> pd.DataFrame:
+        return await self._memoized("/stock/metric", (symbol, metric),
+                                    lambda: self.get_company_basic_financials(symbol, metric))
+
+    async def _peers(self, symbol: str) -> list:
+        return await self._memoized("/stock/peers", (symbol,), lambda: self.get_company_peers(symbol))
+
+    async def get_peer_graph(self, symbol: str, depth: int = 1, max_peers: int = None) -> list:
+        seen, level = [symbol], [symbol]
+        for _ in range(depth):
+            if max_peers is not None and len(seen) > max_peers:
+                break
+            level = self._next_level(await self._map_symbols(self._peers, level), seen)
+        return seen[1:] if max_peers is None else seen[1:max_peers + 1]
+
+    async def get_peers_basic_financials(self, symbol: str, metric: str = 'all', max_peers: int = None,
+                                         depth: int = 1) -> pd.DataFrame:
+        peers = await self.get_peer_graph(symbol, depth, max_peers)
+        if self._compare_peers(peers, max_peers):
+            financials = await self._map_symbols(self._peer_financials, [symbol] + peers, metric)
+            return self._concat(financials.values())
+        else:
+            return (await self._peer_financials(symbol, metric)).copy()
+
+    async def get_stock_insider_transactions(self, symbol: str, _from=None, to=None, nb=10) -> pd.DataFrame:
+        return await self._call(self._insiders_request(symbol, _from, to, nb))
+
+    async def get_recommendation_trends(self, symbol: str) -> pd.DataFrame:
+        return await self._call(self._recommendation_request(symbol))
+
+    async def get_company_earnings(self, symbol: str, limit=None) -> pd.DataFrame:
+        return await self._call(self._earnings_request(symbol, limit))
+
+    async def get_stock_social_sentiment(self, symbol: str, _from=None, to=None, nb=10) -> pd.DataFrame:
+        return await self._call(self._sentiment_request(symbol, _from, to, nb))
+
+    async def get_quotes(self, symbols: List[str]) -> pd.DataFrame:
+        quotes = await self._map_symbols(self.get_quote, symbols)
+        return self._concat([df_quote.set_axis([symbol]) for symbol, df_quote in quotes.items()])
+
+    async def get_candles_panel(self, symbols: List[str], resolution: str, _from: datetime, to: datetime,
+                                field: str = None) -> pd.DataFrame:
+        candles = await self._map_symbols(self.get_stock_candles, symbols, resolution, _from, to)
+        if field is not None:
+            return self._concat({symbol: df_candles[field] for symbol, df_candles in candles.items()}, axis=1)
+        return self._concat(candles, axis=1)
+
+    async def get_basic_financials(self, symbols: List[str], metric: str = 'all') -> pd.DataFrame:
+        financials = await self._map_symbols(self.get_company_basic_financials, symbols, metric)
+        return self._concat(financials.values())
@@ -0,0 +1,150 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from itertools import product
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore
+from date import Date
+from indicators import Indicators
+from market_store import MarketStore
+from returns import Returns
+from models.finnhub import Candles
+
+
+def _rolling_mean(values: np.ndarray, timeperiod: int) -> np.ndarray:
+    cumsum = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+    mean = np.full(values.shape, np.nan)
+    mean[timeperiod - 1:] = (cumsum[timeperiod:] - cumsum[:-timeperiod]) / timeperiod
+    return mean
+
+
+def sma_cross(data: dict, fast: int, slow: int) -> np.ndarray:
+    """
+    Long while the fast simple average is above the slow one, short otherwise
+    """
+    fast_sma, slow_sma = _rolling_mean(data["close"], fast), _rolling_mean(data["close"], slow)
+    return np.where(np.isnan(slow_sma) | np.isnan(fast_sma), 0., np.sign(fast_sma - slow_sma))
+
+
+def rsi_threshold(data: dict, timeperiod: int, lower: float = 30, upper: float = 70) -> np.ndarray:
+    """
+    Long when the RSI is oversold, short when it is overbought
+    """
+    rsi = np.column_stack([Indicators.rsi(None, None, close, timeperiod)["rsi"] for close in data["close"].T])
+    return np.where(rsi < lower, 1., np.where(rsi > upper, -1., 0.))
+
+
+def indicator_threshold(data: dict, column: str, lower: float, upper: float) -> np.ndarray:
+    """
+    Long below `lower` and short above `upper` on a precomputed indicator panel such as 'rsi_14'
+    """
+    values = data[column]
+    return np.where(values < lower, 1., np.where(values > upper, -1., 0.))
+
+
+def _evaluate(rule: Callable, data: dict, cost: float, periods_per_year: float, grid: List[dict]) -> List[dict]:
+    close = data["close"]
+    returns = np.zeros_like(close)
+    returns[1:] = np.nan_to_num(close[1:] / close[:-1] - 1)
+    results = []
+    for params in grid:
+        positions = np.nan_to_num(rule(data, **params))
+        held = np.vstack([np.zeros((1, positions.shape[1])), positions[:-1]])
+        trades = np.abs(np.diff(positions, axis=0, prepend=0.))
+        strategy = held * returns - cost * trades
+        equity = np.cumprod(1 + strategy, axis=0)
+        drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+        volatility = strategy.std(axis=0)
+        results.append({
+            "pnl": equity[-1] - 1,
+            "max_drawdown": drawdown.min(axis=0),
+            "sharpe": np.divide(strategy.mean(axis=0), volatility, out=np.zeros_like(volatility),
+                                where=volatility > 0) * np.sqrt(periods_per_year),
+            "turnover": trades.mean(axis=0) * periods_per_year,
+        })
+    return results
+
+
+class Backtest:
+    """
+    Evaluates a signal rule over every symbol of a panel and every point of a parameter grid at once.
+    A rule maps the panel arrays (dates x symbols) to target positions in [-1, 1], the position decided on a bar
+    is held over the next one, and must treat each symbol column independently. Symbols are spread over a process
+    pool, so the rule has to be picklable: a module level function, not a lambda or a closure (or use
+    max_workers=1). Figures are annualised with the bars per year of the candles' resolution.
+    """
+
+    def __init__(self, close: pd.DataFrame, high: pd.DataFrame = None, low: pd.DataFrame = None,
+                 indicators: Dict[str, pd.DataFrame] = None, periods_per_year: float = None, cost: float = 0.,
+                 max_workers: int = None):
+        self._index, self._symbols = close.index, list(close.columns)
+        self._data = {"close": close.to_numpy(dtype=float)}
+        for name, panel in {"high": high, "low": low, **(indicators or {})}.items():
+            if panel is not None:
+                self._data[name] = panel.reindex(index=close.index, columns=close.columns).to_numpy(dtype=float)
+        self._periods_per_year = Returns.periods_per_year(close.index) if periods_per_year is None \
+            else periods_per_year
+        self._cost = cost
+        self._max_workers = max_workers
+
+    @classmethod
+    def from_candles_panel(cls, panel: pd.DataFrame, **kwargs) -> 'Backtest':
+        """
+        Builds the backtest from the (symbol, field) columns returned by FinnhubClient.get_candles_panel
+        """
+        fields = {field: panel.xs(field, axis=1, level=1) for field in ["close", "high", "low"]}
+        return cls(fields["close"], fields["high"], fields["low"], **kwargs)
+
+    @classmethod
+    def from_store(cls, market_store: MarketStore, symbols: List[str], resolution: str, _from: datetime,
+                   to: datetime, indicators: List[str] = None, **kwargs) -> 'Backtest':
+        """
+        Builds the backtest offline from the candles persisted in a MarketStore, together with the stored
+        `indicators` panels such as 'rsi_14' that the clients computed over them
+        """
+        candle_store, (start, end) = CandleStore(market_store), Date.datetime_to_timestamp(_from, to)
+        candles = {symbol: candle_store.payload(symbol, resolution, start, end) for symbol in symbols}
+        candles = {symbol: Candles.get(**payload) for symbol, payload in candles.items() if payload['s'] == 'ok'}
+        if not candles:
+            raise Exception(f'No {resolution} candles stored for {", ".join(symbols)} between {_from} and {to}')
+        panel = pd.concat(candles, axis=1)
+        if indicators:
+            stored = {symbol: market_store.read_indicators(symbol, resolution, _from, to) for symbol in candles}
+            kwargs["indicators"] = {column: pd.DataFrame({symbol: df[column] for symbol, df in stored.items()
+                                                          if column in df}) for column in indicators}
+        kwargs.setdefault("periods_per_year", Returns.periods_per_year(resolution=resolution))
+        return cls.from_candles_panel(panel, **kwargs)
+
+    def run(self, rule: Callable, grid: Dict[str, list]) -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                pnl, max_drawdown, sharpe and annualized turnover indexed by the grid parameters and the symbol
+        """
+        grid = [dict(zip(grid, values)) for values in product(*grid.values())]
+        evaluate = partial(_evaluate, rule, cost=self._cost, periods_per_year=self._periods_per_year, grid=grid)
+        workers = min(self._max_workers or os.cpu_count(), len(self._symbols))
+        if workers == 1:
+            results = evaluate(self._data)
+        else:
+            try:
+                pickle.dumps(rule)
+            except (pickle.PicklingError, AttributeError, TypeError) as error:
+                raise Exception(f'The rule {rule!r} cannot be sent to the process pool, define it at module '
+                                f'level or use max_workers=1') from error
+            columns = np.array_split(np.arange(len(self._symbols)), workers)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunks = list(executor.map(evaluate, [{name: values[:, cols] for name, values in self._data.items()}
+                                                      for cols in columns]))
+            results = [{metric: np.concatenate([chunk[i][metric] for chunk in chunks]) for metric in chunks[0][i]}
+                       for i in range(len(grid))]
+        frames = [pd.DataFrame(result, index=pd.Index(self._symbols, name="symbol")).assign(**params)
+                  for params, result in zip(grid, results)]
+        return pd.concat(frames).reset_index().set_index(list(grid[0]) + ["symbol"])
@@ -1,22 +1,84 @@
+import time
 from abc import ABCMeta, abstractmethod
 from typing import Union
 
-from authlib.integrations.requests_client import OAuth2Session
-from requests import Response
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from models.security import *
+from rate_limit import RateLimiter
+from cache import ResponseCache
+from decoding import codec
+from instrumentation import Instrumentation, RequestRecord
+from singleflight import SingleFlight
+
+
+class RequestError(Exception):
+    """
+    A request the server did not answer successfully, even after the retries
+    """
 
 
 class BaseClient(metaclass=ABCMeta):
     base_url = None
+    # server errors retried with an exponential backoff
+    retry_statuses = (500, 502, 503, 504)
+
+    def __init__(self, pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.3,
+                 rate_limiter: RateLimiter = None, cache: ResponseCache = None,
+                 instrumentation: Instrumentation = None, single_flight: SingleFlight = None):
+        self._pool_size = pool_size
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._rate_limiter = rate_limiter
+        self._cache = cache
+        self._instrumentation = instrumentation
+        self._single_flight = single_flight
+        self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     @property
     def credentials(self):
         raise NotImplementedError
 
     @property
-    @abstractmethod
-    def session(self):
-        raise NotImplementedError
+    def session(self) -> Session:
+        """
+
+        Returns
+        -------
+            Session
+                the long-lived session, its connections are kept alive and reused across requests
+        """
+        if self._session is None:
+            self._session = self._mount_adapters(Session())
+        return self._session
+
+    def _mount_adapters(self, session: Session) -> Session:
+        retries = Retry(
+            total=self._max_retries,
+            backoff_factor=self._backoff_factor,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=False,
+            # the last response is handed back once the retries are exhausted, _handle_response raises on it
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=self._pool_size, pool_maxsize=self._pool_size, max_retries=retries)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
     @abstractmethod
     def _get_url(self, route):
@@ -27,24 +89,101 @@ class BaseClient(metaclass=ABCMeta):
     def headers(self):
         raise NotImplementedError
 
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter
+
+    @property
+    def cache(self) -> ResponseCache:
+        return self._cache
+
+    @property
+    def instrumentation(self) -> Instrumentation:
+        return self._instrumentation
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        return self._single_flight
+
+    @staticmethod
+    def _decode(status: int, url, body: bytes):
+        """
+        Returns
+        -------
+            the decoded body of a successful response, raises RequestError otherwise
+        """
+        if status == 200 or status == 201:
+            return codec.decode(body)
+        elif status == 429:
+            raise RequestError(f'Rate limit still exceeded after retries on {url}')
+        raise RequestError(f'Request failed with status {status} on {url} : '
+                           f'{body[:200].decode(errors="replace")}')
+
     @staticmethod
     def _handle_response(response: Response):
-        if response.status_code == 200 or response.status_code == 201:
-            return response.json()
-        else:
-            print(response.json())
+        return BaseClient._decode(response.status_code, response.url, response.content)
 
     def _get(self, route, **kwargs):
+        record = RequestRecord(route, kwargs.get('params'))
+        if self.instrumentation is not None:
+            self.instrumentation.before(route, record.params)
+        try:
+            return self._send(route, record, **kwargs)
+        except Exception as error:
+            record.error = f'{type(error).__name__}: {error}'
+            raise
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.after(record)
+
+    def _send(self, route, record: RequestRecord, **kwargs):
+        """
+        Serves the response from the cache, otherwise identical requests in flight at the same time share one
+        fetch through `single_flight`, keyed on the route and normalized params
+        """
+        if self.cache is not None:
+            started = time.perf_counter()
+            cached = self.cache.get(route, record.params, self.base_url)
+            if cached is not None:
+                record.cache_hit, record.parse_seconds = True, time.perf_counter() - started
+                return cached
+        if self.single_flight is None:
+            return self._fetch(route, record, **kwargs)
+        result, record.coalesced = self.single_flight.do(ResponseCache.key(route, record.params, self.base_url),
+                                                         lambda: self._fetch(route, record, **kwargs))
+        return result
+
+    def _fetch(self, route, record: RequestRecord, **kwargs):
         url = self._get_url(route)
-        response = self.session.get(url, headers=self.headers, proxies=self.proxy, **kwargs)
-        return self._handle_response(response)
+        for _ in range(self._max_retries + 1):
+            record.attempts += 1
+            if self.rate_limiter is not None:
+                started = time.perf_counter()
+                self.rate_limiter.acquire()
+                record.wait_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+            response = self.session.get(url, headers=self.headers, proxies=self.proxy, **kwargs)
+            record.network_seconds += time.perf_counter() - started
+            record.retries += len(getattr(getattr(response.raw, 'retries', None), 'history', None) or ())
+            if self.rate_limiter is not None:
+                self.rate_limiter.observe(response.status_code, response.headers)
+            if response.status_code != 429 or self.rate_limiter is None:
+                break
+        record.retries += record.attempts - 1
+        record.status, record.bytes = response.status_code, len(response.content)
+        started = time.perf_counter()
+        result = self._handle_response(response)
+        record.parse_seconds = time.perf_counter() - started
+        if self.cache is not None:
+            self.cache.set(route, record.params, result, self.base_url)
+        return result
 
 
 class Client(BaseClient):
 
-    def __init__(self):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
         self._credentials = None
-        pass
 
     @property
     def credentials(self) -> Union[ClientCredentials, PasswordCredentials]:
@@ -59,73 +198,13 @@ class Client(BaseClient):
     def headers(self):
         raise NotImplementedError
 
-    @property
-    def session(self):
-        raise NotImplementedError
-
     def _get_url(self, url):
         return self.base_url + url
 
 
-class OAuth2Client(Client):
-    __token_uri = None
-
-    def __init__(self, credentials: Union[ClientCredentials, PasswordCredentials]):
-        super().__init__()
-        self.credentials = credentials
-
-    @property
-    def headers(self):
-        """
-        Must be implement in subclasses to feed request headers
-        Returns
-        -------
-
-        """
-        raise NotImplementedError
-
-    @property
-    def token_uri(self):
-        """
-
-        Returns
-        -------
-            str
-                the url for token request
-        """
-        return self.base_url + self.__token_uri
-
-    @property
-    def session(self) -> OAuth2Session:
-        """
-
-        Returns
-        -------
-            OAuth2Session
-                the session with the fetch token to process http requests
-        """
-        _session = None
-
-        if not issubclass(type(self.credentials), Credentials):
-            raise TypeError(f'credentials should be an instance of subclasses from type Credentials')
-
-        _session = OAuth2Session(
-            self.credentials.client_id,
-            self.credentials.client_secret,
-            scope=[scope.value for scope in self.credentials.scope]
-
-        )
-
-        if isinstance(self.credentials, ClientCredentials):
-            _session.fetch_token(url=self.token_uri)
-
-        if isinstance(self.credentials, PasswordCredentials):
-            _session.fetch_token(
-                url=self.token_uri,
-                username=self.credentials.password,
-                password=self.credentials.password
-            )
-        return _session
-
-
-
+def __getattr__(name: str):
+    # the OAuth2 support lives in oauth so that authlib is only imported by the clients that need it
+    if name in ("OAuth2Client", "TokenCache"):
+        import oauth
+        return getattr(oauth, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,110 @@
+"""
+Measures the cold import time of every module in a fresh interpreter and which heavy dependencies it loads.
+
+    python -m benchmarks.imports --repeat 5 --output imports.json
+    python -m benchmarks.imports --baseline imports.json --tolerance 0.2
+
+The headless modules must not load the front end nor pandas, numpy and authlib until they are used,
+the run fails when one of them does or when an import grows past tolerance over --baseline.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["pandas", "numpy", "pyarrow", "streamlit", "plotly", "authlib", "aiohttp"]
+MODULES = {
+    "finnhub_client": [],
+    "finnhub_api": [],
+    "base": [],
+    "models.finnhub": [],
+    "indicators": [],
+    "candle_store": [],
+    "trading_calendar": [],
+    "go_plotly": [],
+    "oauth": ["authlib"],
+    "async_finnhub_client": ["aiohttp"],
+    "main": None,
+}
+
+_PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(elapsed, ",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure(module: str, repeat: int) -> dict:
+    """
+    Returns
+    -------
+        dict
+            the median and fastest import time in ms over `repeat` fresh interpreters and the heavy modules loaded
+    """
+    samples, loaded = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _PROBE.format(root=ROOT, module=module, heavy=HEAVY)],
+                                capture_output=True, text=True, check=True, cwd=ROOT).stdout.split()
+        samples.append(float(output[0]) * 1000)
+        loaded = output[1].split(",") if len(output) > 1 else []
+    return {"p50_ms": statistics.median(samples), "min_ms": float(min(samples)), "loaded": loaded}
+
+
+def check(results: Dict[str, dict], baseline: dict = None, tolerance: float = 0.2) -> List[str]:
+    """
+    Returns
+    -------
+        list
+            the modules loading heavy dependencies they are not allowed, or slower than `baseline` past `tolerance`
+    """
+    failures = []
+    for module, result in results.items():
+        allowed = MODULES.get(module)
+        if allowed is not None:
+            failures += [f"{module} imports {name}" for name in result["loaded"] if name not in allowed]
+        previous = (baseline or {}).get(module)
+        if previous and result["p50_ms"] > previous["p50_ms"] * (1 + tolerance):
+            failures.append(f'{module}: {previous["p50_ms"]:.1f} -> {result["p50_ms"]:.1f} ms')
+    return failures
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the import time of the package modules")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modules", nargs="*", help="only these modules, every one by default")
+    parser.add_argument("--output", help="JSON file, printed when omitted")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for module in args.modules or MODULES:
+        results[module] = measure(module, args.repeat)
+        print(f'{module}: {results[module]["p50_ms"]:.1f} ms {" ".join(results[module]["loaded"])}',
+              file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    failures = check(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f'Regression {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import json
+import os
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+WEEK = 7 * 86400
+
+
+class MockFinnhubServer:
+    """
+    Local stand-in for the Finnhub REST API replaying the JSON responses recorded in `fixtures`.
+    Candle and indicator bars are moved forward by whole weeks so that the recording ends within the last week,
+    then cut to the requested from/to. Every response waits `latency` plus up to `jitter` seconds and fails with
+    `error_status` at `error_rate`. `connections` counts the TCP connections clients opened.
+    """
+
+    def __init__(self, fixtures: str = FIXTURES, latency: float = 0., jitter: float = 0., error_rate: float = 0.,
+                 error_status: int = 500, port: int = 0, seed: int = None):
+        self._fixtures = {name[:-len(".json")]: self._load(os.path.join(fixtures, name))
+                          for name in os.listdir(fixtures) if name.endswith(".json")}
+        self._latency = latency
+        self._jitter = jitter
+        self._error_rate = error_rate
+        self._error_status = error_status
+        self._port = port
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self._server = None
+        self._thread = None
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @staticmethod
+    def _load(path: str):
+        with open(path) as file:
+            response = json.load(file)
+        if isinstance(response, dict) and isinstance(response.get("t"), list) and response["t"]:
+            shift = (time.time() - response["t"][-1]) // WEEK * WEEK
+            response["t"] = [int(t + shift) for t in response["t"]]
+        return response
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> 'MockFinnhubServer':
+        if self._server is None:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self._port), _Handler)
+            self._server.daemon_threads = True
+            self._server.mock = self
+            self._thread = Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset(self):
+        with self._lock:
+            self.requests, self.errors, self.connections = 0, 0, 0
+
+    @staticmethod
+    def _fixture_name(route: str, params: dict) -> str:
+        if route == "/stock/candle":
+            return f"stock_candle_{params.get('resolution')}"
+        if route == "/indicator":
+            return f"indicator_{params.get('indicator')}"
+        return route.strip("/").replace("/", "_")
+
+    @staticmethod
+    def _window(response: dict, _from: int, to: int) -> dict:
+        keep = [i for i, t in enumerate(response["t"]) if _from <= t <= to]
+        if not keep:
+            return {"s": "no_data"}
+        window = {key: [values[i] for i in keep] if isinstance(values, list) else values
+                  for key, values in response.items()}
+        window["s"] = "ok"
+        return window
+
+    def respond(self, route: str, params: dict) -> Tuple[int, Union[dict, list]]:
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self._error_rate
+            if failed:
+                self.errors += 1
+            delay = self._latency + self._random.uniform(0, self._jitter)
+        time.sleep(delay)
+        if failed:
+            return self._error_status, {"error": "Injected failure"}
+        response = self._fixtures.get(self._fixture_name(route, params))
+        if response is None:
+            return 404, {"error": f"No fixture recorded for {route}"}
+        symbol = params.get("symbol")
+        if isinstance(response, dict) and isinstance(response.get("t"), list) and "from" in params:
+            response = self._window(response, int(params["from"]), int(params["to"]))
+        elif route == "/stock/metric":
+            response = dict(response, symbol=symbol)
+        elif route == "/stock/peers":
+            response = list(dict.fromkeys([symbol] + response[1:]))
+        return 200, response
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.mock._lock:
+            self.server.mock.connections += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        route = url.path[len("/api/v1"):] if url.path.startswith("/api/v1") else url.path
+        status, response = self.server.mock.respond(route, params)
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
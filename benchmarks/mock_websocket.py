@@ -0,0 +1,72 @@
+import asyncio
+import json
+import os
+from threading import Event, Thread
+from typing import List
+
+import websockets
+
+from benchmarks.mock_server import FIXTURES
+
+TRADES = os.path.join(FIXTURES, "trades.jsonl")
+
+
+class MockTradesServer:
+    """
+    Local stand-in for the Finnhub trades websocket replaying recorded frames, one raw frame per line of
+    `fixture` and sent as is so that malformed ones can be replayed too. Every connection first receives the
+    frames once the client subscribed, then stays open, or is closed after them with `close_after_replay`.
+    """
+
+    def __init__(self, fixture: str = TRADES, port: int = 0, close_after_replay: bool = False):
+        with open(fixture) as file:
+            self.frames: List[str] = [line.rstrip("\n") for line in file if line.strip()]
+        self._port = port
+        self._close_after_replay = close_after_replay
+        self._loop = None
+        self._thread = None
+        self._stop = None
+        self._ready = Event()
+        self.connections = 0
+        self.subscriptions: List[dict] = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self._port}"
+
+    def start(self) -> 'MockTradesServer':
+        if self._thread is None:
+            self._ready.clear()
+            self._thread = Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+            self._thread.start()
+            self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join()
+            self._thread = None
+
+    async def _serve(self):
+        self._loop, self._stop = asyncio.get_running_loop(), asyncio.Event()
+        async with websockets.serve(self._handle, "127.0.0.1", self._port) as server:
+            self._port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    async def _handle(self, websocket):
+        self.connections += 1
+        self.subscriptions.append(json.loads(await websocket.recv()))
+        for frame in self.frames:
+            await websocket.send(frame)
+        if self._close_after_replay:
+            return
+        async for message in websocket:
+            self.subscriptions.append(json.loads(message))
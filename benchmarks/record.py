@@ -0,0 +1,130 @@
+"""
+Writes the fixtures replayed by MockFinnhubServer.
+
+    python -m benchmarks.record --api-key <key> [--symbol AAPL]    records the live API responses
+    python -m benchmarks.record --synthetic                        writes deterministic responses shaped like them
+
+The committed fixtures are the synthetic ones, so that benchmark runs compare against the same data.
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from benchmarks.mock_server import FIXTURES
+from date import Date
+
+END = datetime(2024, 12, 31, tzinfo=timezone.utc)
+
+
+def routes(symbol: str, end: datetime) -> dict:
+    daily_from, daily_to = Date.datetime_to_timestamp(end - timedelta(days=2 * 365), end)
+    intraday_from, intraday_to = Date.datetime_to_timestamp(end - timedelta(days=28), end)
+    return {
+        "quote": ("/quote", {"symbol": symbol}),
+        "stock_candle_D": ("/stock/candle", {"symbol": symbol, "resolution": "D", "from": daily_from,
+                                             "to": daily_to}),
+        "stock_candle_5": ("/stock/candle", {"symbol": symbol, "resolution": "5", "from": intraday_from,
+                                             "to": intraday_to}),
+        "indicator_sma": ("/indicator", {"symbol": symbol, "resolution": "D", "from": daily_from, "to": daily_to,
+                                         "indicator": "sma", "timeperiod": 20}),
+        "company-news": ("/company-news", {"symbol": symbol, "from": (end - timedelta(days=5)).strftime("%Y-%m-%d"),
+                                           "to": end.strftime("%Y-%m-%d")}),
+        "stock_peers": ("/stock/peers", {"symbol": symbol}),
+        "stock_metric": ("/stock/metric", {"symbol": symbol, "metric": "all"}),
+        "stock_insider-transactions": ("/stock/insider-transactions", {"symbol": symbol}),
+        "stock_recommendation": ("/stock/recommendation", {"symbol": symbol}),
+        "stock_earnings": ("/stock/earnings", {"symbol": symbol}),
+        "stock_social-sentiment": ("/stock/social-sentiment", {"symbol": symbol,
+                                                               "from": (end - timedelta(days=30)).strftime("%Y-%m-%d"),
+                                                               "to": end.strftime("%Y-%m-%d")}),
+    }
+
+
+def _write(output: str, name: str, response):
+    os.makedirs(output, exist_ok=True)
+    with open(os.path.join(output, name + ".json"), "w") as file:
+        json.dump(response, file, separators=(",", ":"))
+
+
+def record(api_key: str, symbol: str = "AAPL", output: str = FIXTURES):
+    from finnhub_client import FinnhubClient
+
+    with FinnhubClient(api_key) as client:
+        for name, (route, params) in routes(symbol, datetime.now(timezone.utc)).items():
+            _write(output, name, client._get(route, params=params))
+
+
+def _candles(random: np.random.Generator, timestamps: list, price: float, volatility: float) -> dict:
+    close = price * np.cumprod(1 + random.normal(0.0003, volatility, len(timestamps)))
+    spread = close * np.abs(random.normal(0, volatility, len(timestamps)))
+    open_ = np.concatenate([[price], close[:-1]])
+    return {"c": np.round(close, 2).tolist(), "h": np.round(np.maximum(open_, close) + spread, 2).tolist(),
+            "l": np.round(np.minimum(open_, close) - spread, 2).tolist(), "o": np.round(open_, 2).tolist(),
+            "s": "ok", "t": timestamps, "v": random.integers(10 ** 5, 10 ** 7, len(timestamps)).tolist()}
+
+
+def synthetic(output: str = FIXTURES, seed: int = 0, end: datetime = END):
+    random = np.random.default_rng(seed)
+    days = [day for day in (end - timedelta(days=i) for i in range(2 * 365, -1, -1)) if day.weekday() < 5]
+    daily = _candles(random, [int(day.replace(hour=0, minute=0).timestamp()) for day in days], 150., 0.015)
+    sessions = [day.replace(hour=14, minute=30) for day in days[-20:]]
+    intraday = _candles(random, [int((session + timedelta(minutes=5 * i)).timestamp())
+                                 for session in sessions for i in range(78)], daily["c"][-21], 0.002)
+    close = np.array(daily["c"])
+    sma = np.concatenate([np.zeros(19), np.convolve(close, np.ones(20) / 20, mode="valid")])
+    mentions = [{"atTime": (end - timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"), "mention": 10 + i,
+                 "positiveScore": 0.7, "negativeScore": -0.4, "positiveMention": 8, "negativeMention": 2,
+                 "score": 0.3} for i in range(200)]
+
+    def period(months: int) -> str:
+        return (end - timedelta(days=30 * months)).strftime("%Y-%m-01")
+
+    responses = {
+        "quote": {"c": close[-1], "d": round(close[-1] - close[-2], 2),
+                  "dp": round((close[-1] / close[-2] - 1) * 100, 4), "h": daily["h"][-1], "l": daily["l"][-1],
+                  "o": daily["o"][-1], "pc": close[-2], "t": daily["t"][-1]},
+        "stock_candle_D": daily,
+        "stock_candle_5": intraday,
+        "indicator_sma": dict(daily, sma=np.round(sma, 4).tolist()),
+        "company-news": [{"category": "company", "datetime": daily["t"][-1] - 3600 * i, "headline": f"Headline {i}",
+                          "id": 1000 + i, "image": "", "related": "AAPL", "source": "Source",
+                          "summary": "Summary", "url": f"https://example.com/news/{i}"} for i in range(100)],
+        "stock_peers": ["AAPL", "MSFT", "GOOG", "AMZN", "META", "NVDA", "ORCL", "IBM", "INTC", "CSCO"],
+        "stock_metric": {"metric": {"10DayAverageTradingVolume": 60.5, "52WeekHigh": round(close.max(), 2),
+                                    "52WeekLow": round(close.min(), 2), "52WeekPriceReturnDaily": 12.3,
+                                    "beta": 1.21, "marketCapitalization": 2850000,
+                                    "peBasicExclExtraTTM": 28.4, "priceRelativeToS&P50052Week": -3.1,
+                                    "dividendYieldIndicatedAnnual": 0.52, "epsGrowthTTMYoy": 8.7,
+                                    "netProfitMarginTTM": 25.3, "roeTTM": 147.2, "currentRatioQuarterly": 0.98},
+                         "metricType": "all", "series": {}, "symbol": "AAPL"},
+        "stock_insider-transactions": {"data": [{"name": f"Insider {i}", "share": 10 ** 5 - 100 * i,
+                                                 "change": -100 * (i + 1), "filingDate": period(i % 12),
+                                                 "transactionDate": period(i % 12),
+                                                 "transactionCode": "S", "transactionPrice": 150. + i % 10}
+                                                for i in range(100)], "symbol": "AAPL"},
+        "stock_recommendation": [{"buy": 24, "hold": 7, "period": period(i), "sell": 0, "strongBuy": 13,
+                                  "strongSell": 0, "symbol": "AAPL"} for i in range(12)],
+        "stock_earnings": [{"actual": 1.2 + i / 10, "estimate": 1.15 + i / 10, "period": period(3 * i),
+                            "surprise": 0.05, "surprisePercent": 4.3, "symbol": "AAPL"} for i in range(4)],
+        "stock_social-sentiment": {"reddit": mentions, "twitter": mentions, "symbol": "AAPL"},
+    }
+    for name, response in responses.items():
+        _write(output, name, response)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Writes the benchmark fixtures")
+    parser.add_argument("--api-key")
+    parser.add_argument("--symbol", default="AAPL")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--output", default=FIXTURES)
+    args = parser.parse_args()
+    if args.synthetic:
+        synthetic(args.output)
+    elif args.api_key:
+        record(args.api_key, args.symbol, args.output)
+    else:
+        parser.error("either --api-key or --synthetic is required")
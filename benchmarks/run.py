@@ -0,0 +1,229 @@
+"""
+Replays the recorded fixtures through a local MockFinnhubServer and measures every FinnhubClient method and a full
+StreamFin page load: latency percentiles, throughput, injected failures and peak traced memory.
+
+    python -m benchmarks.run --repeat 20 --latency 0.02 --error-rate 0.01 --output bench.json
+    python -m benchmarks.run --output new.json --baseline bench.json --tolerance 0.2
+
+Results are written as JSON, with --baseline the run fails when a latency or memory figure grows past tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.mock_server import FIXTURES, MockFinnhubServer
+from date import Date
+from finnhub_client import FinnhubClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYMBOLS = ["AAPL", "MSFT", "GOOG", "AMZN"]
+
+
+def cases() -> Dict[str, Callable]:
+    end = datetime.fromordinal(Date.nearest_business_day_end(date.today()).toordinal())
+    start = end - timedelta(days=365)
+    intraday = end - timedelta(days=10)
+    _from, to = Date.datetime_to_timestamp(start, end)
+    return {
+        "get_quote": lambda client: client.get_quote("AAPL"),
+        "get_quotes": lambda client: client.get_quotes(SYMBOLS),
+        "get_stock_candles_D": lambda client: client.get_stock_candles("AAPL", "D", start, end),
+        "get_stock_candles_5": lambda client: client.get_stock_candles("AAPL", "5", intraday, end),
+        "get_stock_close": lambda client: client.get_stock_close("AAPL", "D", start, end),
+        "get_candles_panel": lambda client: client.get_candles_panel(SYMBOLS, "D", start, end),
+        "get_technical_indicator": lambda client: client.get_technical_indicator("AAPL", "D", _from, to, "sma",
+                                                                                 {"timeperiod": 20}),
+        "get_multiple_technical_indicator": lambda client: client.get_multiple_technical_indicator("AAPL", "D", start,
+                                                                                                   end),
+        "get_company_news": lambda client: client.get_company_news("AAPL"),
+        "get_company_basic_financials": lambda client: client.get_company_basic_financials("AAPL"),
+        "get_peers_basic_financials": lambda client: client.get_peers_basic_financials("AAPL"),
+        "get_stock_insider_transactions": lambda client: client.get_stock_insider_transactions("AAPL"),
+        "get_recommendation_trends": lambda client: client.get_recommendation_trends("AAPL"),
+        "get_company_earnings": lambda client: client.get_company_earnings("AAPL"),
+        "get_stock_social_sentiment": lambda client: client.get_stock_social_sentiment("AAPL", start, end),
+    }
+
+
+def _summary(samples: List[float]) -> dict:
+    if not samples:
+        return {}
+    samples = np.array(samples) * 1000
+    return {"mean_ms": float(samples.mean()), "p50_ms": float(np.percentile(samples, 50)),
+            "p95_ms": float(np.percentile(samples, 95)), "max_ms": float(samples.max())}
+
+
+def _peak_memory(run: Callable) -> float:
+    tracemalloc.start()
+    try:
+        run()
+    except Exception:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def measure(server: MockFinnhubServer, call: Callable, repeat: int, concurrency: int) -> dict:
+    """
+    Times `repeat` cold calls, each on a new client without cache, `concurrency` of them at once
+    """
+    def timed(_):
+        with FinnhubClient("benchmark", base_url=server.url, max_retries=2, calls_per_second=10 ** 6,
+                           calls_per_minute=10 ** 8) as client:
+            started = time.perf_counter()
+            try:
+                call(client)
+                return time.perf_counter() - started, None
+            except Exception as error:
+                return time.perf_counter() - started, f'{type(error).__name__}: {error}'
+
+    def cold():
+        with FinnhubClient("benchmark", base_url=server.url, calls_per_second=10 ** 6,
+                           calls_per_minute=10 ** 8) as client:
+            call(client)
+
+    server.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(repeat)))
+    elapsed = time.perf_counter() - started
+    requests, injected = server.requests, server.errors
+    errors = [error for _, error in results if error is not None]
+    return {"calls": repeat, "failed": len(errors), "errors": sorted(set(errors))[:5],
+            "latency": _summary([duration for duration, error in results if error is None]),
+            "throughput_per_s": repeat / elapsed, "requests_per_call": requests / repeat,
+            "injected_failures": injected, "peak_memory_kb": _peak_memory(cold)}
+
+
+def _app(root: str, url: str):
+    import sys
+    sys.path.insert(0, root)
+    from main import StreamFin
+    StreamFin("benchmark", base_url=url).main()
+
+
+def page_load(server: MockFinnhubServer, repeat: int, timeout: float = 120) -> dict:
+    """
+    Times the StreamFin script run by run as a user opens the page then asks for the quantitative and the
+    fundamental data, starting every repeat with empty Streamlit caches
+    """
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    steps = ["open", "Get Quantitative Data", "Get Fundamental Data"]
+
+    def load():
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        app = AppTest.from_function(_app, args=(ROOT, server.url), default_timeout=timeout)
+        durations, exceptions = {}, []
+        for step in steps:
+            started = time.perf_counter()
+            if step == "open":
+                app.run()
+            else:
+                next(button for button in app.button if button.label == step).click().run()
+            durations[step] = time.perf_counter() - started
+            exceptions += [exception.value for exception in app.exception]
+        return durations, exceptions + [error.value for error in app.error]
+
+    server.reset()
+    runs = [load() for _ in range(repeat)]
+    return {"loads": repeat, "requests_per_load": server.requests / repeat,
+            "steps": {step: _summary([durations[step] for durations, _ in runs]) for step in steps},
+            "total": _summary([sum(durations.values()) for durations, _ in runs]),
+            "errors": sorted({str(error) for _, errors in runs for error in errors})[:5],
+            "peak_memory_kb": _peak_memory(load)}
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Returns
+    -------
+        list
+            the figures of `results` worse than `baseline` by more than `tolerance`, relatively
+    """
+    def figures(run: dict) -> dict:
+        values = {}
+        for name, method in run.get("methods", {}).items():
+            values[f"{name}.p50_ms"] = method["latency"].get("p50_ms")
+            values[f"{name}.peak_memory_kb"] = method["peak_memory_kb"]
+        if run.get("page_load"):
+            values["page_load.p50_ms"] = run["page_load"]["total"].get("p50_ms")
+            values["page_load.peak_memory_kb"] = run["page_load"]["peak_memory_kb"]
+        return values
+
+    current, previous = figures(results), figures(baseline)
+    return [f"{name}: {previous[name]:.1f} -> {value:.1f}" for name, value in current.items()
+            if value is not None and previous.get(name) and value > previous[name] * (1 + tolerance)]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks FinnhubClient and the StreamFin page against fixtures")
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.)
+    parser.add_argument("--jitter", type=float, default=0.)
+    parser.add_argument("--error-rate", type=float, default=0.)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--methods", nargs="*", help="only these methods, every one by default")
+    parser.add_argument("--page-loads", type=int, default=3, help="0 skips the page load")
+    parser.add_argument("--output", help="JSON file, printed when omitted")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = {"meta": {"created": datetime.now().isoformat(timespec="seconds"), "commit": _commit(),
+                        "python": platform.python_version(), "platform": platform.platform(),
+                        "config": {key: value for key, value in vars(args).items()
+                                   if key not in ("output", "baseline")}},
+               "methods": {}}
+    with MockFinnhubServer(args.fixtures, args.latency, args.jitter, args.error_rate, args.error_status,
+                           seed=0) as server:
+        for name, call in cases().items():
+            if not args.methods or name in args.methods:
+                results["methods"][name] = measure(server, call, args.repeat, args.concurrency)
+                print(f'{name}: {results["methods"][name]["latency"].get("p50_ms", float("nan")):.1f} ms',
+                      file=sys.stderr)
+        if args.page_loads:
+            results["page_load"] = page_load(server, args.page_loads)
+            print(f'page load: {results["page_load"]["total"].get("p50_ms", float("nan")):.1f} ms',
+                  file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'Regression {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock, local
+from typing import Tuple, Union
+
+from decoding import codec
+
+
+class LRUCache:
+    def __init__(self, max_size: int = 512):
+        self._max_size = max_size
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Union[str, None]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, prefix: str = ''):
+        with self._lock:
+            for key in [key for key in self._items if key.startswith(prefix)]:
+                del self._items[key]
+
+
+class DiskCache:
+    """
+    SQLite backed tier, the WAL journal lets several processes share the same file
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = local()
+        with self._connection as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS responses "
+                               "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, 'connection', None) is None:
+            self._local.connection = sqlite3.connect(self._path, timeout=30)
+            self._local.connection.execute("PRAGMA journal_mode=WAL")
+        return self._local.connection
+
+    def get(self, key: str) -> Union[Tuple[str, float], None]:
+        row = self._connection.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row
+
+    def set(self, key: str, value: str, expires_at: float):
+        with self._connection as connection:
+            connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, value, expires_at))
+
+    def delete(self, prefix: str = ''):
+        with self._connection as connection:
+            connection.execute("DELETE FROM responses WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+            connection.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+
+
+def user_cache_dir() -> str:
+    """
+    Returns
+    -------
+        str
+            the directory of this user's caches, %LOCALAPPDATA% on Windows and $XDG_CACHE_HOME or ~/.cache elsewhere
+    """
+    if os.name == "nt":
+        root = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    else:
+        root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "finnhub")
+
+
+class ResponseCache:
+    """
+    Two tier cache of decoded JSON responses keyed on the route, its normalized params and the server answering them.
+    Lookups go through the in-memory LRU first then through the on-disk tier, which promotes its hits.
+    The disk tier defaults to a file of the user's cache directory.
+    """
+    ttl = {
+        "/quote": 5,
+        "/stock/candle": 60,
+        "/indicator": 60,
+        "/company-news": 15 * 60,
+        "/stock/social-sentiment": 15 * 60,
+        "/stock/insider-transactions": 60 * 60,
+        "/stock/metric": 6 * 60 * 60,
+        "/stock/recommendation": 6 * 60 * 60,
+        "/stock/earnings": 6 * 60 * 60,
+        "/stock/peers": 24 * 60 * 60,
+    }
+
+    def __init__(self, path: str = os.path.join(user_cache_dir(), "responses.sqlite"),
+                 max_size: int = 512, ttl: dict = None, default_ttl: float = 60):
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._memory = LRUCache(max_size)
+        self._disk = DiskCache(path) if path is not None else None
+        self.ttl = {**self.ttl, **(ttl or {})}
+        self._default_ttl = default_ttl
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = Lock()
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    @staticmethod
+    def key(route: str, params: dict = None, base_url: str = None) -> str:
+        params = {key: str(value) for key, value in (params or {}).items() if value is not None}
+        return route + "?" + json.dumps(params, sort_keys=True, separators=(",", ":")) + "#" + (base_url or "")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, route: str, params: dict = None, base_url: str = None):
+        key = self.key(route, params, base_url)
+        value = self._memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return codec.loads(value)
+        row = self._disk.get(key) if self._disk is not None else None
+        if row is not None:
+            self._count("disk_hits")
+            self._memory.set(key, *row)
+            return codec.loads(row[0])
+        self._count("misses")
+        return None
+
+    def set(self, route: str, params: dict, response, base_url: str = None):
+        ttl = self.ttl.get(route, self._default_ttl)
+        if response is None or not ttl:
+            return
+        key, value, expires_at = self.key(route, params, base_url), codec.dumps(response), time.time() + ttl
+        self._memory.set(key, value, expires_at)
+        if self._disk is not None:
+            self._disk.set(key, value, expires_at)
+
+    def invalidate(self, route: str = None, params: dict = None, base_url: str = None):
+        """
+        Drops one response when `params` is given, every response of `route` otherwise, everything without `route`.
+        Responses of every server are dropped unless `base_url` names one along with the params
+        """
+        if route is None:
+            prefix = ""
+        elif params is None:
+            prefix = route + "?"
+        else:
+            prefix = self.key(route, params, base_url)
+            prefix = prefix if base_url is not None else prefix[:-1]
+        self._memory.delete(prefix)
+        if self._disk is not None:
+            self._disk.delete(prefix)
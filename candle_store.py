@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from threading import Lock
+from typing import List, Tuple
+
+from date import Date
+from lazy import LazyModule
+from market_store import MarketStore
+
+pd = LazyModule("pandas")
+
+
+class CandleStore:
+    """
+    Keeps the candles already fetched per (symbol, resolution) together with the timestamp ranges they cover,
+    so that a request only needs the sub-ranges still missing. With a MarketStore backend both survive restarts.
+    """
+    fields = ['c', 'h', 'l', 'o', 'v']
+    bar_seconds = {"1": 60, "5": 300, "15": 900, "30": 1800, "60": 3600, "D": 86400, "W": 7 * 86400,
+                   "M": 31 * 86400}
+
+    def __init__(self, backend: MarketStore = None):
+        self._backend = backend
+        self._candles = {}
+        self._coverage = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _merge(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    @staticmethod
+    def _has_business_day(start: int, end: int) -> bool:
+        first = Date.next_business_day(datetime.fromtimestamp(start).date())
+        last = Date.nearest_business_day_end(datetime.fromtimestamp(end).date())
+        return first <= last
+
+    def _load_coverage(self, symbol: str, resolution: str) -> List[Tuple[int, int]]:
+        if self._backend is not None:
+            self._coverage[(symbol, resolution)] = self._backend.read_coverage(symbol, resolution)
+        return self._coverage.get((symbol, resolution), [])
+
+    def coverage(self, symbol: str, resolution: str) -> List[Tuple[int, int]]:
+        with self._lock:
+            return list(self._load_coverage(symbol, resolution))
+
+    def missing(self, symbol: str, resolution: str, _from: int, to: int) -> List[Tuple[int, int]]:
+        """
+        Returns
+        -------
+            list
+                the (from, to) timestamp ranges of [_from, to] not covered yet, ranges made only of weekend days
+                are skipped as they hold no bar
+        """
+        gaps, start = [], _from
+        for covered_start, covered_end in self.coverage(symbol, resolution):
+            if covered_end < start:
+                continue
+            if covered_start > to:
+                break
+            if covered_start > start:
+                gaps.append((start, covered_start - 1))
+            start = covered_end + 1
+        if start <= to:
+            gaps.append((start, to))
+        return [(start, end) for start, end in gaps if self._has_business_day(start, end)]
+
+    def add(self, symbol: str, resolution: str, _from: int, to: int, payload: dict):
+        """
+        Stores the /stock/candle response of [_from, to], a failed request (None) leaves the range uncovered so
+        that it is requested again
+        """
+        if payload is None:
+            return
+        key = (symbol, resolution)
+        bar_seconds = self.bar_seconds.get(resolution, 0)
+        recent = to > time.time() - bar_seconds
+        covered_to = min(to, int(time.time()) - bar_seconds) if recent else to
+        with self._lock:
+            if payload.get('s') == 'ok':
+                df = pd.DataFrame({field: payload[field] for field in self.fields}, index=payload['t'])
+                if self._backend is not None:
+                    self._backend.write("candles", symbol, resolution, df.rename_axis('t').reset_index())
+                else:
+                    if key in self._candles:
+                        df = pd.concat([self._candles[key], df])
+                        df = df[~df.index.duplicated(keep='last')]
+                    self._candles[key] = df.sort_index()
+                if recent:
+                    covered_to = min(to, int(payload['t'][-1]) - 1)
+            if covered_to >= _from:
+                if self._backend is not None:
+                    self._coverage[key] = self._backend.update_coverage(
+                        symbol, resolution, lambda coverage: self._merge(coverage + [(_from, covered_to)]))
+                else:
+                    self._coverage[key] = self._merge(self._coverage.get(key, []) + [(_from, covered_to)])
+
+    def payload(self, symbol: str, resolution: str, _from: int, to: int) -> dict:
+        """
+        Returns
+        -------
+            dict
+                the stored candles between _from and to, shaped like a /stock/candle response
+        """
+        if self._backend is not None:
+            df = self._backend.read("candles", symbol, resolution, _from, to)
+            df = df.set_index('t') if not df.empty else df
+        else:
+            with self._lock:
+                df = self._candles.get((symbol, resolution))
+                if df is None:
+                    return {'s': 'no_data'}
+                df = df[(df.index >= _from) & (df.index <= to)]
+        if df.empty:
+            return {'s': 'no_data'}
+        payload = {field: df[field].tolist() for field in self.fields}
+        payload['t'] = df.index.tolist()
+        payload['s'] = 'ok'
+        return payload
+
+    def clear(self, symbol: str = None, resolution: str = None):
+        with self._lock:
+            for key in [key for key in self._candles.keys() | self._coverage.keys()
+                        if symbol in (None, key[0]) and resolution in (None, key[1])]:
+                self._candles.pop(key, None)
+                self._coverage.pop(key, None)
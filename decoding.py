@@ -0,0 +1,50 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class JSONCodec:
+    """
+    Decodes response bodies and encodes cached responses with the fastest JSON library installed,
+    orjson then msgspec, falling back on the standard library
+    """
+    backends = ("orjson", "msgspec", "json")
+
+    def __init__(self, backend: str = None):
+        available = [name for name in self.backends if name == "json" or globals()[name] is not None]
+        if backend is None:
+            backend = available[0]
+        elif backend not in available:
+            raise Exception(f'JSON backend {backend} is not installed, available: {", ".join(available)}')
+        self.backend = backend
+        if backend == "orjson":
+            self.loads, self._dumps = orjson.loads, orjson.dumps
+        elif backend == "msgspec":
+            self.loads, self._dumps = msgspec.json.decode, msgspec.json.encode
+        else:
+            self.loads, self._dumps = json.loads, None
+
+    def dumps(self, value: Any) -> str:
+        if self._dumps is None:
+            return json.dumps(value, separators=(",", ":"))
+        return self._dumps(value).decode()
+
+    def decode(self, body: Union[bytes, str]) -> Any:
+        """
+        Returns
+        -------
+            the response body parsed straight from its raw bytes, None when it is empty
+        """
+        return self.loads(body) if body else None
+
+
+codec = JSONCodec()
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Callable, List, NamedTuple, Tuple, Union
+
+from date import Date
+from trading_calendar import TradingCalendar
+from cache import LRUCache, ResponseCache
+from candle_store import CandleStore
+from market_store import MarketStore
+from indicators import Indicators
+from lazy import LazyModule
+
+from models.finnhub import *
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+logger = logging.getLogger(__name__)
+
+
+class Request(NamedTuple):
+    """
+    One call to the API, `parse` turns its decoded response into what the client method returns
+    """
+    route: str
+    params: dict
+    parse: Callable = lambda response: response
+
+
+class FinnhubAPI:
+    """
+    What FinnhubClient and AsyncFinnhubClient share: the request of every endpoint and the parsing of its
+    response, the candle windows and stores, the peers memo and the per-symbol failures.
+    The clients only implement the transport, sending a Request and running several of them concurrently.
+    """
+    base_url = "https://finnhub.io/api/v1"
+    # longest range in days one /stock/candle request is trusted to return in full, per intraday resolution
+    candle_window_days = {"1": 7, "5": 30, "15": 90, "30": 180, "60": 365}
+    # peers and financials kept by _memoized
+    memo_size = 256
+
+    def __init__(self, api_key: str = None, proxy: str = None, candle_store: CandleStore = None,
+                 market_store: MarketStore = None, base_url: str = None):
+        if base_url is not None:
+            self.base_url = base_url
+        self._api_key = api_key
+        self._proxy = proxy
+        self._market_store = market_store
+        self._candle_store = candle_store if candle_store is not None or market_store is None \
+            else CandleStore(market_store)
+        self._memo = LRUCache(self.memo_size)
+        # the last error of every symbol whose request failed in _map_symbols, until it succeeds again
+        self.failures = {}
+
+    @property
+    def api_key(self):
+        return self._api_key
+
+    @property
+    def candle_store(self) -> CandleStore:
+        return self._candle_store
+
+    @property
+    def market_store(self) -> MarketStore:
+        return self._market_store
+
+    @property
+    def headers(self) -> dict:
+        headers = {"X-Finnhub-Token": self.api_key, "Accepts": "application/json"}
+        return {key: value for key, value in headers.items() if value is not None}
+
+    def _get_url(self, route: str) -> str:
+        return self.base_url + route
+
+    @staticmethod
+    def _collect(results: dict, failures: dict) -> dict:
+        """
+        Returns
+        -------
+            dict
+                the results but the failed or empty ones, the errors are logged and recorded in `failures`
+        """
+        for symbol, result in results.items():
+            if isinstance(result, Exception):
+                failures[symbol] = result
+                logger.warning("%s : %s", symbol, result)
+            else:
+                failures.pop(symbol, None)
+        return {symbol: result for symbol, result in results.items()
+                if result is not None and not isinstance(result, Exception)}
+
+    @staticmethod
+    def _concat(frames, **kwargs) -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                `frames` concatenated, an empty frame when there is none as when every symbol failed
+        """
+        return pd.concat(frames, **kwargs) if len(frames) else pd.DataFrame()
+
+    @staticmethod
+    def _merge_two_dicts(first: dict, second: dict) -> dict:
+        result = first.copy()
+        result.update(second)
+        return result
+
+    @staticmethod
+    def _quote_request(symbol: str) -> Request:
+        return Request("/quote", {"symbol": symbol}, lambda response: Quote.get(**response))
+
+    def _candles_request(self, symbol: str, resolution: str, _from: int, to: int) -> Request:
+        """
+        Returns
+        -------
+            Request
+                the raw /stock/candle payload of [_from, to], added to the candle store once received
+        """
+        def parse(payload):
+            if self.candle_store is not None:
+                self.candle_store.add(symbol, resolution, _from, to, payload)
+            return payload
+
+        return Request("/stock/candle", {"symbol": symbol, "resolution": resolution, "from": _from, "to": to},
+                       parse)
+
+    @staticmethod
+    def _split_range(_from: int, to: int, days: int = None) -> List[Tuple[int, int]]:
+        if days is None:
+            return [(_from, to)]
+        size = days * 86400
+        return [(start, min(start + size - 1, to)) for start in range(_from, to + 1, size)]
+
+    @staticmethod
+    def _stitch(payloads: List[dict]) -> dict:
+        """
+        Returns
+        -------
+            dict
+                the candles of `payloads` as one /stock/candle response sorted by time, a bar served twice keeps its
+                last version
+        """
+        payloads = [payload for payload in payloads if payload is not None and payload.get('s') == 'ok']
+        if not payloads:
+            return {'s': 'no_data'}
+        if len(payloads) == 1:
+            return payloads[0]
+        t = np.concatenate([payload['t'] for payload in payloads])
+        _, last = np.unique(t[::-1], return_index=True)
+        keep = len(t) - 1 - last
+        response = {field: np.concatenate([payload[field] for payload in payloads])[keep]
+                    for field in CandleStore.fields}
+        response['t'], response['s'] = t[keep], 'ok'
+        return response
+
+    def candle_windows(self, symbol: str, resolution: str, _from: int, to: int) -> List[Tuple[int, int]]:
+        """
+        Returns
+        -------
+            list
+                the (from, to) timestamp ranges get_stock_candles requests for [_from, to], the gaps of the candle
+                store split into windows of `candle_window_days`
+        """
+        gaps = [(_from, to)] if self.candle_store is None else self.candle_store.missing(symbol, resolution, _from, to)
+        days = self.candle_window_days.get(resolution)
+        return [window for start, end in gaps for window in self._split_range(start, end, days)]
+
+    def _stored_candles(self, symbol: str, resolution: str, _from: int, to: int) -> Union[pd.DataFrame, None]:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                the candles of the range the candle store already holds, None when it holds none
+        """
+        if self.candle_store is not None and self.candle_store.coverage(symbol, resolution):
+            stored = self.candle_store.payload(symbol, resolution, _from, to)
+            if stored.get('s') == 'ok':
+                return Candles.get(**stored)
+
+    @staticmethod
+    def _window_candles(payload: dict) -> Union[pd.DataFrame, None]:
+        if payload is not None and payload.get('s') == 'ok':
+            return Candles.get(**payload)
+
+    def _range_candles(self, symbol: str, resolution: str, _from: int, to: int, payloads: List[dict]) \
+            -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                the candles of the range out of the payloads of its windows, or of the candle store which they
+                were added to
+        """
+        if self.candle_store is None:
+            response = self._stitch(payloads)
+        else:
+            response = self.candle_store.payload(symbol, resolution, _from, to)
+        return Candles.get(**response)
+
+    def _indicator_request(self, symbol: str, resolution: str, _from: int, to: int, indicator: str,
+                           indicator_fields: dict) -> Request:
+        params = self._merge_two_dicts({
+            "symbol": symbol,
+            "resolution": resolution,
+            "from": _from,
+            "to": to,
+            "indicator": indicator
+        }, indicator_fields)
+        return Request("/indicator", params,
+                       lambda response: TechnicalIndic(**response).get(indicator_fields.get('timeperiod')))
+
+    @staticmethod
+    def _warmup_start(_from: datetime, resolution: str, indicators: list, time_indicators: list) -> datetime:
+        lookback = max(Indicators.lookback[indic](int(time)) for indic, time in zip(indicators, time_indicators))
+        return TradingCalendar.nyse().warmup_start(_from, resolution, lookback)
+
+    @staticmethod
+    def _drop_close(df_multiple_indic: pd.DataFrame) -> pd.DataFrame:
+        if -1 < df_multiple_indic.mean().min() < 1: df_multiple_indic.drop('close', axis=1, inplace=True)
+        return df_multiple_indic
+
+    def _compute_indicators(self, symbol: str, resolution: str, df_candles: pd.DataFrame, indicators: list,
+                            time_indicators: list) -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                the indicators computed over the candles from their first complete row on, written to the market
+                store
+        """
+        df_multiple_indic = Indicators.compute(df_candles, indicators, time_indicators)
+        complete = df_multiple_indic.notna().all(axis=1)
+        df_multiple_indic = df_multiple_indic.iloc[complete.argmax() if complete.any() else len(complete):]
+        if self.market_store is not None:
+            self.market_store.write_indicators(symbol, resolution, df_multiple_indic.drop(columns='close'))
+        return self._drop_close(df_multiple_indic)
+
+    def _indicator_requests(self, symbol: str, resolution: str, _from: datetime, to: datetime, indicators: list,
+                            time_indicators: list) -> List[Request]:
+        requests = []
+        for indic, time in zip(indicators, time_indicators):
+            lookback = Indicators.lookback[indic](int(time)) if Indicators.supports(indic) else int(time)
+            start_ti_shift = TradingCalendar.nyse().warmup_start(_from, resolution, lookback)
+            start_ti, end_ti = Date.datetime_to_timestamp(start_ti_shift, to)
+            requests.append(self._indicator_request(symbol, resolution, start_ti, end_ti, indic,
+                                                    {"timeperiod": time}))
+        return requests
+
+    @staticmethod
+    def _merge_indicators(list_df_indic: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                the indicators served by /indicator side by side with the close, from the first bar every one of
+                them is warmed up on
+        """
+        close = [df_tech_indic.pop('c') for df_tech_indic in list_df_indic][-1]
+        df_multiple_indic = pd.concat(list_df_indic + [close.to_frame('close')], join='inner', axis=1)
+        warmup = np.where(df_multiple_indic == 0)[0]
+        df_multiple_indic = df_multiple_indic.iloc[warmup.max() + 1 if len(warmup) else 0:]
+        return FinnhubAPI._drop_close(df_multiple_indic)
+
+    @staticmethod
+    def _indicators_difference(local: pd.DataFrame, remote: pd.DataFrame) -> pd.DataFrame:
+        columns = remote.columns.intersection(local.columns)
+        return local[columns].sub(remote[columns]).dropna()
+
+    @staticmethod
+    def _news_request(symbol: str, time=5, nb=10) -> Request:
+        _from, to = Date.datetime_to_str(datetime.today() - timedelta(days=5), datetime.today())
+        params = {
+            "symbol": symbol,
+            "from": _from,
+            "to": to
+        }
+        return Request("/company-news", params, lambda response: News.get_list(response, time, nb))
+
+    @staticmethod
+    def _peers_request(symbol: str) -> Request:
+        return Request("/stock/peers", {"symbol": symbol})
+
+    def _financials_request(self, symbol: str, metric: str = 'all') -> Request:
+        def parse(response):
+            df_financials = Financials.get(**response)
+            if self.market_store is not None:
+                self.market_store.write_fundamentals(symbol, df_financials)
+            return df_financials
+
+        return Request("/stock/metric", {"symbol": symbol, "metric": metric}, parse)
+
+    def _ttl(self, route: str) -> float:
+        return (self.cache.ttl if self.cache is not None else ResponseCache.ttl).get(route, 0)
+
+    def _stored_fundamentals(self, symbol: str, metric: str = 'all') -> Union[pd.DataFrame, None]:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                the latest snapshot of the market store when it was taken within the lifetime the client cache
+                gives to /stock/metric, None when it has to be fetched
+        """
+        if self.market_store is None or metric != 'all':
+            return None
+        df = self.market_store.read_fundamentals(symbol, datetime.now() - timedelta(seconds=self._ttl("/stock/metric")))
+        return df.iloc[[-1]].set_axis([symbol]) if not df.empty else None
+
+    def _memo_get(self, route: str, key: tuple):
+        return self._memo.get(route + repr(key))
+
+    def _memo_set(self, route: str, key: tuple, value):
+        """
+        Keeps `value` for the lifetime the client cache gives to `route`, in an LRU of `memo_size` entries safe to
+        share across threads, so that peer comparisons reuse the peers and financials already fetched
+        """
+        ttl = self._ttl(route)
+        if value is not None and ttl:
+            self._memo.set(route + repr(key), value, time.time() + ttl)
+        return value
+
+    @staticmethod
+    def _next_level(peer_lists: dict, seen: list) -> list:
+        """
+        Returns
+        -------
+            list
+                the peers of `peer_lists` not `seen` yet, which are added to it
+        """
+        level = [peer for peers in peer_lists.values() for peer in peers if peer not in seen]
+        level = list(dict.fromkeys(level))
+        seen.extend(level)
+        return level
+
+    @staticmethod
+    def _compare_peers(peers: list, max_peers: int = None) -> bool:
+        """
+        Returns
+        -------
+            bool
+                whether the peers' financials are fetched next to the symbol's, always when `max_peers` asked for
+                a given number of them, otherwise only when there are more than two
+        """
+        return max_peers is not None or len(peers) > 2
+
+    @staticmethod
+    def _insiders_request(symbol: str, _from=None, to=None, nb=10) -> Request:
+        params = {
+            "symbol": symbol,
+            "from": _from,
+            "to": to
+        }
+        return Request("/stock/insider-transactions", params,
+                       lambda response: Insiders.get_list(response.get('data'), nb))
+
+    @staticmethod
+    def _recommendation_request(symbol: str) -> Request:
+        return Request("/stock/recommendation", {"symbol": symbol}, Reco.get_list)
+
+    @staticmethod
+    def _earnings_request(symbol: str, limit=None) -> Request:
+        return Request("/stock/earnings", {"symbol": symbol, "limit": limit}, Earns.get_list)
+
+    @staticmethod
+    def _sentiment_request(symbol: str, _from=None, to=None, nb=10) -> Request:
+        _from, to = Date.datetime_to_str(_from, to)
+        params = {
+            "symbol": symbol,
+            "from": _from,
+            "to": to
+        }
+        return Request("/stock/social-sentiment", params,
+                       lambda response: (Sentiment.get_list(response.get('reddit'), nb),
+                                         Sentiment.get_list(response.get('twitter'), nb)))
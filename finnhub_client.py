@@ -1,61 +1,116 @@
+from __future__ import annotations
+
 from abc import ABC
-from typing import List, Union
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Tuple, Union
 
 from date import Date
 from base import BaseClient
-from requests import Session
+from rate_limit import RateLimiter
+from cache import ResponseCache
+from candle_store import CandleStore
+from market_store import MarketStore
+from indicators import Indicators
+from instrumentation import Instrumentation
+from singleflight import SingleFlight
+from finnhub_api import FinnhubAPI, Request
+from lazy import LazyModule
 
 from models.finnhub import *
 
+pd = LazyModule("pandas")
 
-class FinnhubClient(BaseClient, ABC):
-    base_url = "https://finnhub.io/api/v1"
 
-    def __init__(self, api_key: str = None, proxy: str = None):
-        self._api_key = api_key
-        self._proxy = proxy
+class FinnhubClient(FinnhubAPI, BaseClient, ABC):
 
-    @property
-    def api_key(self):
-        return self._api_key
+    def __init__(self, api_key: str = None, proxy: str = None, pool_size: int = 10, max_retries: int = 3,
+                 backoff_factor: float = 0.3, calls_per_second: float = 30, calls_per_minute: float = 60,
+                 cache: ResponseCache = None, candle_store: CandleStore = None, max_workers: int = None,
+                 market_store: MarketStore = None, base_url: str = None, instrumentation: Instrumentation = None,
+                 single_flight: SingleFlight = None):
+        FinnhubAPI.__init__(self, api_key=api_key, proxy=proxy, candle_store=candle_store,
+                            market_store=market_store, base_url=base_url)
+        BaseClient.__init__(self, pool_size=pool_size, max_retries=max_retries, backoff_factor=backoff_factor,
+                            rate_limiter=RateLimiter.shared(self.base_url, calls_per_second=calls_per_second,
+                                                            calls_per_minute=calls_per_minute),
+                            cache=cache, instrumentation=instrumentation,
+                            single_flight=single_flight if single_flight is not None else SingleFlight())
+        self._max_workers = max_workers if max_workers is not None else pool_size
 
     @property
     def proxy(self):
         return self._proxy if self._proxy is None else {self._proxy}
 
-    @property
-    def session(self):
-        return Session()
-
-    def _get_url(self, route: str) -> str:
-        return self.base_url + route
-
-    @property
-    def headers(self) -> dict:
-        return {"X-Finnhub-Token": self.api_key, "Accepts": "application/json"}
-
-    @staticmethod
-    def _merge_two_dicts(first: dict, second: dict) -> dict:
-        result = first.copy()
-        result.update(second)
-        return result
+    def close(self):
+        super().close()
+        self._memo.delete()
+
+    def _call(self, request: Request):
+        return request.parse(self._get(request.route, params=request.params))
+
+    def _map_symbols(self, fetch: Callable, symbols: List[str], *args) -> dict:
+        """
+        Runs `fetch` concurrently once per distinct symbol, symbols whose request fails are logged, recorded in
+        `failures` and skipped
+        Returns
+        -------
+            dict
+                the results keyed by symbol, in the order symbols were first given
+        """
+        def _fetch(symbol):
+            try:
+                return fetch(symbol, *args)
+            except Exception as error:
+                return error
+
+        symbols = list(dict.fromkeys(symbols))
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            results = dict(zip(symbols, executor.map(_fetch, symbols)))
+        return self._collect(results, self.failures)
 
     def get_quote(self, symbol: str) -> pd.DataFrame:
-        params = {"symbol": symbol}
-        response = self._get("/quote", params=params)
-        return Quote.get(**response)
+        return self._call(self._quote_request(symbol))
+
+    def _iter_candles(self, symbol: str, resolution: str, windows: List[Tuple[int, int]]) -> Iterator[dict]:
+        """
+        Requests the windows concurrently under the rate limiter and yields each response as it arrives, once
+        added to the candle store
+        """
+        def fetch(window):
+            return self._call(self._candles_request(symbol, resolution, *window))
+
+        if len(windows) == 1:
+            yield fetch(windows[0])
+            return
+        executor = ThreadPoolExecutor(max_workers=min(self._max_workers, len(windows)))
+        try:
+            for future in as_completed([executor.submit(fetch, window) for window in windows]):
+                yield future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def iter_stock_candles(self, symbol: str, resolution: str, _from: datetime, to: datetime) \
+            -> Iterator[pd.DataFrame]:
+        """
+        Yields the candles of the range piece by piece so that they can be shown before the whole range is in:
+        first what the candle store already holds, then every window as its request completes, in no particular
+        order. Concatenated and sorted, the pieces make get_stock_candles.
+        """
+        _from, to = Date.datetime_to_timestamp(_from, to)
+        windows = self.candle_windows(symbol, resolution, _from, to)
+        stored = self._stored_candles(symbol, resolution, _from, to)
+        if stored is not None:
+            yield stored
+        for payload in self._iter_candles(symbol, resolution, windows) if windows else []:
+            df_candles = self._window_candles(payload)
+            if df_candles is not None:
+                yield df_candles
 
     def get_stock_candles(self, symbol: str, resolution: str, _from: datetime, to: datetime) -> pd.DataFrame:
         _from, to = Date.datetime_to_timestamp(_from, to)
-        params = {
-            "symbol": symbol,
-            "resolution": resolution,
-            "from": _from,
-            "to": to
-        }
-        response = self._get("/stock/candle", params=params)
-        return Candles.get(**response)
+        windows = self.candle_windows(symbol, resolution, _from, to)
+        payloads = list(self._iter_candles(symbol, resolution, windows)) if windows else []
+        return self._range_candles(symbol, resolution, _from, to, payloads)
 
     def get_stock_close(self, symbol: str, resolution: str, _from: datetime, to: datetime) -> pd.Series:
         df_candles = self.get_stock_candles(symbol, resolution, _from, to)
@@ -64,104 +119,114 @@ class FinnhubClient(BaseClient, ABC):
     def get_technical_indicator(self, symbol: str, resolution: str, _from: datetime, to: datetime, indicator: str,
                                 indicator_fields: dict) \
             -> Union[pd.DataFrame, pd.Series]:
-        params = self._merge_two_dicts({
-            "symbol": symbol,
-            "resolution": resolution,
-            "from": _from,
-            "to": to,
-            "indicator": indicator
-        }, indicator_fields)
-        response = self._get("/indicator", params=params)
-        return TechnicalIndic(**response).get(indicator_fields.get('timeperiod'))
+        return self._call(self._indicator_request(symbol, resolution, _from, to, indicator, indicator_fields))
+
+    def compute_multiple_technical_indicator(self, symbol: str, resolution: str, _from: datetime, to: datetime,
+                                             indicators: list = ['sma', 'sma', 'bbands'],
+                                             time_indicators: list = [20, 60, 20]) -> pd.DataFrame:
+        start = self._warmup_start(_from, resolution, indicators, time_indicators)
+        df_candles = self.get_stock_candles(symbol, resolution, start, to)
+        return self._compute_indicators(symbol, resolution, df_candles, indicators, time_indicators)
+
+    def check_technical_indicator(self, symbol: str, resolution: str, _from: datetime, to: datetime, indicator: str,
+                                  time: int) -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                the difference between the locally computed indicator and the one served by /indicator
+        """
+        local = self.compute_multiple_technical_indicator(symbol, resolution, _from, to, [indicator], [time])
+        remote = self.get_multiple_technical_indicator(symbol, resolution, _from, to, [indicator], [time],
+                                                       local=False)
+        return self._indicators_difference(local, remote)
 
     def get_multiple_technical_indicator(self, symbol: str, resolution: str, _from: datetime, to: datetime,
                                          indicators: list = ['sma', 'sma', 'bbands'],
-                                         time_indicators: list = [20, 60, 20]) -> pd.DataFrame:
-        list_df_indic = []
-        for indic, time in zip(indicators, time_indicators):
-            start_ti_shift = _from - timedelta(days=Date.from_business(int(time)))
-            start_ti, end_ti = Date.datetime_to_timestamp(start_ti_shift, to)
-            df_tech_indic = self.get_technical_indicator(symbol, resolution, start_ti,
-                                                         end_ti, indic,
-                                                         {"timeperiod": time})
-            close = df_tech_indic.pop('c')
-            list_df_indic.append(df_tech_indic)
-        list_df_indic.append(close.to_frame('close'))
-        df_multiple_indic = pd.concat(list_df_indic, join='inner', axis=1)
-        df_multiple_indic = df_multiple_indic.iloc[np.max(np.where(df_multiple_indic == 0)[0]) + 1:]
-        if -1 < df_multiple_indic.mean().min() < 1: df_multiple_indic.drop('close', axis=1, inplace=True)
-        return df_multiple_indic
+                                         time_indicators: list = [20, 60, 20], local: bool = True) -> pd.DataFrame:
+        if local and all(Indicators.supports(indic) for indic in indicators):
+            return self.compute_multiple_technical_indicator(symbol, resolution, _from, to, indicators,
+                                                             time_indicators)
+        requests = self._indicator_requests(symbol, resolution, _from, to, indicators, time_indicators)
+        return self._merge_indicators([self._call(request) for request in requests])
 
     def get_company_news(self, symbol: str, time=5, nb=10) -> pd.DataFrame:
-        _from, to = Date.datetime_to_str(datetime.today() - timedelta(days=5), datetime.today())
-        params = {
-            "symbol": symbol,
-            "from": _from,
-            "to": to
-        }
-        response = self._get("/company-news", params=params)
-        return pd.concat(list(map(lambda item: News.get(time, **item), response[0:nb])))
+        return self._call(self._news_request(symbol, time, nb))
 
     def get_company_peers(self, symbol: str) -> list:
-        params = {"symbol": symbol}
-        return self._get("/stock/peers", params=params)
+        return self._call(self._peers_request(symbol))
 
     def get_company_basic_financials(self, symbol: str, metric: str = 'all') -> pd.DataFrame:
-        params = {
-            "symbol": symbol,
-            "metric": metric
-        }
-        response = self._get("/stock/metric", params=params)
-        return Financials.get(**response)
-
-    def get_peers_basic_financials(self, symbol: str, metric: str = 'all') -> pd.DataFrame:
-        data = self.get_company_basic_financials(symbol, metric)
-        symbol = data.index
-        peers = self.get_company_peers(symbol)
-        peers.remove(symbol)
-        if len(peers) > 2:
-            list_df_peers = [data]
-            for peer in peers:
-                list_df_peers.append(self.get_company_basic_financials(peer, metric))
-            return pd.concat(list_df_peers)
+        stored = self._stored_fundamentals(symbol, metric)
+        return stored if stored is not None else self._call(self._financials_request(symbol, metric))
+
+    def _memoized(self, route: str, key: tuple, fetch: Callable):
+        value = self._memo_get(route, key)
+        return value if value is not None else self._memo_set(route, key, fetch())
+
+    def _peer_financials(self, symbol: str, metric: str) -> pd.DataFrame:
+        return self._memoized("/stock/metric", (symbol, metric),
+                              lambda: self.get_company_basic_financials(symbol, metric))
+
+    def _peers(self, symbol: str) -> list:
+        return self._memoized("/stock/peers", (symbol,), lambda: self.get_company_peers(symbol))
+
+    def get_peer_graph(self, symbol: str, depth: int = 1, max_peers: int = None) -> list:
+        """
+        Returns
+        -------
+            list
+                the peers of `symbol` up to `depth` hops away, closest first, without `symbol` itself
+        """
+        seen, level = [symbol], [symbol]
+        for _ in range(depth):
+            if max_peers is not None and len(seen) > max_peers:
+                break
+            level = self._next_level(self._map_symbols(self._peers, level), seen)
+        return seen[1:] if max_peers is None else seen[1:max_peers + 1]
+
+    def get_peers_basic_financials(self, symbol: str, metric: str = 'all', max_peers: int = None,
+                                   depth: int = 1) -> pd.DataFrame:
+        peers = self.get_peer_graph(symbol, depth, max_peers)
+        if self._compare_peers(peers, max_peers):
+            financials = self._map_symbols(self._peer_financials, [symbol] + peers, metric)
+            return self._concat(financials.values())
         else:
-            return data
+            return self._peer_financials(symbol, metric).copy()
 
     def get_stock_insider_transactions(self, symbol: str, _from=None, to=None, nb=10) -> pd.DataFrame:
-        params = {
-            "symbol": symbol,
-            "from": _from,
-            "to": to
-        }
-        response = self._get("/stock/insider-transactions", params=params)
-        return pd.concat(list(map(lambda item: Insiders.get(**item), response.get('data')))).iloc[0:nb]
+        return self._call(self._insiders_request(symbol, _from, to, nb))
 
     def get_recommendation_trends(self, symbol: str) -> pd.DataFrame:
-        params = {"symbol": symbol}
-        response = self._get("/stock/recommendation", params=params)
-        return pd.concat(list(map(lambda item: Reco.get(**item), response)))
+        return self._call(self._recommendation_request(symbol))
 
     def get_company_earnings(self, symbol: str, limit=None) -> pd.DataFrame:
-        params = {
-            "symbol": symbol,
-            "limit": limit
-        }
-        response = self._get("/stock/earnings", params=params)
-        return pd.concat(list(map(lambda item: Earns.get(**item), response)))
+        return self._call(self._earnings_request(symbol, limit))
 
     def get_stock_social_sentiment(self, symbol: str, _from=None, to=None, nb=10) -> pd.DataFrame:
-        _from, to = Date.datetime_to_str(_from, to)
-        params = {
-            "symbol": symbol,
-            "from": _from,
-            "to": to
-        }
-        response = self._get("/stock/social-sentiment", params=params)
-        df_reddit = pd.concat(
-            list(map(lambda item: Sentiment.get(**item), response.get('reddit')))[0:nb])
-        df_twitter = pd.concat(
-            list(map(lambda item: Sentiment.get(**item), response.get('twitter')))[0:nb])
-        return df_reddit, df_twitter
+        return self._call(self._sentiment_request(symbol, _from, to, nb))
+
+    def get_quotes(self, symbols: List[str]) -> pd.DataFrame:
+        quotes = self._map_symbols(self.get_quote, symbols)
+        return self._concat([df_quote.set_axis([symbol]) for symbol, df_quote in quotes.items()])
+
+    def get_candles_panel(self, symbols: List[str], resolution: str, _from: datetime, to: datetime,
+                          field: str = None) -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                the candles of every symbol with (symbol, field) columns, or one column per symbol when `field`
+                is given
+        """
+        candles = self._map_symbols(self.get_stock_candles, symbols, resolution, _from, to)
+        if field is not None:
+            return self._concat({symbol: df_candles[field] for symbol, df_candles in candles.items()}, axis=1)
+        return self._concat(candles, axis=1)
+
+    def get_basic_financials(self, symbols: List[str], metric: str = 'all') -> pd.DataFrame:
+        financials = self._map_symbols(self.get_company_basic_financials, symbols, metric)
+        return self._concat(financials.values())
 
 
 if __name__ == '__main__':
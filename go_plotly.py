@@ -1,13 +1,29 @@
-import pandas as pd
-import streamlit as st
-from plotly import graph_objs as go
+from __future__ import annotations
+
+from typing import Tuple, Union
+
+from instrumentation import timed
+from lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+st = LazyModule("streamlit")
+go = LazyModule("plotly.graph_objs")
+subplots = LazyModule("plotly.subplots")
 
 
 class Graph:
+    width = 700
+    max_points = 2 * width
+    webgl_threshold = 5000
+    candle_fields = ["open", "high", "low", "close", "volume"]
+    overlays = {"sma", "ema", "wma", "tema", "trima", "kama", "mama", "fama", "upperband", "middleband",
+                "lowerband", "midpoint", "midprice"}
+
     @staticmethod
     def params_fig(fig) -> go.Figure:
         fig.update_layout(
-            width=700,
+            width=Graph.width,
             height=400,
             margin=dict(l=0, r=0, t=0, b=0, pad=0),
             legend=dict(
@@ -20,10 +36,87 @@ class Graph:
             template="plotly_dark")
         return fig
 
+    @staticmethod
+    def _abscissa(index: pd.Index) -> np.ndarray:
+        if isinstance(index, pd.DatetimeIndex):
+            return index.asi8.astype(float)
+        if pd.api.types.is_numeric_dtype(index):
+            return index.to_numpy(dtype=float)
+        return np.arange(len(index), dtype=float)
+
+    @staticmethod
+    def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+        """
+        Largest-Triangle-Three-Buckets
+        Returns
+        -------
+            np.ndarray
+                the positions of the `n_out` points keeping the visual shape of the line
+        """
+        n = len(y)
+        if n_out >= n or n_out < 3:
+            return np.arange(n)
+        edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+        selected = np.empty(n_out, dtype=int)
+        selected[0], selected[-1] = 0, n - 1
+        for i in range(n_out - 2):
+            start, end = edges[i], edges[i + 1]
+            following_end = edges[i + 2] if i + 2 < len(edges) else n
+            x_mean, y_mean = x[end:following_end].mean(), y[end:following_end].mean()
+            x_prev, y_prev = x[selected[i]], y[selected[i]]
+            area = np.abs((x_prev - x_mean) * (y[start:end] - y_prev) - (x_prev - x[start:end]) * (y_mean - y_prev))
+            selected[i + 1] = start + np.argmax(area)
+        return selected
+
+    @staticmethod
+    def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+        """
+        Returns
+        -------
+            np.ndarray
+                the positions of the minimum and maximum of `n_out` / 2 equal buckets, with both end points
+        """
+        n = len(y)
+        if n_out >= n or n_out < 4:
+            return np.arange(n)
+        size = -(-n // (n_out // 2))
+        buckets = np.pad(y, (0, -n % size), constant_values=np.nan).reshape(-1, size)
+        offsets = np.arange(len(buckets)) * size
+        selected = np.concatenate([[0, n - 1], offsets + np.nanargmin(buckets, axis=1),
+                                   offsets + np.nanargmax(buckets, axis=1)])
+        return np.unique(selected)
+
+    @staticmethod
+    def downsample(serie: pd.Series, n_out: int = None, method: str = "lttb") -> pd.Series:
+        """
+        Returns
+        -------
+            pd.Series
+                at most `n_out` points of `serie`, twice the figure width by default and every point for 0,
+                picked by LTTB or min/max buckets, missing values are dropped
+        """
+        n_out = Graph.max_points if n_out is None else n_out
+        serie = serie.dropna()
+        if not n_out or len(serie) <= n_out:
+            return serie
+        y = serie.to_numpy(dtype=float)
+        if method == "lttb":
+            positions = Graph.lttb(Graph._abscissa(serie.index), y, n_out)
+        elif method == "minmax":
+            positions = Graph.minmax(y, n_out)
+        else:
+            raise Exception(f'Unknown downsampling method {method}, use lttb or minmax')
+        return serie.iloc[positions]
+
     @staticmethod
     def add_feature(fig, data: pd.DataFrame = None, y_data: pd.Series = None, symbol: str = None) -> go.Figure:
+        """
+        Draws the line with WebGL past `webgl_threshold` points, which only a zoomed range or `max_points` = 0
+        reach since lines are otherwise downsampled to `max_points`
+        """
+        trace = go.Scattergl if len(y_data) > Graph.webgl_threshold else go.Scatter
         fig.add_trace(
-            go.Scatter(
+            trace(
                 x=data.index,
                 y=y_data,
                 mode="lines",
@@ -33,24 +126,139 @@ class Graph:
         return fig
 
     @staticmethod
-    def plot_line_data(data=None, field=None) -> go.Figure:
+    def _selected_range(key: str) -> Union[Tuple, None]:
+        state = st.session_state.get(key)
+        if not state:
+            return None
+        boxes = state.get("selection", {}).get("box", [])
+        if not boxes or len(boxes[0].get("x", [])) != 2:
+            return None
+        return tuple(boxes[0]["x"])
+
+    @staticmethod
+    def _zoom(data, key: str):
+        selected = Graph._selected_range(key)
+        if selected is None:
+            return data, False
+        if isinstance(data.index, pd.DatetimeIndex):
+            selected = tuple(pd.Timestamp(value) for value in selected)
+        selected = tuple(sorted(selected))
+        return data.loc[selected[0]:selected[1]], True
+
+    @staticmethod
+    @timed("plot_seconds")
+    def plot_line_data(data=None, field=None, key: str = None, max_points: int = None,
+                       method: str = "lttb") -> go.Figure:
+        """
+        Lines are downsampled to `max_points`.
+        With a `key`, a box selection re-draws every point of the selected range, with WebGL past
+        `webgl_threshold` of them, and a double-click goes back to the whole range.
+        """
+        zoomed = False
+        if key is not None:
+            data, zoomed = Graph._zoom(data, key)
+        if zoomed:
+            max_points = 0
         fig = go.Figure()
         if field is None:
             if type(data) == pd.Series:
-                fig = Graph.add_feature(fig, data, data)
+                y_data = Graph.downsample(data, max_points, method)
+                fig = Graph.add_feature(fig, y_data, y_data)
             else:
                 field = list(data.columns)
                 for _ in field:
-                    y_data = data[_]
-                    fig = Graph.add_feature(fig, data, y_data, _)
+                    y_data = Graph.downsample(data[_], max_points, method)
+                    fig = Graph.add_feature(fig, y_data, y_data, _)
         else:
-            fig = Graph.add_feature(fig, data, data[field])
+            y_data = Graph.downsample(data[field], max_points, method)
+            fig = Graph.add_feature(fig, y_data, y_data)
         fig = Graph.params_fig(fig)
         fig.update_layout(xaxis_rangeslider_visible=True)
-        st.plotly_chart(fig)
+        Graph._show(fig, key, zoomed, "Select a range to draw every one of its points")
+
+    @staticmethod
+    def _show(fig: go.Figure, key: str = None, zoomed: bool = False, hint: str = "Select a range to zoom in"):
+        if key is None:
+            st.plotly_chart(fig)
+        else:
+            fig.update_layout(dragmode="select")
+            st.plotly_chart(fig, key=key, on_select="rerun", selection_mode="box")
+            st.caption("Zoomed on the selected range, double-click to reset" if zoomed else hint)
+
+    @staticmethod
+    def resample_candles(data: pd.DataFrame, n_out: int = None) -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                at most `n_out` bars, the figure width by default and every bar for 0, each merging consecutive
+                bars into their open, high, low, close and summed volume, other columns keep their last value
+        """
+        n_out = Graph.width if n_out is None else n_out
+        if not n_out or len(data) <= n_out:
+            return data
+        size = -(-len(data) // n_out)
+        aggregations = {column: "last" for column in data.columns}
+        aggregations.update({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+        resampled = data.groupby(np.arange(len(data)) // size).agg(
+            {column: aggregation for column, aggregation in aggregations.items() if column in data.columns})
+        resampled.index = data.index[::size]
+        return resampled
 
     @staticmethod
+    def candles_figure(data: pd.DataFrame) -> go.Figure:
+        """
+        Candlestick with the price-scaled indicators overlaid, volume below and the oscillators in a last row,
+        all sharing the x-axis
+        """
+        indicators = [column for column in data.columns if column not in Graph.candle_fields]
+        overlays = [column for column in indicators if str(column).rsplit('_', 1)[0] in Graph.overlays]
+        oscillators = [column for column in indicators if column not in overlays]
+        heights = [0.6, 0.2, 0.2] if oscillators else [0.75, 0.25]
+        fig = subplots.make_subplots(rows=len(heights), cols=1, shared_xaxes=True, vertical_spacing=0.02,
+                                     row_heights=heights)
+        fig.add_trace(go.Candlestick(x=data.index, open=data["open"], high=data["high"], low=data["low"],
+                                     close=data["close"], name="candles"), row=1, col=1)
+        for column in overlays:
+            fig.add_trace(go.Scatter(x=data.index, y=data[column], mode="lines", name=column), row=1, col=1)
+        fig.add_trace(go.Bar(x=data.index, y=data["volume"], name="volume", showlegend=False,
+                             marker_color=np.where(data["close"] >= data["open"], "#26a69a", "#ef5350")),
+                      row=2, col=1)
+        for column in oscillators:
+            fig.add_trace(go.Scatter(x=data.index, y=data[column], mode="lines", name=column), row=3, col=1)
+        fig = Graph.params_fig(fig)
+        fig.update_layout(height=600, xaxis_rangeslider_visible=False)
+        return fig
+
+    @staticmethod
+    @timed("plot_seconds")
+    def plot_candles(df_candles: pd.DataFrame, df_indicators: pd.DataFrame = None, key: str = None,
+                     max_points: int = None) -> go.Figure:
+        """
+        Sends the candles, their volume and the indicators of get_multiple_technical_indicator as one figure
+        built from one frame, bars are merged down to the figure width before serializing, those of a selected
+        range too so that zooming in shows finer bars until they are the original ones
+        """
+        data = df_candles[Graph.candle_fields]
+        if df_indicators is not None:
+            data = data.join(df_indicators.drop(columns=Graph.candle_fields, errors="ignore"))
+        zoomed = False
+        if key is not None:
+            data, zoomed = Graph._zoom(data, key)
+        fig = Graph.candles_figure(Graph.resample_candles(data, max_points))
+        Graph._show(fig, key, zoomed)
+
+    @staticmethod
+    @timed("plot_seconds")
     def plot_hist_data(data: pd.Series = None) -> go.Figure:
-        fig = go.Figure(data=[go.Histogram(x=data, histnorm='probability')])
+        """
+        Past `webgl_threshold` values the bins are counted server-side so that only the bars are sent
+        """
+        if len(data) > Graph.webgl_threshold:
+            counts, edges = np.histogram(data.dropna(), bins="auto")
+            fig = go.Figure(data=[go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts / counts.sum(),
+                                         width=np.diff(edges))])
+        else:
+            fig = go.Figure(data=[go.Histogram(x=data, histnorm='probability')])
         fig = Graph.params_fig(fig)
         st.plotly_chart(fig)
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from typing import List
+
+from instrumentation import timed
+from lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+
+class Indicators:
+    """
+    Local computation of the technical indicators served by the /indicator endpoint, following the TA-Lib
+    definitions Finnhub relies on. Every indicator takes the high, low and close arrays and returns its fields
+    named as in the remote response, warm-up values are NaN.
+    """
+    lookback = {
+        "sma": lambda n: n - 1,
+        "ema": lambda n: n - 1,
+        "wma": lambda n: n - 1,
+        "tema": lambda n: 3 * (n - 1),
+        "trima": lambda n: n - 1,
+        "kama": lambda n: n,
+        "rsi": lambda n: n,
+        "willr": lambda n: n - 1,
+        "adx": lambda n: 2 * n - 1,
+        "adxr": lambda n: 3 * n - 2,
+        "apo": lambda n: 25,
+        "roc": lambda n: n,
+        "rocr": lambda n: n,
+        "bbands": lambda n: n - 1,
+        "midpoint": lambda n: n - 1,
+        "midprice": lambda n: n - 1,
+        "atr": lambda n: n,
+        "mama": lambda n: 32,
+    }
+
+    @staticmethod
+    def supports(indicator: str) -> bool:
+        return indicator in Indicators.lookback
+
+    @staticmethod
+    def _pad(values: np.ndarray, size: int) -> np.ndarray:
+        return np.concatenate([np.full(size - len(values), np.nan), values])
+
+    @staticmethod
+    def _rolling(values: np.ndarray, timeperiod: int) -> np.ndarray:
+        """
+        Returns
+        -------
+            np.ndarray
+                the windows of `timeperiod` values, one row per complete window so none on a shorter series
+        """
+        if len(values) < timeperiod:
+            return np.empty((0, timeperiod), dtype=float)
+        return np.lib.stride_tricks.sliding_window_view(values, timeperiod)
+
+    @staticmethod
+    def _sma(values: np.ndarray, timeperiod: int) -> np.ndarray:
+        cumsum = np.cumsum(np.insert(values, 0, 0.))
+        return Indicators._pad((cumsum[timeperiod:] - cumsum[:-timeperiod]) / timeperiod, len(values))
+
+    @staticmethod
+    def _ema(values: np.ndarray, timeperiod: int, alpha: float = None) -> np.ndarray:
+        """
+        Exponential average seeded with the simple average of its first `timeperiod` valid values
+        """
+        alpha = 2 / (timeperiod + 1) if alpha is None else alpha
+        valid = values[np.argmax(~np.isnan(values)):] if np.isnan(values).any() else values
+        if len(valid) < timeperiod:
+            return np.full(len(values), np.nan)
+        seeded = valid[timeperiod - 1:].copy()
+        seeded[0] = valid[:timeperiod].mean()
+        ema = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        return Indicators._pad(ema, len(values))
+
+    @staticmethod
+    def _wilder(values: np.ndarray, timeperiod: int) -> np.ndarray:
+        return Indicators._ema(values, timeperiod, alpha=1 / timeperiod)
+
+    @staticmethod
+    def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        previous = np.roll(close, 1)
+        true_range = np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+        true_range[0] = np.nan
+        return true_range
+
+    @staticmethod
+    def sma(high, low, close, timeperiod: int) -> dict:
+        return {"sma": Indicators._sma(close, timeperiod)}
+
+    @staticmethod
+    def ema(high, low, close, timeperiod: int) -> dict:
+        return {"ema": Indicators._ema(close, timeperiod)}
+
+    @staticmethod
+    def wma(high, low, close, timeperiod: int) -> dict:
+        weights = np.arange(timeperiod, 0, -1) / (timeperiod * (timeperiod + 1) / 2)
+        return {"wma": Indicators._pad(Indicators._rolling(close, timeperiod) @ weights[::-1], len(close))}
+
+    @staticmethod
+    def tema(high, low, close, timeperiod: int) -> dict:
+        ema1 = Indicators._ema(close, timeperiod)
+        ema2 = Indicators._ema(ema1, timeperiod)
+        ema3 = Indicators._ema(ema2, timeperiod)
+        return {"tema": 3 * ema1 - 3 * ema2 + ema3}
+
+    @staticmethod
+    def trima(high, low, close, timeperiod: int) -> dict:
+        first = (timeperiod + 1) // 2 if timeperiod % 2 else timeperiod // 2
+        second = timeperiod + 1 - first
+        sma = Indicators._sma(close, first)
+        return {"trima": Indicators._pad(Indicators._sma(sma[first - 1:], second), len(close))}
+
+    @staticmethod
+    def kama(high, low, close, timeperiod: int) -> dict:
+        kama = np.full(len(close), np.nan)
+        if len(close) <= timeperiod:
+            return {"kama": kama}
+        change = np.abs(close[timeperiod:] - close[:-timeperiod])
+        volatility = Indicators._rolling(np.abs(np.diff(close)), timeperiod).sum(axis=1)
+        efficiency = np.divide(change, volatility, out=np.ones_like(change), where=volatility != 0)
+        smoothing = (efficiency * (2 / 3 - 2 / 31) + 2 / 31) ** 2
+        previous = close[timeperiod - 1]
+        for i, (price, factor) in enumerate(zip(close[timeperiod:], smoothing), start=timeperiod):
+            previous = previous + factor * (price - previous)
+            kama[i] = previous
+        return {"kama": kama}
+
+    @staticmethod
+    def rsi(high, low, close, timeperiod: int) -> dict:
+        change = np.diff(close)
+        gain = Indicators._wilder(np.clip(change, 0, None), timeperiod)
+        loss = Indicators._wilder(np.clip(-change, 0, None), timeperiod)
+        total = gain + loss
+        rsi = np.divide(100 * gain, total, out=np.zeros_like(total), where=total != 0)
+        rsi[np.isnan(total)] = np.nan
+        return {"rsi": Indicators._pad(rsi, len(close))}
+
+    @staticmethod
+    def willr(high, low, close, timeperiod: int) -> dict:
+        highest = Indicators._pad(Indicators._rolling(high, timeperiod).max(axis=1), len(close))
+        lowest = Indicators._pad(Indicators._rolling(low, timeperiod).min(axis=1), len(close))
+        return {"willr": -100 * (highest - close) / (highest - lowest)}
+
+    @staticmethod
+    def atr(high, low, close, timeperiod: int) -> dict:
+        true_range = Indicators._true_range(high, low, close)
+        return {"atr": Indicators._wilder(true_range, timeperiod)}
+
+    @staticmethod
+    def adx(high, low, close, timeperiod: int) -> dict:
+        up, down = np.diff(high, prepend=np.nan), -np.diff(low, prepend=np.nan)
+        plus_dm = np.where((up > down) & (up > 0), up, 0.)
+        minus_dm = np.where((down > up) & (down > 0), down, 0.)
+        plus_dm[0] = minus_dm[0] = np.nan
+        true_range = Indicators._wilder(Indicators._true_range(high, low, close), timeperiod)
+        plus_di = 100 * Indicators._wilder(plus_dm, timeperiod) / true_range
+        minus_di = 100 * Indicators._wilder(minus_dm, timeperiod) / true_range
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+        return {"adx": Indicators._wilder(dx, timeperiod)}
+
+    @staticmethod
+    def adxr(high, low, close, timeperiod: int) -> dict:
+        adx = Indicators.adx(high, low, close, timeperiod)["adx"]
+        lagged = Indicators._pad(adx[:max(len(adx) - timeperiod + 1, 0)], len(adx))
+        return {"adxr": (adx + lagged) / 2}
+
+    @staticmethod
+    def apo(high, low, close, timeperiod: int = None, fastperiod: int = 12, slowperiod: int = 26) -> dict:
+        return {"apo": Indicators._sma(close, fastperiod) - Indicators._sma(close, slowperiod)}
+
+    @staticmethod
+    def roc(high, low, close, timeperiod: int) -> dict:
+        return {"roc": Indicators._pad((close[timeperiod:] / close[:-timeperiod] - 1) * 100, len(close))}
+
+    @staticmethod
+    def rocr(high, low, close, timeperiod: int) -> dict:
+        return {"rocr": Indicators._pad(close[timeperiod:] / close[:-timeperiod], len(close))}
+
+    @staticmethod
+    def bbands(high, low, close, timeperiod: int, nbdevup: float = 2, nbdevdn: float = 2) -> dict:
+        middle = Indicators._sma(close, timeperiod)
+        deviation = Indicators._pad(Indicators._rolling(close, timeperiod).std(axis=1), len(close))
+        return {"lowerband": middle - nbdevdn * deviation, "middleband": middle,
+                "upperband": middle + nbdevup * deviation}
+
+    @staticmethod
+    def midpoint(high, low, close, timeperiod: int) -> dict:
+        window = Indicators._rolling(close, timeperiod)
+        return {"midpoint": Indicators._pad((window.max(axis=1) + window.min(axis=1)) / 2, len(close))}
+
+    @staticmethod
+    def midprice(high, low, close, timeperiod: int) -> dict:
+        highest = Indicators._rolling(high, timeperiod).max(axis=1)
+        lowest = Indicators._rolling(low, timeperiod).min(axis=1)
+        return {"midprice": Indicators._pad((highest + lowest) / 2, len(close))}
+
+    @staticmethod
+    def mama(high, low, close, timeperiod: int = None, fastlimit: float = 0.5, slowlimit: float = 0.05) -> dict:
+        """
+        Ehlers MESA adaptive moving average, its alpha depends on the previous bars so it is computed bar by bar
+        """
+        price = (high + low) / 2
+        size = len(price)
+        smooth, detrender, i1, q1, i2, q2, re, im, period, phase, mama, fama = np.zeros((12, size))
+        for i in range(6, size):
+            adjust = 0.075 * period[i - 1] + 0.54
+            smooth[i] = (4 * price[i] + 3 * price[i - 1] + 2 * price[i - 2] + price[i - 3]) / 10
+            detrender[i] = (0.0962 * smooth[i] + 0.5769 * smooth[i - 2] - 0.5769 * smooth[i - 4]
+                            - 0.0962 * smooth[i - 6]) * adjust
+            q1[i] = (0.0962 * detrender[i] + 0.5769 * detrender[i - 2] - 0.5769 * detrender[i - 4]
+                     - 0.0962 * detrender[i - 6]) * adjust
+            i1[i] = detrender[i - 3]
+            ji = (0.0962 * i1[i] + 0.5769 * i1[i - 2] - 0.5769 * i1[i - 4] - 0.0962 * i1[i - 6]) * adjust
+            jq = (0.0962 * q1[i] + 0.5769 * q1[i - 2] - 0.5769 * q1[i - 4] - 0.0962 * q1[i - 6]) * adjust
+            i2[i] = 0.2 * (i1[i] - jq) + 0.8 * i2[i - 1]
+            q2[i] = 0.2 * (q1[i] + ji) + 0.8 * q2[i - 1]
+            re[i] = 0.2 * (i2[i] * i2[i - 1] + q2[i] * q2[i - 1]) + 0.8 * re[i - 1]
+            im[i] = 0.2 * (i2[i] * q2[i - 1] - q2[i] * i2[i - 1]) + 0.8 * im[i - 1]
+            current = 360 / np.degrees(np.arctan(im[i] / re[i])) if im[i] != 0 and re[i] != 0 else period[i - 1]
+            current = min(max(current, 0.67 * period[i - 1]), 1.5 * period[i - 1]) if period[i - 1] else current
+            period[i] = 0.2 * min(max(current, 6), 50) + 0.8 * period[i - 1]
+            phase[i] = np.degrees(np.arctan(q1[i] / i1[i])) if i1[i] != 0 else phase[i - 1]
+            alpha = min(max(fastlimit / max(phase[i - 1] - phase[i], 1), slowlimit), fastlimit)
+            mama[i] = alpha * price[i] + (1 - alpha) * (mama[i - 1] or price[i])
+            fama[i] = 0.5 * alpha * mama[i] + (1 - 0.5 * alpha) * (fama[i - 1] or mama[i])
+        mama[:32], fama[:32] = np.nan, np.nan
+        return {"mama": mama, "fama": fama}
+
+    @staticmethod
+    @timed("compute_seconds")
+    def compute(df_candles: pd.DataFrame, indicators: List[str], time_indicators: List[int]) -> pd.DataFrame:
+        """
+        Computes every requested indicator over one candle frame as returned by Candles.get
+        Returns
+        -------
+            pd.DataFrame
+                one column per indicator field named as TechnicalIndic.get does, plus the close
+        """
+        high, low, close = (df_candles[field].to_numpy(dtype=float) for field in ['high', 'low', 'close'])
+        columns = []
+        for indic, time in zip(indicators, time_indicators):
+            for field, values in getattr(Indicators, indic)(high, low, close, int(time)).items():
+                columns.append(pd.Series(values, index=df_candles.index, name=field + '_' + str(time)))
+        columns.append(df_candles['close'])
+        return pd.concat(columns, axis=1)
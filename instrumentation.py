@@ -0,0 +1,203 @@
+import json
+import time
+from bisect import bisect_left
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, List, Tuple
+
+
+class Histogram:
+    buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+
+    def __init__(self, buckets: Tuple[float, ...] = None):
+        if buckets is not None:
+            self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms keyed by metric name and labels, exported as JSON or Prometheus text
+    """
+    _registries = {}
+    _registries_lock = Lock()
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._lock = Lock()
+
+    @classmethod
+    def shared(cls, name: str = "default") -> 'MetricsRegistry':
+        with cls._registries_lock:
+            if name not in cls._registries:
+                cls._registries[name] = cls()
+            return cls._registries[name]
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple[str, tuple]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels):
+        if self.enabled:
+            key = self._key(name, labels)
+            with self._lock:
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if self.enabled:
+            key = self._key(name, labels)
+            with self._lock:
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram()
+                self._histograms[key].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self._counters.items())],
+                "histograms": [{"name": name, "labels": dict(labels), "count": histogram.count,
+                                "sum": histogram.sum, "buckets": dict(histogram.cumulative())}
+                               for (name, labels), histogram in sorted(self._histograms.items())],
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    @staticmethod
+    def _labels(labels: dict, **extra) -> str:
+        labels = {**labels, **extra}
+        if not labels:
+            return ""
+        escaped = {key: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                   for key, value in labels.items()}
+        return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+    def to_prometheus(self) -> str:
+        snapshot, lines, typed = self.snapshot(), [], set()
+        for counter in snapshot["counters"]:
+            if counter["name"] not in typed:
+                lines.append(f'# TYPE {counter["name"]} counter')
+                typed.add(counter["name"])
+            lines.append(f'{counter["name"]}{self._labels(counter["labels"])} {counter["value"]:g}')
+        for histogram in snapshot["histograms"]:
+            name, labels = histogram["name"], histogram["labels"]
+            if name not in typed:
+                lines.append(f'# TYPE {name} histogram')
+                typed.add(name)
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{name}_bucket{self._labels(labels, le=bound)} {count}')
+            lines.append(f'{name}_sum{self._labels(labels)} {histogram["sum"]:g}')
+            lines.append(f'{name}_count{self._labels(labels)} {histogram["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RequestRecord:
+    """
+    What one call to a client's _get went through, network time excludes the rate limiter wait.
+    A coalesced call shared the response of an identical request in flight and sent nothing itself.
+    """
+    route: str
+    params: dict = None
+    status: int = None
+    cache_hit: bool = False
+    coalesced: bool = False
+    attempts: int = 0
+    retries: int = 0
+    wait_seconds: float = 0.
+    network_seconds: float = 0.
+    parse_seconds: float = 0.
+    bytes: int = 0
+    error: str = None
+    extra: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class Instrumentation:
+    """
+    Pre-request hooks receive (route, params), post-request hooks the RequestRecord once the response is parsed,
+    records are also aggregated per route into `registry`
+    """
+
+    def __init__(self, registry: MetricsRegistry = None, pre_hooks: List[Callable] = None,
+                 post_hooks: List[Callable] = None):
+        self.registry = registry if registry is not None else MetricsRegistry.shared()
+        self._pre_hooks = list(pre_hooks or [])
+        self._post_hooks = list(post_hooks or [])
+
+    def add_pre_hook(self, hook: Callable):
+        self._pre_hooks.append(hook)
+
+    def add_post_hook(self, hook: Callable):
+        self._post_hooks.append(hook)
+
+    def before(self, route: str, params: dict = None):
+        for hook in self._pre_hooks:
+            hook(route, params)
+
+    def after(self, record: RequestRecord):
+        registry, route = self.registry, record.route
+        if record.cache_hit:
+            registry.increment("cache_hits_total", route=route)
+        elif record.coalesced:
+            registry.increment("coalesced_requests_total", route=route)
+        else:
+            registry.increment("requests_total", route=route, status=record.status if record.error is None
+                               else "error")
+            registry.observe("request_wait_seconds", record.wait_seconds, route=route)
+            registry.observe("request_network_seconds", record.network_seconds, route=route)
+            registry.increment("response_bytes_total", record.bytes, route=route)
+            if record.retries:
+                registry.increment("request_retries_total", record.retries, route=route)
+        if not record.coalesced:
+            registry.observe("request_parse_seconds", record.parse_seconds, route=route)
+        for hook in self._post_hooks:
+            hook(record)
+
+
+def timed(metric: str, registry: MetricsRegistry = None, **labels) -> Callable:
+    """
+    Decorator observing the duration of every call under `metric`, labelled with the function name
+    """
+    def decorator(function: Callable) -> Callable:
+        name = function.__qualname__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            target = registry if registry is not None else MetricsRegistry.shared()
+            if not target.enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                target.observe(metric, time.perf_counter() - started, function=name, **labels)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,35 @@
+import importlib
+from threading import Lock
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """
+    Stands for the module `name` and only imports it on first attribute access, so that importing a module of this
+    package does not pay for pandas, numpy or the front end until they are actually used
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+        self._lock = Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self.__name__}'{' (loaded)' if self.loaded else ''}>"
@@ -1,16 +1,48 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests import RequestException
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from base import RequestError
 from finnhub_client import FinnhubClient
+from cache import ResponseCache
+from candle_store import CandleStore
 from date import Date
 from go_plotly import Graph
+from instrumentation import Instrumentation, MetricsRegistry
+from returns import Returns
+from stats import ReturnStats
 from datetime import datetime, date, timedelta
 
 
+@st.cache_resource
+def get_finnhub_client(api_key: str, proxy: str, base_url: str = None) -> FinnhubClient:
+    return FinnhubClient(api_key, proxy, cache=ResponseCache(), candle_store=CandleStore(), base_url=base_url,
+                         instrumentation=Instrumentation())
+
+
+# `_client` is not hashed, `client_id` keys the cached results on the account and server it fetched them from
+@st.cache_data(ttl=5, show_spinner=False)
+def fetch_live(_client: FinnhubClient, client_id: tuple, method: str, *args):
+    return getattr(_client, method)(*args)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_market(_client: FinnhubClient, client_id: tuple, method: str, *args):
+    return getattr(_client, method)(*args)
+
+
+@st.cache_data(ttl=15 * 60, show_spinner=False)
+def fetch_fundamentals(_client: FinnhubClient, client_id: tuple, method: str, *args):
+    return getattr(_client, method)(*args)
+
+
 class StreamFin:
-    def __init__(self, api_key: str = None, proxy: str = None):
+    def __init__(self, api_key: str = None, proxy: str = None, base_url: str = None):
         self._api_key = api_key
         self._proxy = proxy
+        self._base_url = base_url
 
     @staticmethod
     def instanciate_days():
@@ -35,39 +67,66 @@ class StreamFin:
         return symbol, delta_time
 
     @staticmethod
-    def compute_quote(client: FinnhubClient, symbol: str):
+    def fetch_parallel(client: FinnhubClient, jobs: dict):
+        """
+        Runs the memoized fetches of independent sections concurrently
+        Returns
+        -------
+            generator
+                (section, result, error) in completion order so that each section renders as soon as it is ready
+        """
+        ctx = get_script_run_ctx()
+        with ThreadPoolExecutor(max_workers=len(jobs), initializer=add_script_run_ctx, initargs=(None, ctx)) \
+                as executor:
+            client_id = (client.api_key, client.base_url)
+            futures = {executor.submit(fetch, client, client_id, method, *args): name
+                       for name, (fetch, method, args) in jobs.items()}
+            for future in as_completed(futures):
+                yield futures[future], future.result() if future.exception() is None else None, future.exception()
+
+    @staticmethod
+    def compute_quote(df_quote: pd.DataFrame):
         st.markdown("Real-time quote data")
-        df_quote = client.get_quote(symbol)
         st.dataframe(df_quote)
 
     @staticmethod
-    def compute_close(client: FinnhubClient, symbol: str, resolution: str, start: datetime, end: datetime):
-        st.markdown("Graph asset's close")
-        serie_close = client.get_stock_close(symbol, resolution, start, end)
-        Graph.plot_line_data(serie_close)
-        return serie_close
+    def compute_chart(df_candles: pd.DataFrame, df_indicators: pd.DataFrame = None):
+        st.markdown("Graph asset's candles, volume and technical indicators")
+        Graph.plot_candles(df_candles, df_indicators, key="candles")
 
     @staticmethod
-    def compute_ret(serie: pd.Series):
-        ret = serie.pct_change()
-        ret_add = ret.add(1)
-        cumul_annual_ret = pd.Series(np.array(ret_add.cumprod()) **
-                                     (np.arange(0, len(serie), 1) / 252) - 1, index=serie.index).iloc[1:]
-        return ret, cumul_annual_ret
-
-    def compute_stats(self, serie: pd.Series):
-        ret, cumul_annual_ret = self.compute_ret(serie)
+    def compute_ret(serie: pd.Series, resolution: str = None, key: tuple = None) -> ReturnStats:
+        """
+        Folds the bars of `serie` not seen on previous reruns into the return statistics kept in the session
+        under `key`, they are rebuilt when the serie no longer extends the ones already folded
+        """
+        states = st.session_state.setdefault("return_stats", {})
+        stats = states.get(key)
+        if stats is None or not stats.extends(serie):
+            stats = ReturnStats(Returns.periods_per_year(serie.index, resolution))
+        stats.update_series(serie)
+        if key is not None:
+            states[key] = stats
+        return stats
+
+    def compute_stats(self, serie: pd.Series, resolution: str = None, key: tuple = None):
+        stats = self.compute_ret(serie, resolution, key)
         st.markdown("Graph asset's return")
-        Graph.plot_hist_data(ret)
+        Graph.plot_hist_data(stats.return_serie)
         st.markdown("Descriptive stats on asset's returns")
-        st.write(pd.DataFrame(ret.describe()).T)
+        st.write(pd.DataFrame(stats.returns.describe()).T)
         st.markdown("Graph cumulative annualised asset's returns")
-        Graph.plot_line_data(cumul_annual_ret)
+        Graph.plot_line_data(stats.cumulative_serie, key="cumulative")
         st.markdown("Descriptive stats on cumulative annualised asset's returns")
-        st.write(pd.DataFrame(cumul_annual_ret.describe()).T)
+        st.write(pd.DataFrame(stats.cumulative.describe()).T)
+        st.markdown("Annualised risk figures")
+        st.write(Returns.summary(serie, resolution))
 
     @staticmethod
-    def compute_technicals_indic(client: FinnhubClient, symbol: str, resolution: str, start: datetime, end: datetime):
+    def compute_technicals_indic():
+        """
+        Records the requested indicators in the session, they are overlaid on the candles chart
+        """
         st.markdown("Technical indicator")
         indicators = st.multiselect(
             'What technical indicators needed',
@@ -84,66 +143,150 @@ class StreamFin:
         else:
             condition = False
         if st.button("Get Technical Analysis"):
-            df_multiple_indic = client.get_multiple_technical_indicator(symbol, resolution, start, end,
-                                                                                indicators, time_indicators) if \
-                condition else client.get_multiple_technical_indicator(symbol, resolution, start, end)
-            Graph.plot_line_data(df_multiple_indic)
+            st.session_state.technicals = (indicators, time_indicators) if condition else ()
+            st.session_state.quantitative = True
 
     @staticmethod
-    def compute_company_news(client: FinnhubClient, symbol: str):
+    def compute_company_news(df_company_news: pd.DataFrame):
         st.markdown("List latest company news")
-        df_company_news = client.get_company_news(symbol)
         st.dataframe(df_company_news)
 
     @staticmethod
-    def compute_company_financials(client: FinnhubClient, symbol: str):
+    def compute_company_financials(df_financials: pd.DataFrame):
         st.markdown("Get company basic financials and compare with peers")
-        df_financials = client.get_peers_basic_financials(symbol)
         st.dataframe(df_financials)
 
     @staticmethod
-    def compute_company_insiders(client: FinnhubClient, symbol: str):
+    def compute_company_insiders(df_insiders: pd.DataFrame):
         st.markdown("Company insider transactions data sourced")
-        df_insiders = client.get_stock_insider_transactions(symbol)
         st.dataframe(df_insiders)
 
     @staticmethod
-    def compute_company_recommendation(client: FinnhubClient, symbol: str):
+    def compute_company_recommendation(df_recommendation: pd.DataFrame):
         st.markdown("Get latest analyst earnings")
-        df_recommendation = client.get_recommendation_trends(symbol)
         st.dataframe(df_recommendation)
 
     @staticmethod
-    def compute_company_earnings(client: FinnhubClient, symbol: str):
+    def compute_company_earnings(df_earnings: pd.DataFrame):
         st.markdown("Company insider transactions data sourced")
-        df_earnings = client.get_company_earnings(symbol)
         st.dataframe(df_earnings)
 
     @staticmethod
-    def compute_company_sentiment(client: FinnhubClient, symbol: str, start: datetime, end: datetime):
+    def compute_company_sentiment(df_sentiment: tuple):
         st.markdown("Get social sentiment for stocks on Reddit and Twitter")
-        df_sentiment_reddit, df_sentiment_twitter = client.get_stock_social_sentiment(symbol, start, end)
+        df_sentiment_reddit, df_sentiment_twitter = df_sentiment
         col1, col2 = st.columns(2)
         col1.dataframe(df_sentiment_reddit)
         col2.dataframe(df_sentiment_twitter)
 
+    @staticmethod
+    def compute_chart_progressively(client: FinnhubClient, placeholder, symbol: str, resolution: str,
+                                    start: datetime, end: datetime):
+        """
+        Draws the candles of a range split into several requests piece by piece as the requests complete,
+        the full chart then replaces it from the candles left in the client's store.
+        A failed request stops the preview, its error is kept in the session under "chart_error", the candles
+        job fetches what is missing again and reports it if it fails again
+        """
+        _from, to = Date.datetime_to_timestamp(start, end)
+        total = len(client.candle_windows(symbol, resolution, _from, to)) + 1
+        frames = []
+        st.session_state.pop("chart_error", None)
+        try:
+            for frame in client.iter_stock_candles(symbol, resolution, start, end):
+                frames.append(frame)
+                with placeholder.container():
+                    st.caption(f"Loading candles, {len(frames)} of up to {total} pieces in")
+                    Graph.plot_candles(pd.concat(frames).sort_index())
+        except (RequestError, RequestException) as error:
+            st.session_state.chart_error = f'{symbol} : {error}'
+            placeholder.caption(f"Loading candles, retrying after {type(error).__name__}")
+
+    def compute_quantitative(self, client: FinnhubClient, symbol: str, resolution: str, start: datetime,
+                             end: datetime):
+        quote, chart = st.empty(), st.empty()
+        _from, to = Date.datetime_to_timestamp(start, end)
+        if len(client.candle_windows(symbol, resolution, _from, to)) > 1:
+            self.compute_chart_progressively(client, chart, symbol, resolution, start, end)
+        jobs = {
+            "quote": (fetch_live, 'get_quote', (symbol,)),
+            "candles": (fetch_market, 'get_stock_candles', (symbol, resolution, start, end)),
+        }
+        technicals = st.session_state.get("technicals")
+        if technicals is not None:
+            jobs["indicators"] = (fetch_market, 'get_multiple_technical_indicator',
+                                  (symbol, resolution, start, end, *technicals))
+        market, pending = {}, set(jobs) - {"quote"}
+        for name, data, error in self.fetch_parallel(client, jobs):
+            if name == "quote":
+                with quote.container():
+                    if error is not None:
+                        st.error(f'{name} : {error}')
+                    else:
+                        self.compute_quote(data)
+                continue
+            market[name], pending = (data, error), pending - {name}
+            if pending:
+                continue
+            with chart.container():
+                for section, (_, failure) in market.items():
+                    if failure is not None:
+                        st.error(f'{section} : {failure}')
+                df_candles, error = market["candles"]
+                if error is None:
+                    self.compute_chart(df_candles, market.get("indicators", (None,))[0])
+                    self.compute_stats(df_candles['close'], resolution, (symbol, resolution))
+
+    def compute_fundamentals(self, client: FinnhubClient, symbol: str, start: datetime, end: datetime):
+        sections = {
+            "News": (self.compute_company_news, 'get_company_news', (symbol,)),
+            "Financials": (self.compute_company_financials, 'get_peers_basic_financials', (symbol,)),
+            "Insiders": (self.compute_company_insiders, 'get_stock_insider_transactions', (symbol,)),
+            "Recommendations": (self.compute_company_recommendation, 'get_recommendation_trends', (symbol,)),
+            "Earnings": (self.compute_company_earnings, 'get_company_earnings', (symbol,)),
+            "Sentiment": (self.compute_company_sentiment, 'get_stock_social_sentiment', (symbol, start, end)),
+        }
+        placeholders = {name: tab.empty() for name, tab in zip(sections, st.tabs(list(sections)))}
+        for placeholder in placeholders.values():
+            placeholder.caption("Loading...")
+        jobs = {name: (fetch_fundamentals, method, args) for name, (_, method, args) in sections.items()}
+        for name, data, error in self.fetch_parallel(client, jobs):
+            with placeholders[name].container():
+                if error is not None:
+                    st.error(f'{name} : {error}')
+                else:
+                    sections[name][0](data)
+
+    @staticmethod
+    def compute_timings():
+        """
+        Shows where the time went in this process, split into network, parsing, computing and plotting
+        """
+        registry = MetricsRegistry.shared()
+        rows = [{"metric": histogram["name"],
+                 "labels": ", ".join(f"{key}={value}" for key, value in histogram["labels"].items()),
+                 "count": histogram["count"], "total_s": histogram["sum"],
+                 "mean_ms": histogram["sum"] / histogram["count"] * 1000}
+                for histogram in registry.snapshot()["histograms"] if histogram["count"]]
+        with st.sidebar.expander("Timings"):
+            st.dataframe(pd.DataFrame(rows, columns=["metric", "labels", "count", "total_s", "mean_ms"]))
+            st.download_button("Prometheus metrics", registry.to_prometheus(), "metrics.txt")
+
     def main(self):
-        finnhub_client = FinnhubClient(self._api_key, self._proxy)
+        finnhub_client = get_finnhub_client(self._api_key, self._proxy, self._base_url)
         st.title(""" Stock Analysis """)
         start, end = self.instanciate_days()
         symbol, delta_time = self.instanciate_stocks_freq()
         if st.button("Get Quantitative Data"):
-            self.compute_quote(finnhub_client, symbol)
-            serie_close = self.compute_close(finnhub_client, symbol, delta_time, start, end)
-            self.compute_stats(serie_close)
-        self.compute_technicals_indic(finnhub_client, symbol, delta_time, start, end)
+            st.session_state.quantitative = True
+        self.compute_technicals_indic()
+        if st.session_state.get("quantitative"):
+            self.compute_quantitative(finnhub_client, symbol, delta_time, start, end)
         if st.button("Get Fundamental Data"):
-            self.compute_company_news(finnhub_client, symbol)
-            self.compute_company_financials(finnhub_client, symbol)
-            self.compute_company_insiders(finnhub_client, symbol)
-            self.compute_company_recommendation(finnhub_client, symbol)
-            self.compute_company_earnings(finnhub_client, symbol)
-            self.compute_company_sentiment(finnhub_client, symbol, start, end)
+            st.session_state.fundamental = True
+        if st.session_state.get("fundamental"):
+            self.compute_fundamentals(finnhub_client, symbol, start, end)
+        self.compute_timings()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Tuple, Union
+
+from lazy import LazyModule
+
+pd = LazyModule("pandas")
+pa = LazyModule("pyarrow")
+pq = LazyModule("pyarrow.parquet")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class MarketStore:
+    """
+    Columnar on-disk store laid out as root/kind/symbol=<symbol>/resolution=<resolution>/year=<year>/part-0.parquet.
+    Every frame carries a `t` column, epoch seconds for candles and datetimes otherwise, reads are memory-mapped
+    and both the year partitions and the row groups are pruned on the requested `t` range.
+    """
+    keys = {"candles": ["t"], "indicators": ["t", "indicator"], "fundamentals": ["t"]}
+
+    def __init__(self, root: str):
+        self._root = root
+
+    def _directory(self, kind: str, symbol: str, resolution: str) -> str:
+        return os.path.join(self._root, kind, f"symbol={symbol}", f"resolution={resolution}")
+
+    @staticmethod
+    @contextmanager
+    def _locked(directory: str):
+        """
+        Holds the exclusive lock of a partition, so that writers of other threads or processes do not overwrite
+        each other's rows between reading the partition and replacing it
+        """
+        with open(os.path.join(directory, ".lock"), "a+b") as file:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+                else:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @staticmethod
+    def _year(value) -> int:
+        if isinstance(value, (int, float)):
+            return pd.Timestamp(value, unit='s').year
+        return pd.Timestamp(value).year
+
+    @staticmethod
+    def _years(t: pd.Series) -> pd.Series:
+        if pd.api.types.is_numeric_dtype(t):
+            return pd.to_datetime(t, unit='s').dt.year
+        return t.dt.year
+
+    def write(self, kind: str, symbol: str, resolution: str, df: pd.DataFrame):
+        """
+        Upserts `df` into its year partitions, rows already stored with the same keys are replaced.
+        Concurrent writers of a partition take turns on its lock file
+        """
+        if df.empty:
+            return
+        keys = self.keys.get(kind, ["t"])
+        for year, df_year in df.groupby(self._years(df["t"])):
+            directory = os.path.join(self._directory(kind, symbol, resolution), f"year={year}")
+            path = os.path.join(directory, "part-0.parquet")
+            os.makedirs(directory, exist_ok=True)
+            with self._locked(directory):
+                if os.path.exists(path):
+                    df_year = pd.concat([pq.read_table(path, memory_map=True).to_pandas(), df_year])
+                df_year = df_year.drop_duplicates(keys, keep="last").sort_values(keys)
+                temporary = os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+                pq.write_table(pa.Table.from_pandas(df_year, preserve_index=False), temporary)
+                os.replace(temporary, path)
+
+    def read_table(self, kind: str, symbol: str, resolution: str, _from=None, to=None,
+                   columns: List[str] = None) -> Union[pa.Table, None]:
+        directory = self._directory(kind, symbol, resolution)
+        if not os.path.isdir(directory):
+            return None
+        filters = []
+        if _from is not None:
+            filters += [("year", ">=", self._year(_from)), ("t", ">=", _from)]
+        if to is not None:
+            filters += [("year", "<=", self._year(to)), ("t", "<=", to)]
+        table = pq.read_table(directory, columns=columns, filters=filters or None, memory_map=True,
+                              partitioning="hive")
+        return table.drop_columns(["year"]) if "year" in table.column_names else table
+
+    def read(self, kind: str, symbol: str, resolution: str, _from=None, to=None,
+             columns: List[str] = None) -> pd.DataFrame:
+        table = self.read_table(kind, symbol, resolution, _from, to, columns)
+        if table is None:
+            return pd.DataFrame()
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def _coverage_path(self, symbol: str, resolution: str) -> str:
+        return os.path.join(self._directory("candles", symbol, resolution), "_coverage.json")
+
+    def read_coverage(self, symbol: str, resolution: str) -> List[Tuple[int, int]]:
+        path = self._coverage_path(symbol, resolution)
+        if not os.path.exists(path):
+            return []
+        with open(path) as file:
+            return [tuple(interval) for interval in json.load(file)]
+
+    def write_coverage(self, symbol: str, resolution: str, coverage: List[Tuple[int, int]]):
+        path = self._coverage_path(symbol, resolution)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = path + f".{uuid.uuid4().hex}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(coverage, file)
+        os.replace(temporary, path)
+
+    def update_coverage(self, symbol: str, resolution: str,
+                        update: Callable[[List[Tuple[int, int]]], List[Tuple[int, int]]]) -> List[Tuple[int, int]]:
+        """
+        Replaces the stored coverage by `update` of it under the lock of the (symbol, resolution) partition, so that
+        the ranges other processes add in the meantime are kept
+        Returns
+        -------
+            list
+                the coverage written
+        """
+        directory = self._directory("candles", symbol, resolution)
+        os.makedirs(directory, exist_ok=True)
+        with self._locked(directory):
+            coverage = update(self.read_coverage(symbol, resolution))
+            self.write_coverage(symbol, resolution, coverage)
+        return coverage
+
+    def write_indicators(self, symbol: str, resolution: str, df_indicators: pd.DataFrame):
+        df = df_indicators.rename_axis("t").reset_index().melt(id_vars="t", var_name="indicator")
+        self.write("indicators", symbol, resolution, df.dropna())
+
+    def read_indicators(self, symbol: str, resolution: str, _from: datetime = None,
+                        to: datetime = None) -> pd.DataFrame:
+        df = self.read("indicators", symbol, resolution, _from, to)
+        if df.empty:
+            return df
+        return df.pivot(index="t", columns="indicator", values="value")
+
+    def write_fundamentals(self, symbol: str, df_financials: pd.DataFrame, at: datetime = None):
+        df = df_financials.reset_index(drop=True)
+        df.insert(0, "t", pd.Timestamp(at or datetime.now()))
+        self.write("fundamentals", symbol, "snapshot", df)
+
+    def read_fundamentals(self, symbol: str, _from: datetime = None, to: datetime = None) -> pd.DataFrame:
+        df = self.read("fundamentals", symbol, "snapshot", _from, to)
+        return df.set_index("t") if not df.empty else df
@@ -1,21 +1,48 @@
-import pandas as pd
+from __future__ import annotations
+
+import time
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from typing import Tuple
+
+from instrumentation import timed
+from lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
 
 
 class Data:
+    """
+    Field names are compiled once per model class, so that decoding a response only looks its keys up
+    """
+    field_names: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.field_names = tuple(cls.__dict__.get('__annotations__', {}))
+
+    @staticmethod
+    def to_datetime(timestamps) -> pd.DatetimeIndex:
+        """
+        Vectorized datetime.fromtimestamp, the local UTC offset is looked up once per distinct hour
+        """
+        seconds = np.asarray(timestamps, dtype='int64')
+        hours, inverse = np.unique(seconds // 3600, return_inverse=True)
+        offsets = np.array([time.localtime(hour * 3600).tm_gmtoff for hour in hours.tolist()], dtype='int64')
+        return pd.DatetimeIndex(pd.to_datetime(seconds + offsets[inverse.ravel()], unit='s'), name='t')
 
     @classmethod
     def from_json(cls, **kwargs):
-        return cls(**{key: kwargs.get(key) for key in cls.__dict__.keys() & kwargs.keys()})
+        return cls(**{key: kwargs[key] for key in cls.field_names if key in kwargs})
 
     @classmethod
-    def dict_from_json(cls, **kwargs):
-        return cls.from_json(**kwargs).__dict__
+    def dict_from_json(cls, **kwargs) -> dict:
+        return {key: kwargs.get(key) for key in cls.field_names}
 
     @classmethod
     def from_json_outer(cls, **kwargs):
-        return cls(**{key: kwargs.get(key) for key in kwargs.keys() - Trash.__dict__.keys()})
+        return cls(**{key: value for key, value in kwargs.items() if key not in TechnicalIndic.discarded})
 
 
 @dataclass
@@ -26,10 +53,10 @@ class Quote(Data):
     l: float = None
 
     @staticmethod
+    @timed("model_parse_seconds")
     def get(**kwargs) -> pd.DataFrame:
-        obj = Quote.from_json(**kwargs)
-        df = pd.DataFrame([obj.__dict__.values()], columns=["spot", "changePercent", "high", "low"],
-                          index=["latest_quote"])
+        df = pd.DataFrame([Quote.dict_from_json(**kwargs).values()],
+                          columns=["spot", "changePercent", "high", "low"], index=["latest_quote"])
         return df
 
 
@@ -42,17 +69,16 @@ class Candles(Data):
     t: datetime.timestamp = None
     v: float = None
 
+    columns = {'c': 'close', 'h': 'high', 'l': 'low', 'o': 'open', 'v': 'volume'}
+
     @staticmethod
+    @timed("model_parse_seconds")
     def get(**kwargs) -> pd.DataFrame:
-        obj_dict = Candles.dict_from_json(**kwargs)
-        df = pd.DataFrame(obj_dict.values(), index=obj_dict.keys()).T
         if kwargs['s'] == 'no_data':
             raise Exception('No price data available for this Ticker')
         else:
-            df['t'] = df['t'].apply(lambda x: datetime.fromtimestamp(x))
-            df.set_index('t', drop=True, inplace=True)
-            df.columns = ['close', 'high', 'low', 'open', 'volume']
-            return df
+            return pd.DataFrame({name: kwargs[key] for key, name in Candles.columns.items()},
+                                index=Data.to_datetime(kwargs['t']), dtype=float)
 
 
 @dataclass
@@ -65,19 +91,22 @@ class Trash(Data):
 
 
 class TechnicalIndic(Data):
+    discarded = frozenset(Trash.field_names)
+
     def __init__(self, **kwargs):
         self.kwargs = kwargs
 
     @property
     def object(self):
-        return TechnicalIndic.from_json_outer(**self.kwargs).__dict__['kwargs']
+        return {key: value for key, value in self.kwargs.items() if key not in TechnicalIndic.discarded}
 
+    @timed("model_parse_seconds")
     def get(self, frequency: str) -> pd.DataFrame:
         freq = frequency
-        df = pd.DataFrame(self.object.values(), index=self.object.keys()).T
-        df['t'] = df['t'].apply(lambda x: datetime.fromtimestamp(x))
-        df.columns = [indic + '_' + str(freq) if indic not in ['t', 'c'] else indic for indic in df.columns]
-        return df.set_index('t', drop=True)
+        obj = self.object
+        return pd.DataFrame({indic + '_' + str(freq) if indic != 'c' else indic: values
+                             for indic, values in obj.items() if indic != 't'},
+                            index=Data.to_datetime(obj['t']))
 
 
 @dataclass
@@ -89,12 +118,14 @@ class News(Data):
 
     @staticmethod
     def get(time: int, **kwargs) -> pd.DataFrame:
-        delta = time
-        kwargs['t'] = kwargs.pop('datetime')
-        obj_dict = News.dict_from_json(**kwargs)
-        df = pd.DataFrame([obj_dict.values()], columns=obj_dict.keys())
-        df['t'] = datetime.fromtimestamp(df['t']) + timedelta(hours=delta)
-        return df.set_index('t', drop=True)
+        return News.get_list([kwargs], time)
+
+    @staticmethod
+    @timed("model_parse_seconds")
+    def get_list(items: list, time: int, nb: int = None) -> pd.DataFrame:
+        df = pd.DataFrame(items[0:nb], columns=['datetime', 'headline', 'source', 'url'])
+        df.index = Data.to_datetime(df.pop('datetime')) + timedelta(hours=time)
+        return df
 
 
 @dataclass
@@ -105,9 +136,10 @@ class Financials(Data):
     marketCapitalization: int = None
 
     @staticmethod
+    @timed("model_parse_seconds")
     def get(**kwargs) -> pd.DataFrame:
         symbol = kwargs['symbol']
-        kwargs = kwargs['metric']
+        kwargs = dict(kwargs['metric'])
         kwargs['priceRelativeToSP500OneYear'] = kwargs.pop('priceRelativeToS&P50052Week')
         kwargs['OneYearPriceReturnDaily'] = kwargs.pop('52WeekPriceReturnDaily')
         obj_dict = Financials.dict_from_json(**kwargs)
@@ -125,14 +157,18 @@ class Insiders(Data):
 
     @staticmethod
     def get(**kwargs) -> pd.DataFrame:
-        obj_dict = Insiders.dict_from_json(**kwargs)
-        df = pd.DataFrame([obj_dict.values()], columns=obj_dict.keys())
-        if df["transactionPrice"].values != 0:
-            return df.set_index('transactionDate', drop=True)
-        else:
-            name = obj_dict['name']
-            date = obj_dict['transactionDate']
+        df = Insiders.get_list([kwargs])
+        if not df.empty:
+            return df
+
+    @staticmethod
+    @timed("model_parse_seconds")
+    def get_list(items: list, nb: int = None) -> pd.DataFrame:
+        df = pd.DataFrame(items, columns=['name', 'share', 'change', 'transactionDate', 'transactionPrice'])
+        zero_sum = df['transactionPrice'] == 0
+        for date, name in zip(df.loc[zero_sum, 'transactionDate'], df.loc[zero_sum, 'name']):
             print(f'{date} : {name} had a zero-sum transaction')
+        return df[~zero_sum].set_index('transactionDate', drop=True).iloc[0:nb]
 
 
 @dataclass
@@ -146,8 +182,12 @@ class Reco(Data):
 
     @staticmethod
     def get(**kwargs) -> pd.DataFrame:
-        obj_dict = Reco.dict_from_json(**kwargs)
-        df = pd.DataFrame([obj_dict.values()], columns=obj_dict.keys())
+        return Reco.get_list([kwargs])
+
+    @staticmethod
+    @timed("model_parse_seconds")
+    def get_list(items: list) -> pd.DataFrame:
+        df = pd.DataFrame(items, columns=['buy', 'hold', 'period', 'sell', 'strongBuy', 'strongSell'])
         return df.set_index('period', drop=True)
 
 
@@ -159,8 +199,12 @@ class Earns(Data):
 
     @staticmethod
     def get(**kwargs) -> pd.DataFrame:
-        obj_dict = Earns.dict_from_json(**kwargs)
-        df = pd.DataFrame([obj_dict.values()], columns=obj_dict.keys())
+        return Earns.get_list([kwargs])
+
+    @staticmethod
+    @timed("model_parse_seconds")
+    def get_list(items: list) -> pd.DataFrame:
+        df = pd.DataFrame(items, columns=['actual', 'surprisePercent', 'period'])
         return df.set_index('period', drop=True)
 
 
@@ -172,6 +216,10 @@ class Sentiment(Data):
 
     @staticmethod
     def get(**kwargs) -> pd.DataFrame:
-        obj_dict = Sentiment.dict_from_json(**kwargs)
-        df = pd.DataFrame([obj_dict.values()], columns=obj_dict.keys())
+        return Sentiment.get_list([kwargs])
+
+    @staticmethod
+    @timed("model_parse_seconds")
+    def get_list(items: list, nb: int = None) -> pd.DataFrame:
+        df = pd.DataFrame(items[0:nb], columns=['atTime', 'mention', 'score'])
         return df.set_index('atTime', drop=True)
\ No newline at end of file
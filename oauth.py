@@ -0,0 +1,118 @@
+import time
+from threading import Lock
+from typing import Callable, Union
+
+from authlib.integrations.requests_client import OAuth2Session
+from base import Client
+from models.security import *
+
+
+class TokenCache:
+    """
+    Keeps an OAuth2 token until `refresh_margin` seconds before its expiry.
+    Concurrent callers needing a new token wait on a single shared fetch.
+    """
+
+    def __init__(self, refresh_margin: float = 60):
+        self._refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = None
+        self._lock = Lock()
+
+    @property
+    def valid(self) -> bool:
+        if self._token is None:
+            return False
+        return self._expires_at is None or time.time() < self._expires_at - self._refresh_margin
+
+    @staticmethod
+    def _expiry(token: dict) -> Union[float, None]:
+        if token.get('expires_at') is not None:
+            return float(token['expires_at'])
+        if token.get('expires_in') is not None:
+            return time.time() + float(token['expires_in'])
+        return None
+
+    def get(self, fetch: Callable[[], dict]) -> dict:
+        if self.valid:
+            return self._token
+        with self._lock:
+            if not self.valid:
+                token = fetch()
+                self._expires_at = self._expiry(token)
+                self._token = token
+        return self._token
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._expires_at = None
+
+
+class OAuth2Client(Client):
+    __token_uri = None
+
+    def __init__(self, credentials: Union[ClientCredentials, PasswordCredentials], refresh_margin: float = 60,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.credentials = credentials
+        self._token_cache = TokenCache(refresh_margin)
+        self._session_lock = Lock()
+
+    @property
+    def headers(self):
+        """
+        Must be implement in subclasses to feed request headers
+        Returns
+        -------
+
+        """
+        raise NotImplementedError
+
+    @property
+    def token_uri(self):
+        """
+
+        Returns
+        -------
+            str
+                the url for token request
+        """
+        return self.base_url + self.__token_uri
+
+    @property
+    def session(self) -> OAuth2Session:
+        """
+
+        Returns
+        -------
+            OAuth2Session
+                the session holding a valid token, the token is fetched once and reused until it expires
+        """
+        if not issubclass(type(self.credentials), Credentials):
+            raise TypeError(f'credentials should be an instance of subclasses from type Credentials')
+
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._mount_adapters(OAuth2Session(
+                    self.credentials.client_id,
+                    self.credentials.client_secret,
+                    scope=[scope.value for scope in self.credentials.scope]
+                ))
+            _session = self._session
+
+        _session.token = self._token_cache.get(lambda: self._fetch_token(_session))
+        return _session
+
+    def _fetch_token(self, session: OAuth2Session) -> dict:
+        if isinstance(self.credentials, PasswordCredentials):
+            return session.fetch_token(
+                url=self.token_uri,
+                username=self.credentials.user,
+                password=self.credentials.password
+            )
+        return session.fetch_token(url=self.token_uri)
+
+    def close(self):
+        super().close()
+        self._token_cache.invalidate()
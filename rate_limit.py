@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import math
+import time
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Mapping, Union
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """
+        Takes one token, possibly borrowing it from the future
+        Returns
+        -------
+            float
+                the seconds to wait before the token may be spent
+        """
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0. if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Per-second and per-minute token buckets, callers queue until both grant a token.
+    A 429 or an exhausted X-Ratelimit-Remaining pauses every caller until the advertised reset and halves the
+    throughput, which then recovers by `recovery` on each successful response.
+    """
+    _shared = {}
+    _shared_kwargs = {}
+    _shared_lock = Lock()
+
+    def __init__(self, calls_per_second: float = 30, calls_per_minute: float = 60, min_factor: float = 0.1,
+                 recovery: float = 1.05, max_backoff: float = 60):
+        self._buckets = [TokenBucket(calls_per_second, calls_per_second),
+                         TokenBucket(calls_per_minute / 60, calls_per_minute)]
+        self._min_factor = min_factor
+        self._recovery = recovery
+        self._max_backoff = max_backoff
+        self._factor = 1.
+        self._throttled = 0
+        self._blocked_until = 0.
+        self._lock = Lock()
+
+    @classmethod
+    def shared(cls, name: str, **kwargs) -> 'RateLimiter':
+        """
+        Returns
+        -------
+            RateLimiter
+                the process-wide limiter registered under `name`, created with `kwargs` on first use, later
+                differing `kwargs` are logged and ignored
+        """
+        with cls._shared_lock:
+            if name not in cls._shared:
+                cls._shared[name] = cls(**kwargs)
+                cls._shared_kwargs[name] = kwargs
+            elif kwargs != cls._shared_kwargs[name]:
+                logger.warning("Rate limiter %s is shared with %s, ignoring %s", name, cls._shared_kwargs[name],
+                               kwargs)
+            return cls._shared[name]
+
+    @property
+    def factor(self) -> float:
+        return self._factor
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(bucket.reserve(now) for bucket in self._buckets)
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _parse_number(value: Union[str, None]) -> Union[float, None]:
+        """
+        Returns
+        -------
+            float
+                the header value as a finite number, None when it is missing or malformed
+        """
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return number if math.isfinite(number) else None
+
+    @staticmethod
+    def parse_retry_after(value: Union[str, None]) -> Union[float, None]:
+        if value is None:
+            return None
+        seconds = RateLimiter._parse_number(value)
+        if seconds is not None:
+            return max(seconds, 0.)
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.)
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    def _set_factor(self, factor: float):
+        self._factor = min(1., max(self._min_factor, factor))
+        for bucket in self._buckets:
+            bucket.rate = bucket.base_rate * self._factor
+
+    def _block(self, seconds: float):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def observe(self, status_code: int, headers: Mapping = None):
+        """
+        Feeds back a response so that the limiter adapts to the server quota
+        """
+        headers = headers or {}
+        with self._lock:
+            if status_code == 429:
+                self._throttled += 1
+                retry_after = self.parse_retry_after(headers.get('Retry-After'))
+                if retry_after is None:
+                    retry_after = min(2 ** (self._throttled - 1), self._max_backoff)
+                self._set_factor(self._factor / 2)
+                self._block(retry_after)
+                return
+            self._throttled = 0
+            self._set_factor(self._factor * self._recovery)
+            remaining = self._parse_number(headers.get('X-Ratelimit-Remaining'))
+            reset = self._parse_number(headers.get('X-Ratelimit-Reset'))
+            if remaining is not None and reset is not None and remaining < 1:
+                self._block(min(max(reset - time.time(), 0.), self._max_backoff))
@@ -0,0 +1,170 @@
+import math
+from typing import Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from trading_calendar import TradingCalendar
+
+Prices = Union[pd.Series, pd.DataFrame]
+
+
+class Returns:
+    """
+    Return and risk figures of a close serie or of a (dates x symbols) panel of closes, annualised with the number
+    of bars a year holds at the candles' resolution. Intraday bars count the bars of a regular NYSE session, as
+    TradingCalendar.bars_per_session does.
+    """
+    trading_days = 252
+    intraday = ["1", "5", "15", "30", "60"]
+    periods = {"D": 252, "W": 52, "M": 12}
+
+    @staticmethod
+    def periods_per_year(index: pd.DatetimeIndex = None, resolution: str = None) -> float:
+        """
+        Returns
+        -------
+            float
+                the bars per year of `resolution`, inferred from the median spacing of `index` otherwise
+        """
+        if resolution is not None:
+            if resolution in Returns.intraday:
+                return Returns.trading_days * TradingCalendar.nyse().bars_per_session(resolution)
+            if resolution not in Returns.periods:
+                raise Exception(f'Unknown resolution {resolution}, supported ones are '
+                                f'{Returns.intraday + list(Returns.periods)}')
+            return Returns.periods[resolution]
+        if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+            return Returns.trading_days
+        spacing = pd.TimedeltaIndex(np.diff(index.values)).median()
+        if spacing >= pd.Timedelta(days=28):
+            return 12
+        if spacing >= pd.Timedelta(days=5):
+            return 52
+        if spacing >= pd.Timedelta(days=1):
+            return Returns.trading_days
+        bar_minutes = spacing / pd.Timedelta(minutes=1)
+        return Returns.trading_days * math.ceil(TradingCalendar.nyse().session_minutes / bar_minutes)
+
+    @staticmethod
+    def min_annualised_periods(periods_per_year: float) -> float:
+        """
+        Returns
+        -------
+            float
+                the bars of one trading day, the shortest span annualised: raising the growth of a few intraday bars
+                to the power of a year's bars overflows
+        """
+        return max(1., periods_per_year / Returns.trading_days)
+
+    @staticmethod
+    def _periods(prices: Prices, resolution: str = None, periods_per_year: float = None) -> float:
+        if periods_per_year is not None:
+            return periods_per_year
+        return Returns.periods_per_year(prices.index, resolution)
+
+    @staticmethod
+    def simple(prices: Prices) -> Prices:
+        return prices.pct_change(fill_method=None).iloc[1:]
+
+    @staticmethod
+    def log(prices: Prices) -> Prices:
+        return np.log(prices).diff().iloc[1:]
+
+    @staticmethod
+    def cumulative(prices: Prices) -> Prices:
+        return (prices / prices.iloc[0] - 1).iloc[1:]
+
+    @staticmethod
+    def annualised_cumulative(prices: Prices, resolution: str = None, periods_per_year: float = None) -> Prices:
+        """
+        Returns
+        -------
+            pd.Series or pd.DataFrame
+                the cumulative return up to each bar expressed as a yearly rate, (P_t / P_0) ** (periods / t) - 1,
+                the plain cumulative return while t is shorter than one trading day
+        """
+        periods = Returns._periods(prices, resolution, periods_per_year)
+        growth = (prices / prices.iloc[0]).iloc[1:]
+        elapsed = np.arange(1, len(prices))
+        exponent = np.where(elapsed >= Returns.min_annualised_periods(periods), periods / elapsed, 1.)
+        if isinstance(prices, pd.DataFrame):
+            exponent = exponent[:, None]
+        return growth ** exponent - 1
+
+    @staticmethod
+    def annualised_return(prices: Prices, resolution: str = None, periods_per_year: float = None):
+        periods = Returns._periods(prices, resolution, periods_per_year)
+        elapsed = len(prices) - 1
+        exponent = periods / elapsed if elapsed >= Returns.min_annualised_periods(periods) else 1.
+        return (prices.iloc[-1] / prices.iloc[0]) ** exponent - 1
+
+    @staticmethod
+    def annualised_volatility(prices: Prices, resolution: str = None, periods_per_year: float = None):
+        periods = Returns._periods(prices, resolution, periods_per_year)
+        return Returns.simple(prices).std() * np.sqrt(periods)
+
+    @staticmethod
+    def sharpe(prices: Prices, resolution: str = None, periods_per_year: float = None, risk_free: float = 0.):
+        periods = Returns._periods(prices, resolution, periods_per_year)
+        excess = Returns.simple(prices) - risk_free / periods
+        return excess.mean() / excess.std() * np.sqrt(periods)
+
+    @staticmethod
+    def drawdown(prices: Prices) -> Prices:
+        return prices / prices.cummax() - 1
+
+    @staticmethod
+    def max_drawdown(prices: Prices):
+        return Returns.drawdown(prices).min()
+
+    @staticmethod
+    def rolling_volatility(prices: Prices, window: int, resolution: str = None,
+                           periods_per_year: float = None) -> Prices:
+        periods = Returns._periods(prices, resolution, periods_per_year)
+        return Returns.simple(prices).rolling(window).std() * np.sqrt(periods)
+
+    @staticmethod
+    def rolling_sharpe(prices: Prices, window: int, resolution: str = None, periods_per_year: float = None,
+                       risk_free: float = 0.) -> Prices:
+        periods = Returns._periods(prices, resolution, periods_per_year)
+        rolling = (Returns.simple(prices) - risk_free / periods).rolling(window)
+        return rolling.mean() / rolling.std() * np.sqrt(periods)
+
+    @staticmethod
+    def rolling_max_drawdown(prices: Prices, window: int) -> Prices:
+        """
+        Returns
+        -------
+            pd.Series or pd.DataFrame
+                the deepest peak-to-trough loss within the `window` bars ending at each bar
+        """
+        values = prices.to_numpy(dtype=float)
+        values = values[:, None] if values.ndim == 1 else values
+        result = np.full(values.shape, np.nan)
+        if len(values) >= window:
+            windows = sliding_window_view(values, window, axis=0)
+            result[window - 1:] = np.nanmin(windows / np.fmax.accumulate(windows, axis=-1) - 1, axis=-1)
+        if isinstance(prices, pd.Series):
+            return pd.Series(result[:, 0], index=prices.index, name=prices.name)
+        return pd.DataFrame(result, index=prices.index, columns=prices.columns)
+
+    @staticmethod
+    def summary(prices: Prices, resolution: str = None, periods_per_year: float = None,
+                risk_free: float = 0.) -> pd.DataFrame:
+        """
+        Returns
+        -------
+            pd.DataFrame
+                total and annualised return, annualised volatility, Sharpe ratio and max drawdown per symbol
+        """
+        periods = Returns._periods(prices, resolution, periods_per_year)
+        prices = prices.to_frame() if isinstance(prices, pd.Series) else prices
+        return pd.DataFrame({
+            "return": prices.iloc[-1] / prices.iloc[0] - 1,
+            "annualised_return": Returns.annualised_return(prices, periods_per_year=periods),
+            "annualised_volatility": Returns.annualised_volatility(prices, periods_per_year=periods),
+            "sharpe": Returns.sharpe(prices, periods_per_year=periods, risk_free=risk_free),
+            "max_drawdown": Returns.max_drawdown(prices),
+        })
@@ -0,0 +1,86 @@
+import asyncio
+import copy
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Lets concurrent calls with the same key share one execution: the first caller runs `fetch`, callers arriving
+    while it is in flight wait for it and receive its exception or a deep copy of its result, as does the first
+    caller when there were any, so that no caller can mutate what another one gets
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = Lock()
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fetch: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Returns
+        -------
+            tuple
+                the result and whether it was shared from another caller's execution
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+        try:
+            call.result = fetch()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        # no follower can join once the call is removed, the leader copies too when some did so that whatever
+        # its caller does with the result does not race with the followers copying it
+        return copy.deepcopy(call.result) if call.followers else call.result, False
+
+
+class _AsyncCall:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.followers = 0
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio counterpart of SingleFlight, the shared execution is shielded so that a cancelled caller does not
+    cancel it for the others
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable]) -> Tuple[Any, bool]:
+        call = self._calls.get(key)
+        if call is not None:
+            call.followers += 1
+            self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(call.task)), True
+        call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fetch()))
+        call.task.add_done_callback(lambda done: self._calls.pop(key) if self._calls.get(key) is call else None)
+        result = await asyncio.shield(call.task)
+        return copy.deepcopy(result) if call.followers else result, False
@@ -0,0 +1,215 @@
+import math
+from bisect import bisect_right, insort
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from returns import Returns
+
+
+class P2Quantile:
+    """
+    P² estimate of one quantile (Jain & Chlamtac) kept with five markers, exact up to five observations
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self._heights = []
+        self._positions = [1., 2., 3., 4., 5.]
+        self._desired = [1., 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.]
+        self._increments = [0., p / 2, p, (1 + p) / 2, 1.]
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self._heights, self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def _linear(self, i: int, d: int) -> float:
+        q, n = self._heights, self._positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    def update(self, x: float):
+        q, n = self._heights, self._positions
+        if len(q) < 5:
+            insort(q, x)
+            return
+        if x < q[0]:
+            q[0], k = x, 0
+        elif x >= q[4]:
+            q[4], k = x, 3
+        else:
+            k = bisect_right(q, x) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+        for i in range(1, 4):
+            delta = self._desired[i] - n[i]
+            if (delta >= 1 and n[i + 1] - n[i] > 1) or (delta <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if delta > 0 else -1
+                height = self._parabolic(i, d)
+                q[i] = height if q[i - 1] < height < q[i + 1] else self._linear(i, d)
+                n[i] += d
+
+    @property
+    def value(self) -> float:
+        if not self._heights:
+            return np.nan
+        if len(self._heights) < 5 or self._positions[4] == 5:
+            return float(np.quantile(self._heights, self.p))
+        return self._heights[2]
+
+
+class RunningStats:
+    """
+    Count, mean, variance, skewness, kurtosis, extrema and quantile sketches of a stream updated in O(1) per
+    observation, the central moments follow Welford's update extended to the third and fourth order (Pébay).
+    Skewness and kurtosis are bias-adjusted like pandas'.
+    """
+
+    def __init__(self, quantiles: Tuple[float, ...] = (0.25, 0.5, 0.75)):
+        self.count = 0
+        self.mean = 0.
+        self._m2 = 0.
+        self._m3 = 0.
+        self._m4 = 0.
+        self.min = np.nan
+        self.max = np.nan
+        self._quantiles = [P2Quantile(p) for p in quantiles]
+
+    def update(self, x: float):
+        if math.isnan(x):
+            return
+        n1 = self.count
+        self.count = n = n1 + 1
+        delta = x - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term = delta * delta_n * n1
+        self.mean += delta_n
+        self._m4 += term * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self._m2 - 4 * delta_n * self._m3
+        self._m3 += term * delta_n * (n - 2) - 3 * delta_n * self._m2
+        self._m2 += term
+        self.min = x if n == 1 else min(self.min, x)
+        self.max = x if n == 1 else max(self.max, x)
+        for quantile in self._quantiles:
+            quantile.update(x)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance) if self.count > 1 else np.nan
+
+    @property
+    def skew(self) -> float:
+        n = self.count
+        if n < 3 or self._m2 == 0:
+            return np.nan
+        g1 = math.sqrt(n) * self._m3 / self._m2 ** 1.5
+        return math.sqrt(n * (n - 1)) / (n - 2) * g1
+
+    @property
+    def kurtosis(self) -> float:
+        n = self.count
+        if n < 4 or self._m2 == 0:
+            return np.nan
+        g2 = n * self._m4 / self._m2 ** 2 - 3
+        return ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3))
+
+    def quantile(self, p: float) -> float:
+        for quantile in self._quantiles:
+            if quantile.p == p:
+                return quantile.value
+        raise Exception(f'Quantile {p} is not tracked, tracked ones are {[q.p for q in self._quantiles]}')
+
+    def describe(self) -> pd.Series:
+        """
+        Returns
+        -------
+            pd.Series
+                the rows of pd.Series.describe followed by skew and kurt
+        """
+        rows = {"count": float(self.count), "mean": self.mean if self.count else np.nan, "std": self.std,
+                "min": self.min}
+        rows.update({f"{quantile.p * 100:g}%": quantile.value for quantile in self._quantiles})
+        rows.update({"max": self.max, "skew": self.skew, "kurt": self.kurtosis})
+        return pd.Series(rows)
+
+
+class ReturnStats:
+    """
+    Simple returns of a price stream and their cumulative return expressed as a yearly rate once the bars span a
+    trading day, folded bar by bar.
+    Only bars after the last one seen are processed, a bar revised after it was folded is not re-read.
+    """
+
+    def __init__(self, periods_per_year: float = 252, quantiles: Tuple[float, ...] = (0.25, 0.5, 0.75)):
+        self._periods_per_year = periods_per_year
+        self._min_periods = Returns.min_annualised_periods(periods_per_year)
+        self.returns = RunningStats(quantiles)
+        self.cumulative = RunningStats(quantiles)
+        self._growth = 1.
+        self._count = 0
+        self.first_index = None
+        self.last_index = None
+        self.last_price = None
+        self._index_name = None
+        self._index: List = []
+        self._returns: List[float] = []
+        self._cumulative: List[float] = []
+
+    def update(self, price: float, index=None):
+        if self.last_price is not None:
+            ret = price / self.last_price - 1
+            self._growth *= 1 + ret
+            exponent = self._periods_per_year / self._count if self._count >= self._min_periods else 1.
+            cumulative = self._growth ** exponent - 1
+            self.returns.update(ret)
+            self.cumulative.update(cumulative)
+            self._index.append(index)
+            self._returns.append(ret)
+            self._cumulative.append(cumulative)
+        else:
+            self.first_index = index
+        self.last_price = price
+        self.last_index = index
+        self._count += 1
+
+    def extends(self, serie: pd.Series) -> bool:
+        """
+        Returns
+        -------
+            bool
+                whether `serie` starts where the folded bars start and still holds the last one unchanged
+        """
+        if self.last_index is None:
+            return True
+        return not serie.empty and serie.index[0] == self.first_index and self.last_index in serie.index \
+            and serie[self.last_index] == self.last_price
+
+    def update_series(self, serie: pd.Series) -> int:
+        """
+        Returns
+        -------
+            int
+                the number of new bars folded
+        """
+        if self.last_index is not None:
+            serie = serie[serie.index > self.last_index]
+        self._index_name = serie.index.name
+        for index, price in zip(serie.index, serie.to_numpy(dtype=float)):
+            self.update(price, index)
+        return len(serie)
+
+    @property
+    def return_serie(self) -> pd.Series:
+        return pd.Series(self._returns, index=pd.Index(self._index, name=self._index_name), dtype=float)
+
+    @property
+    def cumulative_serie(self) -> pd.Series:
+        return pd.Series(self._cumulative, index=pd.Index(self._index, name=self._index_name), dtype=float)
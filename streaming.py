@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from threading import Lock, Thread
+from typing import List
+
+import pandas as pd
+import websockets
+
+from decoding import codec
+from models.finnhub import Candles, Quote
+
+logger = logging.getLogger(__name__)
+
+
+class BarAggregator:
+    """
+    Rolling view of one symbol's trades: last price, session high/low and OHLCV bars of `bar_seconds`
+    """
+
+    def __init__(self, bar_seconds: int = 60, max_bars: int = 500):
+        self._bar_seconds = bar_seconds
+        self._bars = deque(maxlen=max_bars)
+        self.reference = None
+        self.last = None
+        self.high = None
+        self.low = None
+
+    def update(self, price: float, volume: float, timestamp: int):
+        start = timestamp // 1000 // self._bar_seconds * self._bar_seconds
+        if self.reference is None:
+            self.reference = price
+        self.last = price
+        self.high = price if self.high is None else max(self.high, price)
+        self.low = price if self.low is None else min(self.low, price)
+        if self._bars and self._bars[-1][0] == start:
+            bar = self._bars[-1]
+            bar[2], bar[3], bar[4], bar[5] = max(bar[2], price), min(bar[3], price), price, bar[5] + volume
+        elif not self._bars or self._bars[-1][0] < start:
+            self._bars.append([start, price, price, price, price, volume])
+
+    def quote(self) -> dict:
+        return {"c": self.last, "dp": (self.last / self.reference - 1) * 100, "h": self.high, "l": self.low}
+
+    def candles(self) -> dict:
+        t, o, h, l, c, v = zip(*self._bars)
+        return {"t": list(t), "o": list(o), "h": list(h), "l": list(l), "c": list(c), "v": list(v), "s": "ok"}
+
+
+class QuoteStream:
+    """
+    Subscribes to the Finnhub trades websocket from a background thread and aggregates trades per symbol.
+    The connection is re-opened with exponential backoff and every symbol re-subscribed, messages wait in a
+    bounded queue whose oldest entries are dropped when the aggregation falls behind. Messages that cannot be
+    decoded or aggregated are counted in `errors` and skipped. The subscribed symbols can be changed from any
+    thread, the set is shared with the loop thread under the aggregators' lock.
+    """
+    url = "wss://ws.finnhub.io"
+
+    def __init__(self, api_key: str = None, symbols: List[str] = (), url: str = None, bar_seconds: int = 60,
+                 max_bars: int = 500, queue_size: int = 10000, max_backoff: float = 30):
+        self._api_key = api_key
+        if url is not None:
+            self.url = url
+        self._symbols = set(symbols)
+        self._bar_seconds = bar_seconds
+        self._max_bars = max_bars
+        self._queue_size = queue_size
+        self._max_backoff = max_backoff
+        self._aggregators = {}
+        self._lock = Lock()
+        self._loop = None
+        self._task = None
+        self._consumer = None
+        self._thread = None
+        self._queue = None
+        self._websocket = None
+        self._stopping = False
+        self.dropped = 0
+        self.reconnects = 0
+        self.errors = 0
+        self.last_error = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self) -> 'QuoteStream':
+        if self._thread is None:
+            self._stopping = False
+            self._loop = asyncio.new_event_loop()
+            self._task = self._loop.create_task(self._run())
+            self._thread = Thread(target=self._run_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping = True
+            self._loop.call_soon_threadsafe(self._task.cancel)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+
+    def _run_loop(self):
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+
+    def _aggregator(self, symbol: str) -> BarAggregator:
+        if symbol not in self._aggregators:
+            self._aggregators[symbol] = BarAggregator(self._bar_seconds, self._max_bars)
+        return self._aggregators[symbol]
+
+    def seed(self, symbol: str, previous_close: float):
+        """
+        Sets the price the change percent is computed against, the first streamed trade otherwise
+        """
+        with self._lock:
+            self._aggregator(symbol).reference = previous_close
+
+    def _send(self, message_type: str, symbols: List[str]):
+        if self._loop is not None and self._websocket is not None:
+            asyncio.run_coroutine_threadsafe(self._send_async(message_type, symbols), self._loop)
+
+    async def _send_async(self, message_type: str, symbols: List[str]):
+        for symbol in symbols:
+            await self._websocket.send(json.dumps({"type": message_type, "symbol": symbol}))
+
+    def subscribe(self, *symbols: str):
+        with self._lock:
+            self._symbols.update(symbols)
+        self._send("subscribe", list(symbols))
+
+    def unsubscribe(self, *symbols: str):
+        with self._lock:
+            self._symbols.difference_update(symbols)
+        self._send("unsubscribe", list(symbols))
+
+    @property
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self._symbols)
+
+    def get_quote(self, symbol: str) -> pd.DataFrame:
+        with self._lock:
+            aggregator = self._aggregators.get(symbol)
+            if aggregator is None or aggregator.last is None:
+                raise Exception(f'No trade streamed yet for {symbol}')
+            return Quote.get(**aggregator.quote())
+
+    def get_quotes(self, symbols: List[str] = None) -> pd.DataFrame:
+        symbols = self.symbols if symbols is None else symbols
+        with self._lock:
+            streamed = [symbol for symbol in symbols if symbol in self._aggregators
+                        and self._aggregators[symbol].last is not None]
+            return pd.DataFrame([self._aggregators[symbol].quote() for symbol in streamed], index=streamed) \
+                .rename(columns={"c": "spot", "dp": "changePercent", "h": "high", "l": "low"})
+
+    def get_bars(self, symbol: str) -> pd.DataFrame:
+        with self._lock:
+            aggregator = self._aggregators.get(symbol)
+            if aggregator is None or aggregator.last is None:
+                raise Exception(f'No trade streamed yet for {symbol}')
+            return Candles.get(**aggregator.candles())
+
+    def _enqueue(self, message: str):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    def _process(self, message: str):
+        message = codec.loads(message)
+        if message.get("type") != "trade":
+            return
+        with self._lock:
+            for trade in message.get("data", []):
+                self._aggregator(trade["s"]).update(trade["p"], trade.get("v", 0), trade["t"])
+
+    async def _consume(self):
+        while True:
+            message = await self._queue.get()
+            try:
+                self._process(message)
+            except Exception as error:
+                self.errors += 1
+                self.last_error = error
+                logger.warning("Skipped trades message %.200r : %r", message, error)
+
+    def _start_consumer(self):
+        self._consumer = asyncio.ensure_future(self._consume())
+        self._consumer.add_done_callback(self._on_consumer_done)
+
+    def _on_consumer_done(self, consumer: asyncio.Future):
+        if consumer.cancelled() or self._stopping:
+            return
+        self.last_error = consumer.exception()
+        logger.error("Trades consumer stopped, restarting it", exc_info=self.last_error)
+        self._start_consumer()
+
+    async def _run(self):
+        self._queue = asyncio.Queue(self._queue_size)
+        self._start_consumer()
+        url = self.url if self._api_key is None else f"{self.url}?token={self._api_key}"
+        backoff = 1
+        try:
+            while not self._stopping:
+                try:
+                    async with websockets.connect(url) as websocket:
+                        self._websocket = websocket
+                        backoff = 1
+                        await self._send_async("subscribe", self.symbols)
+                        async for message in websocket:
+                            self._enqueue(message)
+                except (OSError, websockets.exceptions.WebSocketException) as error:
+                    logger.warning("Trades websocket disconnected : %s", error)
+                finally:
+                    self._websocket = None
+                if not self._stopping:
+                    self.reconnects += 1
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self._max_backoff)
+        finally:
+            self._consumer.cancel()
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from async_finnhub_client import AsyncFinnhubClient
+from base import RequestError
+from benchmarks.mock_server import MockFinnhubServer
+from finnhub_client import FinnhubClient
+from instrumentation import Instrumentation, MetricsRegistry
+from market_store import MarketStore
+
+
+def _client(server, **kwargs):
+    return AsyncFinnhubClient("test", base_url=server.url, calls_per_second=1000, calls_per_minute=10 ** 6,
+                              **kwargs)
+
+
+def _range(days):
+    end = datetime.combine(datetime.today().date(), datetime.min.time())
+    return end - timedelta(days=days), end
+
+
+def test_async_client_matches_the_sync_client():
+    start, end = _range(25)
+    with MockFinnhubServer() as server:
+        async def run():
+            async with _client(server) as client:
+                client.candle_window_days = {"5": 3}
+                return await asyncio.gather(client.get_quote("AAPL"),
+                                            client.get_stock_candles("AAPL", "5", start, end),
+                                            client.get_basic_financials(["AAPL", "MSFT"]))
+
+        quote, candles, financials = asyncio.run(run())
+        client = FinnhubClient("test", base_url=server.url)
+        assert quote.equals(client.get_quote("AAPL"))
+        assert candles.equals(client.get_stock_candles("AAPL", "5", start, end))
+        assert financials.equals(client.get_basic_financials(["AAPL", "MSFT"]))
+        client.close()
+    assert len(candles) and candles.index.is_monotonic_increasing
+
+
+def test_async_client_retries_then_raises_on_server_errors():
+    records = []
+    instrumentation = Instrumentation(MetricsRegistry(), post_hooks=[records.append])
+    with MockFinnhubServer(error_rate=1., error_status=503) as server:
+        async def run():
+            async with _client(server, instrumentation=instrumentation, max_retries=2, backoff_factor=0) as client:
+                await client.get_quote("AAPL")
+
+        with pytest.raises(RequestError, match="status 503"):
+            asyncio.run(run())
+        assert server.requests == 3
+    assert records[-1].status == 503 and records[-1].error.startswith("RequestError")
+
+
+def test_sync_client_retries_then_raises_on_server_errors():
+    with MockFinnhubServer(error_rate=1., error_status=500) as server:
+        client = FinnhubClient("test", base_url=server.url, max_retries=2, backoff_factor=0)
+        with pytest.raises(RequestError, match="status 500"):
+            client.get_quote("AAPL")
+        client.close()
+        assert server.requests == 3
+
+
+def test_async_client_writes_to_the_market_store(tmp_path):
+    start, end = _range(25)
+    with MockFinnhubServer() as server:
+        async def run():
+            async with _client(server, market_store=MarketStore(str(tmp_path))) as client:
+                await client.compute_multiple_technical_indicator("AAPL", "D", start, end, ["sma"], [5])
+                await client.get_company_basic_financials("AAPL")
+
+        asyncio.run(run())
+    store = MarketStore(str(tmp_path))
+    assert not store.read("candles", "AAPL", "D").empty
+    assert not store.read_indicators("AAPL", "D").empty
+    assert not store.read("fundamentals", "AAPL", "snapshot").empty
+
+
+def test_fundamentals_are_served_from_the_market_store(tmp_path):
+    with MockFinnhubServer() as server:
+        client = FinnhubClient("test", base_url=server.url, market_store=MarketStore(str(tmp_path)))
+        fetched = client.get_company_basic_financials("AAPL")
+        client.close()
+
+        async def run():
+            async with _client(server, market_store=MarketStore(str(tmp_path))) as client:
+                return await client.get_company_basic_financials("AAPL")
+
+        served = asyncio.run(run())
+        assert server.requests == 1
+    assert list(served.index) == ["AAPL"]
+    assert served.iloc[0].tolist() == fetched.iloc[0].tolist()
+
+
+@pytest.mark.parametrize("max_peers", [1, 2, 3])
+def test_peers_financials_honour_max_peers(max_peers):
+    with MockFinnhubServer() as server:
+        client = FinnhubClient("test", base_url=server.url)
+        df = client.get_peers_basic_financials("AAPL", max_peers=max_peers)
+        client.close()
+
+        async def run():
+            async with _client(server) as client:
+                return await client.get_peers_basic_financials("AAPL", max_peers=max_peers)
+
+        df_async = asyncio.run(run())
+    assert list(df.index) == list(df_async.index)
+    assert len(df) == max_peers + 1 and df.index[0] == "AAPL"
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import Backtest, indicator_threshold, sma_cross
+from candle_store import CandleStore
+from indicators import Indicators
+from market_store import MarketStore
+from models.finnhub import Candles
+
+START = 1704067200
+
+
+def _close(symbols: int = 5, bars: int = 300) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=bars, freq="B")
+    return pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (bars, symbols)), axis=0)), index=index,
+                        columns=[f"S{i}" for i in range(symbols)])
+
+
+def test_process_pool_matches_single_process():
+    grid = {"fast": [5, 10], "slow": [20, 50]}
+    single = Backtest(_close(), cost=0.001, max_workers=1).run(sma_cross, grid)
+    pooled = Backtest(_close(), cost=0.001, max_workers=3).run(sma_cross, grid)
+    assert len(pooled) == 4 * 5
+    pd.testing.assert_frame_equal(single.sort_index(), pooled.sort_index())
+
+
+def test_lambda_rule_needs_a_single_process():
+    rule = lambda data, sign: np.full(data["close"].shape, float(sign))  # noqa: E731
+    with pytest.raises(Exception, match="max_workers=1"):
+        Backtest(_close(), max_workers=2).run(rule, {"sign": [1, -1]})
+    result = Backtest(_close(), max_workers=1).run(rule, {"sign": [1, -1]})
+    assert len(result) == 10
+    assert (result.loc[1, "pnl"] > -1).all()
+
+
+def test_from_store_without_candles(tmp_path):
+    with pytest.raises(Exception, match="No D candles stored for AAPL"):
+        Backtest.from_store(MarketStore(str(tmp_path)), ["AAPL"], "D", datetime(2024, 1, 1), datetime(2024, 2, 1))
+
+
+def test_from_store(tmp_path):
+    market_store, t = MarketStore(str(tmp_path)), [START + day * 86400 for day in range(30)]
+    close = list(np.linspace(100, 130, 30))
+    CandleStore(market_store).add("AAPL", "D", t[0], t[-1], {"c": close, "h": close, "l": close, "o": close,
+                                                             "v": [1.] * 30, "t": t, "s": "ok"})
+    candles = Candles.get(**CandleStore(market_store).payload("AAPL", "D", t[0], t[-1]))
+    market_store.write_indicators("AAPL", "D", Indicators.compute(candles, ["rsi"], [5]).drop(columns="close"))
+    backtest = Backtest.from_store(market_store, ["AAPL", "MSFT"], "D", datetime(2024, 1, 1), datetime(2024, 2, 15),
+                                   indicators=["rsi_5"], max_workers=1)
+    result = backtest.run(sma_cross, {"fast": [2], "slow": [5]})
+    assert list(result.index.get_level_values("symbol")) == ["AAPL"]
+    assert result["pnl"].iloc[0] > 0
+    shorted = backtest.run(indicator_threshold, {"column": ["rsi_5"], "lower": [0], "upper": [50]})
+    assert shorted["pnl"].iloc[0] < 0
@@ -0,0 +1,62 @@
+import os
+
+import cache
+from cache import ResponseCache
+
+LIVE, MOCK = "https://finnhub.io/api/v1", "http://127.0.0.1:8000/api/v1"
+
+
+def test_responses_expire_after_the_route_ttl(tmp_path, monkeypatch):
+    now = [1000.]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    responses = ResponseCache(str(tmp_path / "responses.sqlite"), ttl={"/quote": 5, "/stock/peers": 0})
+    responses.set("/quote", {"symbol": "AAPL"}, {"c": 1.})
+    responses.set("/stock/peers", {"symbol": "AAPL"}, ["MSFT"])
+    now[0] += 4
+    assert responses.get("/quote", {"symbol": "AAPL"}) == {"c": 1.}
+    assert responses.get("/stock/peers", {"symbol": "AAPL"}) is None
+    now[0] += 2
+    assert responses.get("/quote", {"symbol": "AAPL"}) is None
+    assert ResponseCache(str(tmp_path / "responses.sqlite")).get("/quote", {"symbol": "AAPL"}) is None
+
+
+def test_disk_hits_are_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    ResponseCache(path).set("/stock/metric", {"symbol": "AAPL", "metric": "all"}, {"metric": {"beta": 1.}})
+    responses = ResponseCache(path)
+    for _ in range(2):
+        assert responses.get("/stock/metric", {"metric": "all", "symbol": "AAPL"}) == {"metric": {"beta": 1.}}
+    assert responses.stats == {"memory_hits": 1, "disk_hits": 1, "misses": 0}
+
+
+def test_invalidate_drops_both_tiers(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    responses = ResponseCache(path)
+    for symbol in ["AAPL", "MSFT"]:
+        responses.set("/quote", {"symbol": symbol}, {"c": 1.})
+        responses.set("/stock/peers", {"symbol": symbol}, [symbol])
+    responses.invalidate("/quote", {"symbol": "AAPL"})
+    assert responses.get("/quote", {"symbol": "AAPL"}) is None
+    assert responses.get("/quote", {"symbol": "MSFT"}) is not None
+    responses.invalidate("/quote")
+    assert ResponseCache(path).get("/quote", {"symbol": "MSFT"}) is None
+    assert responses.get("/stock/peers", {"symbol": "MSFT"}) == ["MSFT"]
+    responses.invalidate()
+    assert ResponseCache(path).get("/stock/peers", {"symbol": "AAPL"}) is None
+
+
+def test_servers_do_not_share_responses(tmp_path):
+    responses = ResponseCache(str(tmp_path / "responses.sqlite"))
+    responses.set("/quote", {"symbol": "AAPL"}, {"c": 1.}, base_url=MOCK)
+    assert responses.get("/quote", {"symbol": "AAPL"}, base_url=LIVE) is None
+    assert ResponseCache(str(tmp_path / "responses.sqlite")).get("/quote", {"symbol": "AAPL"}, MOCK) == {"c": 1.}
+    responses.set("/quote", {"symbol": "AAPL"}, {"c": 2.}, base_url=LIVE)
+    responses.invalidate("/quote", {"symbol": "AAPL"}, base_url=MOCK)
+    assert responses.get("/quote", {"symbol": "AAPL"}, base_url=MOCK) is None
+    assert responses.get("/quote", {"symbol": "AAPL"}, base_url=LIVE) == {"c": 2.}
+
+
+def test_default_disk_tier_is_per_user(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    assert cache.user_cache_dir() == os.path.join(str(tmp_path), "finnhub")
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+import decoding
+from decoding import JSONCodec
+from models.finnhub import Candles, Financials, Quote
+
+PAYLOAD = {"c": [1.5, 2.25], "t": [1704067200, 1704153600], "s": "ok", "name": "café", "n": None}
+
+
+@pytest.mark.parametrize("backend", [name for name in JSONCodec.backends
+                                     if name == "json" or getattr(decoding, name) is not None])
+def test_backends_agree_with_the_standard_library(backend):
+    codec = JSONCodec(backend)
+    body = json.dumps(PAYLOAD).encode()
+    assert codec.decode(body) == codec.decode(body.decode()) == json.loads(body)
+    assert json.loads(codec.dumps(PAYLOAD)) == PAYLOAD
+    assert codec.decode(b"") is None
+
+
+def test_missing_backend_is_reported(monkeypatch):
+    monkeypatch.setattr(decoding, "msgspec", None)
+    with pytest.raises(Exception, match="msgspec is not installed"):
+        JSONCodec("msgspec")
+    assert JSONCodec().backend == ("orjson" if decoding.orjson is not None else "json")
+
+
+def test_field_names_are_compiled_per_model():
+    assert Quote.field_names == ("c", "dp", "h", "l")
+    assert Candles.field_names == ("c", "h", "l", "o", "t", "v")
+    assert Financials.dict_from_json(beta=1., extra=2.) == {"beta": 1., "priceRelativeToSP500OneYear": None,
+                                                            "OneYearPriceReturnDaily": None,
+                                                            "marketCapitalization": None}
+    assert Quote.from_json(c=1., h=2., pc=0.5) == Quote(c=1., h=2.)
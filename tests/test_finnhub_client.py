@@ -0,0 +1,79 @@
+import asyncio
+
+import pandas as pd
+
+from async_finnhub_client import AsyncFinnhubClient
+from benchmarks.mock_server import MockFinnhubServer
+from cache import LRUCache, ResponseCache
+from finnhub_client import FinnhubClient
+
+
+def _failing(symbol, *args):
+    raise Exception(f"no data for {symbol}")
+
+
+async def _failing_async(symbol, *args):
+    _failing(symbol)
+
+
+def test_every_symbol_failing_returns_empty_frames():
+    client = FinnhubClient(api_key="test")
+    client.get_quote = client.get_stock_candles = client.get_company_basic_financials = _failing
+    assert client.get_quotes(["AAPL", "MSFT"]).empty
+    assert client.get_candles_panel(["AAPL"], "D", None, None).empty
+    assert client.get_candles_panel(["AAPL"], "D", None, None, field="close").empty
+    assert client.get_basic_financials(["AAPL"]).empty
+    assert set(client.failures) == {"AAPL", "MSFT"}
+    client.close()
+
+
+def test_failures_are_cleared_once_the_symbol_succeeds():
+    client = FinnhubClient(api_key="test")
+    client.get_quote = _failing
+    client.get_quotes(["AAPL"])
+    client.get_quote = lambda symbol: pd.DataFrame({"c": [1.]})
+    assert list(client.get_quotes(["AAPL"]).index) == ["AAPL"]
+    assert client.failures == {}
+    client.close()
+
+
+def test_async_every_symbol_failing_returns_empty_frames():
+    async def run():
+        async with AsyncFinnhubClient(api_key="test") as client:
+            client.get_quote = client.get_company_basic_financials = _failing_async
+            assert (await client.get_quotes(["AAPL", "MSFT"])).empty
+            assert (await client.get_basic_financials(["AAPL"])).empty
+            return client.failures
+
+    assert set(asyncio.run(run())) == {"AAPL", "MSFT"}
+
+
+def test_memoized_is_bounded_and_follows_the_client_ttl():
+    client = FinnhubClient(api_key="test", cache=ResponseCache(path=None, ttl={"/stock/peers": 0}))
+    client._memo = LRUCache(2)
+    calls = []
+    fetch = lambda symbol: lambda: calls.append(symbol) or [symbol]
+    for symbol in ["A", "B", "C", "A"]:
+        assert client._memoized("/stock/metric", (symbol,), fetch(symbol)) == [symbol]
+    assert calls == ["A", "B", "C", "A"]
+    assert client._memoized("/stock/metric", ("C",), fetch("C")) == ["C"]
+    assert len(calls) == 4
+    client._memoized("/stock/peers", ("A",), fetch("A"))
+    client._memoized("/stock/peers", ("A",), fetch("A"))
+    assert len(calls) == 6
+    client.close()
+
+
+def test_requests_reuse_one_keep_alive_connection():
+    with MockFinnhubServer() as server:
+        client = FinnhubClient(api_key="test", base_url=server.url)
+        session = client.session
+        for symbol in ["AAPL", "MSFT", "AAPL", "GOOG"]:
+            client.get_quote(symbol)
+        assert client.session is session
+        assert (server.requests, server.connections) == (4, 1)
+        client.close()
+        client.get_quote("AAPL")
+        assert client.session is not session
+        assert server.connections == 2
+        client.close()
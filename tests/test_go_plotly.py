@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from go_plotly import Graph
+
+
+@pytest.fixture
+def shown(monkeypatch):
+    figures = []
+    monkeypatch.setattr(Graph, "_show", staticmethod(lambda fig, key=None, zoomed=False, hint=None:
+                                                      figures.append((fig, zoomed))))
+    return figures
+
+
+def _serie(size):
+    return pd.Series(np.cumsum(np.sin(np.arange(size))), index=pd.date_range("2024-01-02", periods=size, freq="min"))
+
+
+def test_lines_are_downsampled_to_max_points(shown):
+    Graph.plot_line_data(_serie(20000), key="line")
+    (fig, zoomed), = shown
+    assert not zoomed and fig.data[0].type == "scatter" and len(fig.data[0].y) <= Graph.max_points
+
+
+def test_zoomed_range_draws_every_point_with_webgl(shown, monkeypatch):
+    serie = _serie(20000)
+    selected = (str(serie.index[1000]), str(serie.index[7999]))
+    monkeypatch.setattr(Graph, "_selected_range", staticmethod(lambda key: selected))
+    Graph.plot_line_data(serie, key="line")
+    (fig, zoomed), = shown
+    assert zoomed and fig.data[0].type == "scattergl" and len(fig.data[0].y) == 7000
+
+
+def test_zoomed_candles_are_merged_to_the_width(shown, monkeypatch):
+    close = _serie(5000) + 100
+    df_candles = pd.DataFrame({"open": close, "high": close + 1, "low": close - 1, "close": close,
+                               "volume": 1.})
+    selected = (str(close.index[0]), str(close.index[999]))
+    monkeypatch.setattr(Graph, "_selected_range", staticmethod(lambda key: selected))
+    Graph.plot_candles(df_candles, key="candles")
+    (fig, zoomed), = shown
+    assert zoomed and len(fig.data[0].x) <= Graph.width
+    assert fig.data[0].high.max() == df_candles["high"].iloc[:1000].max()
+
+
+def _candles(size, **indicators):
+    close = _serie(size) + 100
+    return pd.DataFrame({"open": close.shift(fill_value=100.), "high": close + 1, "low": close - 1, "close": close,
+                         "volume": 1., **indicators})
+
+
+def test_candles_volume_and_indicators_share_the_x_axis():
+    data = _candles(50)
+    data["sma_10"], data["rsi_14"] = data["close"].rolling(10).mean(), 50.
+    fig = Graph.candles_figure(data)
+    rows = {trace.name: trace.yaxis for trace in fig.data}
+    assert rows == {"candles": "y", "sma_10": "y", "volume": "y2", "rsi_14": "y3"}
+    assert (fig.layout.xaxis.matches, fig.layout.xaxis2.matches) == ("x3", "x3")
+    rising = (data["close"] >= data["open"]).to_numpy()
+    assert list(fig.data[2].marker.color) == np.where(rising, "#26a69a", "#ef5350").tolist()
+    without_oscillators = Graph.candles_figure(_candles(50)).layout
+    assert "yaxis3" not in without_oscillators and without_oscillators.xaxis.matches == "x2"
+
+
+def test_resample_candles_merges_bars():
+    data = _candles(10, rsi_14=np.arange(10.))
+    resampled = Graph.resample_candles(data, 4)
+    assert len(resampled) == 4 and list(resampled.index) == list(data.index[::3])
+    first = data.iloc[:3]
+    assert resampled.iloc[0].to_dict() == {"open": first["open"].iloc[0], "high": first["high"].max(),
+                                           "low": first["low"].min(), "close": first["close"].iloc[-1],
+                                           "volume": 3., "rsi_14": 2.}
+    assert Graph.resample_candles(data, 0) is data
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import Indicators
+
+
+def _candles(size):
+    close = 100 + np.cumsum(np.sin(np.arange(size)))
+    return pd.DataFrame({"high": close + 1, "low": close - 1, "close": close},
+                        index=pd.date_range("2024-01-02", periods=size, freq="D"))
+
+
+@pytest.mark.parametrize("indicator", sorted(Indicators.lookback))
+def test_indicator_shorter_than_timeperiod_is_nan(indicator):
+    df_candles = _candles(10)
+    for field, values in getattr(Indicators, indicator)(*df_candles.to_numpy().T, 20).items():
+        assert len(values) == 10, field
+        if indicator != "mama":
+            assert np.isnan(values).all(), field
+
+
+@pytest.mark.parametrize("indicator", ["willr", "bbands", "midpoint", "midprice"])
+def test_rolling_indicator_is_defined_after_timeperiod(indicator):
+    df_candles = _candles(30)
+    for field, values in getattr(Indicators, indicator)(*df_candles.to_numpy().T, 20).items():
+        assert np.isnan(values[:19]).all(), field
+        assert np.isfinite(values[19:]).all(), field
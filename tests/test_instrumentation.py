@@ -0,0 +1,74 @@
+from benchmarks.mock_server import MockFinnhubServer
+from cache import ResponseCache
+from finnhub_client import FinnhubClient
+from instrumentation import Histogram, Instrumentation, MetricsRegistry, timed
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.))
+    for value in [0.05, 0.1, 0.5, 3.]:
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert (histogram.count, histogram.sum) == (4, 3.65)
+
+
+def test_prometheus_export():
+    registry = MetricsRegistry()
+    registry.increment("requests_total", route="/quote", status=200)
+    registry.increment("requests_total", 2, route="/quote", status=200)
+    registry.increment("requests_total", route='/a"b', status="error")
+    registry.observe("request_network_seconds", 0.2, route="/quote")
+    lines = registry.to_prometheus().splitlines()
+    assert lines[:3] == ['# TYPE requests_total counter', 'requests_total{route="/a\\"b",status="error"} 1',
+                         'requests_total{route="/quote",status="200"} 3']
+    assert '# TYPE request_network_seconds histogram' in lines
+    assert 'request_network_seconds_bucket{route="/quote",le="0.25"} 1' in lines
+    assert 'request_network_seconds_bucket{route="/quote",le="0.1"} 0' in lines
+    assert 'request_network_seconds_count{route="/quote"} 1' in lines
+    assert registry.snapshot()["counters"][1]["value"] == 3
+    registry.reset()
+    assert registry.to_prometheus() == "\n"
+
+
+def test_timed_observes_calls_unless_disabled():
+    registry = MetricsRegistry()
+
+    @timed("plot_seconds", registry=registry, kind="test")
+    def plot(fail: bool = False):
+        if fail:
+            raise ValueError
+        return 1
+
+    assert plot() == 1
+    try:
+        plot(fail=True)
+    except ValueError:
+        pass
+    histogram, = registry.snapshot()["histograms"]
+    assert histogram["labels"] == {"function": "test_timed_observes_calls_unless_disabled.<locals>.plot",
+                                   "kind": "test"}
+    assert histogram["count"] == 2
+    registry.enabled = False
+    plot()
+    assert registry.snapshot()["histograms"][0]["count"] == 2
+
+
+def test_client_requests_are_recorded():
+    registry, before, records = MetricsRegistry(), [], []
+    instrumentation = Instrumentation(registry, pre_hooks=[lambda route, params: before.append(route)],
+                                      post_hooks=[records.append])
+    with MockFinnhubServer() as server:
+        client = FinnhubClient("test", base_url=server.url, cache=ResponseCache(path=None),
+                               instrumentation=instrumentation)
+        client.get_quote("AAPL")
+        client.get_quote("AAPL")
+        client.close()
+    assert before == ["/quote", "/quote"]
+    fetched, cached = records
+    assert (fetched.status, fetched.attempts, fetched.cache_hit) == (200, 1, False) and fetched.bytes > 0
+    assert fetched.network_seconds > 0 and fetched.params == {"symbol": "AAPL"}
+    assert cached.cache_hit and cached.attempts == 0
+    counters = {(counter["name"], counter["labels"].get("status")): counter["value"]
+                for counter in registry.snapshot()["counters"]}
+    assert counters[("requests_total", "200")] == 1 and counters[("cache_hits_total", None)] == 1
+    assert counters[("response_bytes_total", None)] == fetched.bytes
@@ -0,0 +1,64 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _progressive_chart():
+    from datetime import datetime
+
+    import streamlit as st
+    from base import RequestError
+    from main import StreamFin
+
+    class FailingClient:
+        def candle_windows(self, *args):
+            return [(0, 1), (1, 2)]
+
+        def iter_stock_candles(self, *args):
+            raise RequestError("Rate limit still exceeded after retries")
+            yield
+
+    StreamFin.compute_chart_progressively(FailingClient(), st.empty(), "AAPL", "5", datetime(2024, 3, 1),
+                                          datetime(2024, 3, 28))
+
+
+def _broken_chart():
+    from datetime import datetime
+
+    import streamlit as st
+    from main import StreamFin
+
+    class BrokenClient:
+        def candle_windows(self, *args):
+            return [(0, 1), (1, 2)]
+
+        def iter_stock_candles(self, *args):
+            raise KeyError("close")
+            yield
+
+    StreamFin.compute_chart_progressively(BrokenClient(), st.empty(), "AAPL", "5", datetime(2024, 3, 1),
+                                          datetime(2024, 3, 28))
+
+
+def test_progressive_chart_records_request_errors():
+    at = AppTest.from_function(_progressive_chart).run()
+    assert not at.exception
+    assert at.session_state.chart_error == "AAPL : Rate limit still exceeded after retries"
+
+
+def test_progressive_chart_does_not_hide_other_errors():
+    at = AppTest.from_function(_broken_chart).run()
+    assert at.exception
+
+
+def test_fetches_are_cached_per_client():
+    from main import fetch_market
+
+    class Client:
+        def __init__(self, price):
+            self.price = price
+
+        def get_price(self, symbol):
+            return self.price
+
+    assert fetch_market(Client(1), ("key", "http://first"), "get_price", "AAPL") == 1
+    assert fetch_market(Client(2), ("key", "http://second"), "get_price", "AAPL") == 2
+    assert fetch_market(Client(3), ("key", "http://first"), "get_price", "AAPL") == 1
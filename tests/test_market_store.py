@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+from market_store import MarketStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START = 1704067200
+
+_WRITER = """
+import sys
+sys.path.insert(0, {root!r})
+import pandas as pd
+from market_store import MarketStore
+store = MarketStore({directory!r})
+for t in range({first}, {first} + {rows} * 60, 60):
+    store.write("candles", "AAPL", "1", pd.DataFrame({{"t": [t], "close": [float(t)]}}))
+"""
+
+_COVERAGE = """
+import sys
+sys.path.insert(0, {root!r})
+from candle_store import CandleStore
+from market_store import MarketStore
+store = CandleStore(MarketStore({directory!r}))
+for t in range({first}, {first} + {rows} * 120, 120):
+    store.add("AAPL", "1", t, t + 59, {{"s": "no_data"}})
+"""
+
+
+def test_concurrent_writers_keep_every_row(tmp_path):
+    workers, rows = 4, 15
+    writers = [subprocess.Popen([sys.executable, "-c", _WRITER.format(root=ROOT, directory=str(tmp_path),
+                                                                      first=START + worker * rows * 60, rows=rows)])
+               for worker in range(workers)]
+    assert all(writer.wait(timeout=120) == 0 for writer in writers)
+    df = MarketStore(str(tmp_path)).read("candles", "AAPL", "1")
+    assert len(df) == workers * rows
+    assert df["t"].is_unique
+
+
+def test_concurrent_coverage_updates_keep_every_range(tmp_path):
+    workers, rows = 4, 15
+    writers = [subprocess.Popen([sys.executable, "-c", _COVERAGE.format(root=ROOT, directory=str(tmp_path),
+                                                                        first=START + worker * rows * 120, rows=rows)])
+               for worker in range(workers)]
+    assert all(writer.wait(timeout=120) == 0 for writer in writers)
+    assert len(MarketStore(str(tmp_path)).read_coverage("AAPL", "1")) == workers * rows
@@ -0,0 +1,57 @@
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.mock_server import FIXTURES
+from models.finnhub import Candles, Data, Earns, Insiders, News, Reco, Sentiment, TechnicalIndic
+
+
+def _fixture(name: str):
+    with open(os.path.join(FIXTURES, name + ".json")) as file:
+        return json.load(file)
+
+
+def test_to_datetime_matches_fromtimestamp_across_daylight_saving():
+    # hourly over the March and November 2024 transitions of most zones
+    timestamps = list(range(1710028800, 1710028800 + 60 * 3600, 3600)) + \
+        list(range(1730592000, 1730592000 + 60 * 3600, 1800))
+    expected = [datetime.fromtimestamp(t) for t in timestamps]
+    assert list(Data.to_datetime(timestamps)) == expected
+
+
+def test_candles_are_parsed_column_wise():
+    payload = _fixture("stock_candle_D")
+    df = Candles.get(**payload)
+    assert list(df.columns) == ["close", "high", "low", "open", "volume"]
+    assert (df.dtypes == float).all()
+    assert list(df.index) == [datetime.fromtimestamp(t) for t in payload["t"]]
+    assert df["close"].tolist() == payload["c"] and df["volume"].tolist() == [float(v) for v in payload["v"]]
+
+
+def test_indicator_columns_are_suffixed_with_the_period():
+    payload = _fixture("indicator_sma")
+    df = TechnicalIndic(**payload).get(20)
+    assert list(df.columns) == ["c", "sma_20"]
+    assert df["sma_20"].tolist() == payload["sma"]
+
+
+def test_list_parsers_match_one_row_per_item():
+    news = _fixture("company-news")
+    df = News.get_list(news, 5, nb=3)
+    pd.testing.assert_frame_equal(df, pd.concat([News.get(5, **item) for item in news[:3]]))
+    assert df.index[0] == datetime.fromtimestamp(news[0]["datetime"]) + pd.Timedelta(hours=5)
+    for model, items in [(Reco, _fixture("stock_recommendation")), (Earns, _fixture("stock_earnings")),
+                         (Sentiment, _fixture("stock_social-sentiment")["reddit"])]:
+        pd.testing.assert_frame_equal(model.get_list(items), pd.concat([model.get(**item) for item in items]))
+
+
+def test_insiders_skip_zero_sum_transactions(capsys):
+    items = _fixture("stock_insider-transactions")["data"][:3]
+    items[1] = dict(items[1], transactionPrice=0)
+    df = Insiders.get_list(items)
+    assert df["name"].tolist() == [items[0]["name"], items[2]["name"]]
+    assert df.index.name == "transactionDate"
+    assert Insiders.get(**items[1]) is None
+    assert "zero-sum" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+from authlib.integrations.requests_client import OAuth2Session
+
+import oauth
+from models.security import ClientCredentials, PasswordCredentials, Scope
+from oauth import OAuth2Client, TokenCache
+
+
+class _Client(OAuth2Client):
+    base_url = "https://auth.example.com"
+    _OAuth2Client__token_uri = "/oauth/token"
+
+    @property
+    def headers(self):
+        return {}
+
+    def _get_url(self, route):
+        return self.base_url + route
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = []
+
+    def fetch_token(session, url, **kwargs):
+        calls.append((url, kwargs))
+        time.sleep(0.05)
+        return {"access_token": f"token-{len(calls)}", "token_type": "Bearer", "expires_in": 3600}
+
+    monkeypatch.setattr(OAuth2Session, "fetch_token", fetch_token)
+    return calls
+
+
+def test_token_is_refreshed_once_within_the_margin(monkeypatch):
+    now = [1000.]
+    monkeypatch.setattr(oauth.time, "time", lambda: now[0])
+    tokens = TokenCache(refresh_margin=60)
+    fetch = lambda: {"access_token": str(now[0]), "expires_in": 100}  # noqa: E731
+    assert tokens.get(fetch)["access_token"] == "1000.0"
+    now[0] += 39
+    assert tokens.get(fetch)["access_token"] == "1000.0"
+    now[0] += 1
+    assert tokens.get(fetch)["access_token"] == "1040.0"
+    tokens.invalidate()
+    assert not tokens.valid
+
+
+def test_token_without_expiry_is_kept():
+    tokens, calls = TokenCache(), []
+    for _ in range(3):
+        tokens.get(lambda: calls.append(1) or {"access_token": "a"})
+    assert len(calls) == 1
+
+
+def test_concurrent_callers_share_one_fetch():
+    tokens, calls, barrier = TokenCache(), [], Barrier(8)
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"access_token": "a", "expires_in": 3600}
+
+    def get(_):
+        barrier.wait()
+        return tokens.get(fetch)["access_token"]
+
+    with ThreadPoolExecutor(8) as executor:
+        assert list(executor.map(get, range(8))) == ["a"] * 8
+    assert len(calls) == 1
+
+
+def test_client_sessions_share_one_token_fetch(fetches):
+    client = _Client(ClientCredentials(scope=[Scope.READ], client_id="id", client_secret="secret"))
+    barrier = Barrier(8)
+
+    def token(_):
+        barrier.wait()
+        return client.session.token["access_token"]
+
+    with ThreadPoolExecutor(8) as executor:
+        assert set(executor.map(token, range(8))) == {"token-1"}
+    assert fetches == [("https://auth.example.com/oauth/token", {})]
+    client.close()
+    assert client.session.token["access_token"] == "token-2"
+
+
+def test_password_credentials_fetch_once_with_the_user(fetches):
+    credentials = PasswordCredentials(scope=[Scope.READ, Scope.WRITE], client_id="id", client_secret="secret",
+                                      user="alice", password="hunter2")
+    _Client(credentials).session
+    assert fetches == [("https://auth.example.com/oauth/token", {"username": "alice", "password": "hunter2"})]
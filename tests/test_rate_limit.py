@@ -0,0 +1,28 @@
+import logging
+import time
+
+from rate_limit import RateLimiter
+
+
+def test_malformed_headers_fall_back_to_the_default():
+    limiter = RateLimiter()
+    limiter.observe(200, {"X-Ratelimit-Remaining": "n/a", "X-Ratelimit-Reset": "soon"})
+    assert limiter._blocked_until == 0.
+    started = time.monotonic()
+    limiter.observe(429, {"Retry-After": "inf"})
+    assert 0 < limiter._blocked_until - started <= 1.5
+
+
+def test_exhausted_remaining_blocks_until_reset():
+    limiter = RateLimiter()
+    limiter.observe(200, {"X-Ratelimit-Remaining": "0", "X-Ratelimit-Reset": str(time.time() + 5)})
+    assert 4 < limiter._blocked_until - time.monotonic() <= 5
+
+
+def test_shared_warns_on_differing_kwargs(caplog):
+    first = RateLimiter.shared("test-shared", calls_per_second=5)
+    with caplog.at_level(logging.WARNING, logger="rate_limit"):
+        assert RateLimiter.shared("test-shared", calls_per_second=5) is first
+        assert not caplog.records
+        assert RateLimiter.shared("test-shared", calls_per_second=10) is first
+    assert "test-shared" in caplog.text
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from returns import Returns
+from stats import ReturnStats
+from trading_calendar import TradingCalendar
+
+
+def _intraday(prices):
+    return pd.Series(prices, index=pd.date_range("2024-03-04 09:30", periods=len(prices), freq="1min"), dtype=float)
+
+
+def test_annualised_cumulative_intraday_is_finite():
+    prices = _intraday([100, 101, 100.5, 102])
+    annualised = Returns.annualised_cumulative(prices, resolution="1")
+    assert np.isfinite(annualised).all()
+    np.testing.assert_allclose(annualised.to_numpy(), Returns.cumulative(prices).to_numpy())
+    assert np.isfinite(Returns.annualised_return(prices, resolution="1"))
+
+
+def test_annualised_cumulative_after_one_trading_day():
+    prices = _intraday(100 * np.cumprod(np.full(400, 1.00001)))
+    annualised = Returns.annualised_cumulative(prices, resolution="1")
+    assert np.isfinite(annualised).all()
+    expected = (prices.iloc[390] / prices.iloc[0]) ** (Returns.periods_per_year(resolution="1") / 390) - 1
+    assert np.isclose(annualised.iloc[389], expected)
+
+
+def test_return_stats_intraday_matches_returns():
+    prices = _intraday([100, 101, 100.5, 102])
+    stats = ReturnStats(Returns.periods_per_year(resolution="1"))
+    stats.update_series(prices)
+    pd.testing.assert_series_equal(stats.cumulative_serie, Returns.annualised_cumulative(prices, resolution="1"),
+                                   check_names=False, check_freq=False)
+    assert np.isfinite(stats.cumulative.describe()[["mean", "std", "min", "max"]]).all()
+
+
+def test_intraday_periods_follow_the_trading_calendar():
+    for resolution in ["1", "5", "15", "30", "60"]:
+        assert Returns.periods_per_year(resolution=resolution) == \
+            Returns.trading_days * TradingCalendar.nyse().bars_per_session(resolution)
+    assert Returns.periods_per_year(resolution="60") == 252 * 7
+    hourly = pd.date_range("2024-03-04 09:30", periods=7, freq="60min")
+    assert Returns.periods_per_year(hourly) == Returns.periods_per_year(resolution="60")
+    assert Returns.min_annualised_periods(Returns.periods_per_year(resolution="60")) == 7
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from async_finnhub_client import AsyncFinnhubClient
+from benchmarks.mock_server import MockFinnhubServer
+from finnhub_client import FinnhubClient
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_fetch_and_get_their_own_copy():
+    flight, calls, barrier = SingleFlight(), [], Barrier(4)
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"metric": {"beta": 1.}}
+
+    def caller():
+        barrier.wait()
+        result, _ = flight.do("key", fetch)
+        result["metric"].pop("beta")
+        return result
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(lambda _: caller(), range(4)))
+    assert len(calls) == 1 and flight.coalesced == 3
+    assert len({id(result) for result in results}) == 4
+
+
+def test_async_concurrent_calls_share_one_fetch_and_get_their_own_copy():
+    flight, calls = AsyncSingleFlight(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"metric": {"beta": 1.}}
+
+    async def caller():
+        result, _ = await flight.do("key", fetch)
+        return result["metric"].pop("beta")
+
+    async def run():
+        return await asyncio.gather(*[caller() for _ in range(4)])
+
+    assert asyncio.run(run()) == [1.] * 4
+    assert len(calls) == 1 and flight.coalesced == 3
+
+
+def test_identical_financials_requests_are_coalesced():
+    with MockFinnhubServer(latency=0.1) as server:
+        client = FinnhubClient("test", base_url=server.url, calls_per_second=1000, calls_per_minute=10 ** 6)
+        with ThreadPoolExecutor(8) as executor:
+            frames = list(executor.map(lambda _: client.get_company_basic_financials("AAPL"), range(8)))
+        client.close()
+        assert server.requests == 1
+        server.reset()
+
+        async def run():
+            async with AsyncFinnhubClient("test", base_url=server.url, calls_per_second=1000,
+                                          calls_per_minute=10 ** 6) as client:
+                return await asyncio.gather(*[client.get_company_basic_financials("AAPL") for _ in range(8)])
+
+        frames += asyncio.run(run())
+        assert server.requests == 1
+    assert all(frame.equals(frames[0]) for frame in frames)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from returns import Returns
+from stats import P2Quantile, ReturnStats, RunningStats
+
+
+def _prices(bars: int = 500) -> pd.Series:
+    rng = np.random.default_rng(1)
+    return pd.Series(100 * np.cumprod(1 + rng.normal(0, 0.01, bars)),
+                     index=pd.date_range("2023-01-02", periods=bars, freq="B", name="t"))
+
+
+def test_running_moments_match_pandas():
+    values = pd.Series(np.random.default_rng(2).standard_t(4, 2000))
+    stats = RunningStats()
+    for value in list(values) + [np.nan]:
+        stats.update(value)
+    expected = values.describe()
+    described = stats.describe()
+    np.testing.assert_allclose(described[["count", "mean", "std", "min", "max"]],
+                               expected[["count", "mean", "std", "min", "max"]])
+    assert described["skew"] == pytest.approx(values.skew())
+    assert described["kurt"] == pytest.approx(values.kurt())
+    assert described["50%"] == pytest.approx(expected["50%"], abs=0.05)
+
+
+def test_quantile_sketch():
+    quantile = P2Quantile(0.5)
+    for value in [3., 1., 2.]:
+        quantile.update(value)
+    assert quantile.value == 2.
+    values = np.random.default_rng(3).normal(size=20000)
+    quantile = P2Quantile(0.9)
+    for value in values:
+        quantile.update(value)
+    assert quantile.value == pytest.approx(np.quantile(values, 0.9), abs=0.02)
+    with pytest.raises(Exception, match="not tracked"):
+        RunningStats().quantile(0.1)
+
+
+def test_folding_new_bars_matches_a_full_pass():
+    prices = _prices()
+    periods = Returns.periods_per_year(resolution="D")
+    incremental = ReturnStats(periods)
+    for end in [1, 50, 51, 300, len(prices)]:
+        assert incremental.extends(prices.iloc[:end])
+        incremental.update_series(prices.iloc[:end])
+    full = ReturnStats(periods)
+    assert full.update_series(prices) == len(prices)
+    pd.testing.assert_series_equal(incremental.cumulative_serie, full.cumulative_serie)
+    pd.testing.assert_series_equal(incremental.return_serie, Returns.simple(prices), check_names=False,
+                                   check_freq=False)
+    pd.testing.assert_series_equal(full.cumulative_serie, Returns.annualised_cumulative(prices, resolution="D"),
+                                   check_names=False, check_freq=False)
+
+
+def test_revised_or_shifted_series_are_not_extensions():
+    prices = _prices(100)
+    stats = ReturnStats()
+    stats.update_series(prices.iloc[:50])
+    revised = prices.copy()
+    revised.iloc[49] += 1
+    assert not stats.extends(revised)
+    assert not stats.extends(prices.iloc[10:])
+    assert stats.extends(prices)
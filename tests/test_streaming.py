@@ -0,0 +1,55 @@
+import time
+from threading import Thread
+
+import pytest
+
+from benchmarks.mock_websocket import MockTradesServer
+from streaming import QuoteStream
+
+
+def _wait(condition, timeout: float = 5.):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("timed out waiting for the stream")
+        time.sleep(0.02)
+
+
+def test_replays_trades_and_skips_malformed_frames():
+    with MockTradesServer() as server, QuoteStream(symbols=["AAPL", "MSFT"], url=server.url) as stream:
+        _wait(lambda: stream.errors == 2 and not stream.get_quotes().empty
+              and stream.get_quote("AAPL")["spot"].iloc[0] == 187.05)
+        quote = stream.get_quote("AAPL")
+        assert quote["high"].iloc[0] == 187.25 and quote["low"].iloc[0] == 186.9
+        bars = stream.get_bars("AAPL")
+        assert bars["close"].tolist() == [187.25, 187.05] and bars["volume"].tolist() == [120, 340]
+        assert stream.get_quote("MSFT")["spot"].iloc[0] == 371.1
+        assert {subscription["symbol"] for subscription in server.subscriptions} == {"AAPL", "MSFT"}
+
+
+def test_resubscribes_after_disconnect():
+    with MockTradesServer(close_after_replay=True) as server, \
+            QuoteStream(symbols=["AAPL"], url=server.url, max_backoff=0.1) as stream:
+        _wait(lambda: len(server.subscriptions) >= 2)
+        assert stream.reconnects >= 1
+        assert [subscription["symbol"] for subscription in server.subscriptions[:2]] == ["AAPL", "AAPL"]
+        assert stream.get_quote("AAPL")["spot"].iloc[0] == 187.05
+
+
+def test_subscriptions_change_from_other_threads_while_reconnecting():
+    with MockTradesServer(close_after_replay=True) as server, \
+            QuoteStream(symbols=["AAPL"], url=server.url, max_backoff=0.1) as stream:
+        def churn(worker: int):
+            for i in range(200):
+                stream.subscribe(f"S{worker}_{i}")
+                stream.unsubscribe(f"S{worker}_{i}")
+
+        threads = [Thread(target=churn, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stream.subscribe("MSFT")
+        _wait(lambda: server.connections >= 3, timeout=20.)
+        assert not stream._task.done()
+        assert stream.symbols == ["AAPL", "MSFT"]
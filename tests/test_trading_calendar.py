@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+import numpy as np
+
+from trading_calendar import TradingCalendar
+
+
+def test_special_closures_are_not_sessions():
+    calendar = TradingCalendar.nyse()
+    assert not calendar.is_session(date(1994, 4, 27))
+    assert not calendar.is_session(date(2001, 9, 11))
+    assert calendar.roll(date(1994, 4, 27)) == date(1994, 4, 28)
+
+
+def test_warmup_start_counts_sessions():
+    calendar = TradingCalendar.nyse()
+    assert calendar.warmup_start(datetime(1994, 4, 28), "D", 1) == datetime(1994, 4, 26)
+    # 78 five minute bars in a full session, the 79th is one session earlier
+    assert calendar.warmup_start(datetime(2024, 3, 5), "5", 78) == datetime(2024, 3, 4)
+    assert calendar.warmup_start(datetime(2024, 3, 5), "5", 79) == datetime(2024, 3, 1)
+
+
+def test_session_bounds_skip_holidays_and_follow_daylight_saving():
+    bounds = TradingCalendar.nyse().session_bounds("2024-03-08", "2024-03-12")
+    # Friday then Monday and Tuesday, New York moved from UTC-5 to UTC-4 over the weekend
+    opens = [datetime(2024, 3, 8, 14, 30), datetime(2024, 3, 11, 13, 30), datetime(2024, 3, 12, 13, 30)]
+    np.testing.assert_array_equal(bounds[:, 0], [(open - datetime(1970, 1, 1)).total_seconds() for open in opens])
+    assert (bounds[:, 1] - bounds[:, 0] == 390 * 60).all()
+    assert TradingCalendar.nyse().session_bounds("2024-12-25", "2024-12-25").shape == (0, 2)
+
+
+def test_session_bars_open_every_bar_of_the_sessions():
+    calendar = TradingCalendar.nyse()
+    bars = calendar.session_bars("2024-03-08", "2024-03-11", "60")
+    assert len(bars) == 2 * calendar.bars_per_session("60") == 14
+    np.testing.assert_array_equal(bars[:7], calendar.session_bounds("2024-03-08", "2024-03-08")[0, 0]
+                                  + np.arange(7) * 3600)
+    assert bars[7] == calendar.session_bounds("2024-03-11", "2024-03-11")[0, 0]
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import math
+from datetime import date, datetime, timedelta
+from threading import Lock
+from typing import List, Union
+
+from lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+DateLike = Union[date, datetime, str]
+
+
+class TradingCalendar:
+    """
+    Sessions of an exchange, weekdays but its holidays, with NumPy business-day arithmetic over whole arrays of
+    dates. The default calendar is the NYSE's, regular hours 9:30 to 16:00 America/New_York.
+    """
+    _shared = {}
+    _shared_lock = Lock()
+    # full-day closures no yearly rule produces
+    special_closures = ["1994-04-27", "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14", "2004-06-11",
+                        "2007-01-02", "2012-10-29", "2012-10-30", "2018-12-05", "2025-01-09"]
+
+    def __init__(self, holidays: List[DateLike] = None, open_time: str = "09:30", close_time: str = "16:00",
+                 timezone: str = "America/New_York", first_year: int = 1990, last_year: int = 2100):
+        self.holidays = np.array(sorted(holidays if holidays is not None else
+                                        self.nyse_holidays(first_year, last_year) + self.special_closures),
+                                 dtype="datetime64[D]")
+        self.open_time = open_time
+        self.close_time = close_time
+        self.timezone = timezone
+        self._busdaycal = np.busdaycalendar(weekmask="1111100", holidays=self.holidays)
+
+    @classmethod
+    def nyse(cls) -> 'TradingCalendar':
+        """
+        Returns
+        -------
+            TradingCalendar
+                the process-wide NYSE calendar, its holidays are computed on first use
+        """
+        with cls._shared_lock:
+            if "NYSE" not in cls._shared:
+                cls._shared["NYSE"] = cls()
+            return cls._shared["NYSE"]
+
+    @staticmethod
+    def _easter(year: int) -> date:
+        a, b, c = year % 19, year // 100, year % 100
+        d = (19 * a + b - b // 4 - (b - (b + 8) // 25 + 1) // 3 + 15) % 30
+        e = (32 + 2 * (b % 4) + 2 * (c // 4) - d - c % 4) % 7
+        f = d + e - 7 * ((a + 11 * d + 22 * e) // 451) + 114
+        return date(year, f // 31, f % 31 + 1)
+
+    @staticmethod
+    def _weekday(year: int, month: int, weekday: int, nth: int) -> date:
+        """
+        Returns
+        -------
+            date
+                the `nth` `weekday` of the month, counted from its end when `nth` is negative
+        """
+        if nth > 0:
+            first = date(year, month, 1)
+            return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (nth - 1))
+        last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        return last - timedelta(days=(last.weekday() - weekday) % 7 + 7 * (-nth - 1))
+
+    @staticmethod
+    def _observed(day: date) -> date:
+        if day.weekday() == 5:
+            return day - timedelta(days=1)
+        if day.weekday() == 6:
+            return day + timedelta(days=1)
+        return day
+
+    @staticmethod
+    def nyse_holidays(first_year: int, last_year: int) -> List[str]:
+        holidays = []
+        for year in range(first_year, last_year + 1):
+            days = [TradingCalendar._weekday(year, 2, 0, 3), TradingCalendar._easter(year) - timedelta(days=2),
+                    TradingCalendar._weekday(year, 5, 0, -1), TradingCalendar._observed(date(year, 7, 4)),
+                    TradingCalendar._weekday(year, 9, 0, 1), TradingCalendar._weekday(year, 11, 3, 4),
+                    TradingCalendar._observed(date(year, 12, 25))]
+            # a New Year's Day on a Saturday is not observed on the Friday before, which closes the previous year
+            if date(year, 1, 1).weekday() != 5:
+                days.append(TradingCalendar._observed(date(year, 1, 1)))
+            if year >= 1998:
+                days.append(TradingCalendar._weekday(year, 1, 0, 3))
+            if year >= 2022:
+                days.append(TradingCalendar._observed(date(year, 6, 19)))
+            holidays += [day.isoformat() for day in days]
+        return holidays
+
+    @staticmethod
+    def _days(dates) -> np.ndarray:
+        if isinstance(dates, datetime):
+            dates = dates.date()
+        return np.asarray(dates, dtype="datetime64[D]") if not isinstance(dates, date) \
+            else np.datetime64(dates, "D")
+
+    def is_session(self, dates) -> Union[bool, np.ndarray]:
+        return np.is_busday(self._days(dates), busdaycal=self._busdaycal)
+
+    def roll(self, dates, direction: str = "forward"):
+        """
+        Returns
+        -------
+            the session of every date, or the next one in `direction` ('forward' or 'backward') when it is not one,
+            as datetime.date for a single date
+        """
+        rolled = np.busday_offset(self._days(dates), 0, roll=direction, busdaycal=self._busdaycal)
+        return rolled.item() if rolled.ndim == 0 else rolled
+
+    def offset(self, dates, sessions, roll: str = "forward"):
+        """
+        Returns
+        -------
+            the session `sessions` sessions after every date rolled in `roll`, before for negative counts
+        """
+        shifted = np.busday_offset(self._days(dates), sessions, roll=roll, busdaycal=self._busdaycal)
+        return shifted.item() if shifted.ndim == 0 else shifted
+
+    def count(self, start, end) -> Union[int, np.ndarray]:
+        """
+        Returns
+        -------
+            the number of sessions in [start, end)
+        """
+        return np.busday_count(self._days(start), self._days(end), busdaycal=self._busdaycal)
+
+    def sessions(self, start: DateLike, end: DateLike) -> np.ndarray:
+        """
+        Returns
+        -------
+            np.ndarray
+                the sessions of [start, end] as datetime64[D]
+        """
+        days = np.arange(self._days(start), self._days(end) + 1, dtype="datetime64[D]")
+        return days[self.is_session(days)]
+
+    @staticmethod
+    def bar_minutes(resolution: str) -> Union[int, None]:
+        return int(resolution) if resolution.isdigit() else None
+
+    @property
+    def session_minutes(self) -> int:
+        open_hour, open_minute = map(int, self.open_time.split(":"))
+        close_hour, close_minute = map(int, self.close_time.split(":"))
+        return (close_hour - open_hour) * 60 + close_minute - open_minute
+
+    def bars_per_session(self, resolution: str) -> int:
+        return math.ceil(self.session_minutes / self.bar_minutes(resolution))
+
+    def session_bounds(self, start: DateLike, end: DateLike) -> np.ndarray:
+        """
+        Returns
+        -------
+            np.ndarray
+                the (open, close) epoch seconds of every session of [start, end], one row per session
+        """
+        sessions = pd.DatetimeIndex(self.sessions(start, end))
+        bounds = [(sessions + pd.Timedelta(f"{time}:00")).tz_localize(self.timezone).tz_convert(None)
+                  .values.astype("datetime64[s]").astype("int64") for time in (self.open_time, self.close_time)]
+        return np.stack(bounds, axis=1) if len(sessions) else np.empty((0, 2), dtype="int64")
+
+    def session_bars(self, start: DateLike, end: DateLike, resolution: str) -> np.ndarray:
+        """
+        Returns
+        -------
+            np.ndarray
+                the epoch seconds at which every intraday bar of the sessions of [start, end] opens, the way
+                /stock/candle stamps regular-hours bars
+        """
+        seconds = self.bar_minutes(resolution) * 60
+        opens = self.session_bounds(start, end)[:, 0]
+        return (opens[:, None] + np.arange(self.bars_per_session(resolution)) * seconds).ravel()
+
+    def warmup_start(self, _from: datetime, resolution: str, bars: int) -> datetime:
+        """
+        Returns
+        -------
+            datetime
+                the earliest time from which a request returns `bars` bars of `resolution` before the first session
+                of `_from`, the history an indicator with that lookback needs to be defined from `_from` on.
+                Intraday sessions are counted as full `session_minutes` long, 390 for the NYSE: early closes
+                are not modelled, so a warm-up spanning one is short by the bars it missed
+        """
+        first = self.roll(_from)
+        if bars <= 0:
+            return datetime.combine(first, datetime.min.time())
+        if resolution == "W":
+            start = first - timedelta(weeks=bars)
+        elif resolution == "M":
+            start = (pd.Timestamp(first) - pd.DateOffset(months=bars)).date()
+        elif resolution == "D":
+            start = self.offset(first, -bars)
+        else:
+            start = self.offset(first, -math.ceil(bars / self.bars_per_session(resolution)))
+        return datetime.combine(start, datetime.min.time())